@@ -9,6 +9,7 @@ from models.agent import AgentExecutionRequest, AgentExecutionResult
 from services.ollama import OllamaService
 from services.vector_store import VectorStoreService
 from services.search_cache import SearchCacheService
+from services.singleflight import SingleFlight
 from agents.rag.searcher import RAGSearcherAgent
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,13 @@ class RAGCachedSearcherAgent:
     Searcher RAG avec cache LRU intégré.
 
     Améliore les performances en cachant les résultats des recherches fréquentes.
+    Si le cache a un tier sémantique, un miss exact est suivi d'une recherche
+    par embedding de requête; l'embedding calculé est réutilisé pour la
+    recherche vectorielle en cas de miss.
+
+    Les misses concurrents de même clé de cache (requête populaire après une
+    expiration ou un vidage du cache) partagent une seule recherche via
+    ``flights``, à partager entre instances.
     """
 
     def __init__(
@@ -29,6 +37,7 @@ class RAGCachedSearcherAgent:
         top_k: int = 5,
         score_threshold: float = 0.7,
         enable_cache: bool = True,
+        flights: Optional[SingleFlight] = None,
     ):
         """
         Args:
@@ -38,6 +47,7 @@ class RAGCachedSearcherAgent:
             top_k: Nombre de résultats par défaut
             score_threshold: Score minimum de pertinence
             enable_cache: Activer/désactiver le cache
+            flights: Recherches en cours partagées (créé automatiquement si None)
         """
         self.searcher = RAGSearcherAgent(
             ollama_service=ollama_service,
@@ -48,6 +58,7 @@ class RAGCachedSearcherAgent:
 
         self.cache = cache or SearchCacheService(max_size=1000, default_ttl=3600)
         self.enable_cache = enable_cache
+        self.flights = flights or SingleFlight()
         self.name = "RAG Cached Searcher"
         self.description = "Recherche sémantique avec cache LRU pour meilleures performances"
 
@@ -60,6 +71,7 @@ class RAGCachedSearcherAgent:
                 - query: Question de recherche
                 - top_k: Nombre de résultats (optionnel)
                 - filters: Filtres de métadonnées (optionnel)
+                - collections: Collections interrogées (optionnel)
                 - use_cache: Forcer utilisation cache (optionnel, défaut: True)
                 - cache_ttl: TTL custom pour cette requête (optionnel)
 
@@ -71,6 +83,7 @@ class RAGCachedSearcherAgent:
         filters = request.input.get("filters", {})
         use_cache = request.input.get("use_cache", True)
         cache_ttl = request.input.get("cache_ttl")
+        collections = self.searcher._requested_collections(request.input)
 
         if not query:
             return AgentExecutionResult(
@@ -83,7 +96,7 @@ class RAGCachedSearcherAgent:
         cache_key_params = {
             "top_k": top_k,
             "filters": str(sorted(filters.items())) if filters else "",
-            "collection": self.searcher.collection_name,
+            "collection": ",".join(sorted(collections)),
         }
 
         # Tentative de récupération depuis le cache
@@ -95,10 +108,47 @@ class RAGCachedSearcherAgent:
 
                 # Ajouter métadonnée indiquant que c'est depuis le cache
                 cached_result["output"]["from_cache"] = True
+                cached_result["output"]["cache_tier"] = "exact"
                 cached_result["output"]["cache_stats"] = self.cache.get_stats()
 
                 return AgentExecutionResult(**cached_result)
 
+        result = await self.flights.do(
+            self.cache.make_key(query, **cache_key_params),
+            lambda: self._search(request, query, use_cache, cache_ttl, cache_key_params),
+        )
+        # Résultat partagé par les appels coalescés: chaque appelant a sa copie
+        return result.model_copy(deep=True)
+
+    async def _search(
+        self,
+        request: AgentExecutionRequest,
+        query: str,
+        use_cache: bool,
+        cache_ttl: Optional[int],
+        cache_key_params: dict,
+    ) -> AgentExecutionResult:
+        """Miss du cache exact: tier sémantique, puis recherche et mise en cache."""
+        query_embedding = None
+        if self.enable_cache and use_cache and self.cache.semantic_enabled:
+            query_embedding = await self.searcher.ollama.generate_embedding(text=query)
+            cached_result = self.cache.get_semantic(query_embedding, **cache_key_params)
+
+            if cached_result is not None:
+                logger.info(f"[RAGCachedSearcher] Cache HIT sémantique: {query[:50]}...")
+
+                cached_result["output"]["from_cache"] = True
+                cached_result["output"]["cache_tier"] = "semantic"
+                cached_result["output"]["cache_stats"] = self.cache.get_stats()
+
+                return AgentExecutionResult(**cached_result)
+
+            request = AgentExecutionRequest(
+                agent_id=request.agent_id,
+                payload={**request.payload, "query_embedding": query_embedding},
+                priority=request.priority,
+            )
+
         logger.info(f"[RAGCachedSearcher] Cache MISS: {query[:50]}...")
 
         # Exécuter la recherche via le searcher standard
@@ -109,12 +159,14 @@ class RAGCachedSearcherAgent:
             # Convertir le résultat en dict pour le cache
             result_dict = {
                 "success": result.success,
-                "output": result.output,
+                "output": dict(result.output),
                 "error": result.error,
                 "citations": result.citations,
             }
 
-            self.cache.set(query, result_dict, ttl=cache_ttl, **cache_key_params)
+            self.cache.set(
+                query, result_dict, ttl=cache_ttl, embedding=query_embedding, **cache_key_params
+            )
             logger.debug(f"[RAGCachedSearcher] Résultat mis en cache")
 
         # Ajouter métadonnée indiquant que ce n'est pas depuis le cache
@@ -0,0 +1,400 @@
+"""
+Incremental document chunking for streamed sections (pages).
+
+Strategies (``create_chunker``):
+- ``window``: sliding character window cut at the last space (default; keeps
+  the chunk ids of existing indexes)
+- ``sentence``: whole sentences packed under the length budget
+- ``structure``: paragraphs packed under the budget, a new chunk at each
+  heading; for the paragraph-based outputs of the Markdown/HTML/DOCX parsers
+
+``sentence`` and ``structure`` measure the budget in characters or in
+tokens (``length_unit="tokens"``). Every strategy runs in linear time.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Deque, Iterator, List, Literal, Optional
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    tiktoken = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+ChunkingStrategy = Literal["window", "sentence", "structure"]
+LengthUnit = Literal["chars", "tokens"]
+
+# Sections are joined like the parser joins PDF pages, so feeding pages one by
+# one yields exactly the chunks of the full text (and the same chunk ids).
+SECTION_SEPARATOR = "\n\n"
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# End of sentence followed by what looks like the start of the next one
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?…])[\"»)\]]*\s+(?=[\"«(\[]?[A-ZÀ-ÖØ-Þ0-9])")
+# Tokenizer fallback: words cut in pieces of 6 characters (close to WordPiece
+# counts for French and English prose) and one token per punctuation mark
+_TOKEN_PATTERN = re.compile(r"\w{1,6}|[^\w\s]")
+_HEADING_MAX_CHARS = 80
+
+
+@dataclass
+class TextChunk:
+    """Chunk text with the pages it spans (None when the source has no pages)."""
+
+    content: str
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+class IncrementalChunker:
+    """
+    Sliding character window fed section by section.
+
+    A chunk is emitted as soon as the text after its window has arrived;
+    ``flush`` emits the tail once the document is complete. Only the current
+    window plus the overlap is kept in memory, never the whole document.
+    """
+
+    def __init__(self, chunk_size: int = 512, chunk_overlap: int = 128):
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self._buffer = ""
+        self._base = 0  # absolute offset of _buffer[0]
+        self._length = 0  # total characters received
+        self._start = 0  # absolute offset of the next window
+        self._sections = 0
+        self._page_offsets: List[int] = []
+        self._page_numbers: List[Optional[int]] = []
+
+    def feed(self, text: str, page_number: Optional[int] = None) -> List[TextChunk]:
+        """Add a section and return the chunks that are now complete."""
+        if self._sections:
+            self._append(SECTION_SEPARATOR)
+        self._sections += 1
+        self._page_offsets.append(self._length)
+        self._page_numbers.append(page_number)
+        self._append(text)
+        return self._drain(final=False)
+
+    def flush(self) -> List[TextChunk]:
+        """Return the remaining chunks once every section has been fed."""
+        return self._drain(final=True)
+
+    def _append(self, text: str) -> None:
+        self._buffer += text
+        self._length += len(text)
+
+    def _drain(self, final: bool) -> List[TextChunk]:
+        chunks = []
+
+        while self._start < self._length:
+            start = self._start
+            end = start + self.chunk_size
+            # The window decision depends on the total length: wait for more text
+            if end >= self._length and not final:
+                break
+
+            window = self._buffer[start - self._base : end - self._base]
+
+            # Avoid breaking words - find last space
+            if end < self._length:
+                last_space = window.rfind(" ")
+                if last_space > 0:
+                    window = window[:last_space]
+                    end = start + last_space
+
+            content = window.strip()
+            first = start + len(window) - len(window.lstrip())
+            last = first + max(len(content), 1) - 1
+            chunks.append(TextChunk(content, self._page_at(first), self._page_at(last)))
+
+            # Move to next window with overlap
+            self._start = end - self.chunk_overlap
+            self._trim()
+
+        return chunks
+
+    def _trim(self) -> None:
+        # A window ends at least one character after its start, so the next
+        # start never goes back more than the overlap. The consumed prefix is
+        # dropped once it is half the buffer, so a long section is copied a
+        # bounded number of times (linear time) instead of once per chunk.
+        keep_from = max(self._base, self._start - self.chunk_overlap)
+        if keep_from - self._base > max(self.chunk_size, len(self._buffer) // 2):
+            self._buffer = self._buffer[keep_from - self._base :]
+            self._base = keep_from
+
+            first_page = max(0, bisect_right(self._page_offsets, keep_from) - 1)
+            del self._page_offsets[:first_page]
+            del self._page_numbers[:first_page]
+
+    def _page_at(self, offset: int) -> Optional[int]:
+        index = bisect_right(self._page_offsets, offset) - 1
+        return self._page_numbers[max(index, 0)]
+
+
+# ----------------------------------------------------------------------
+# Length functions
+# ----------------------------------------------------------------------
+
+
+@lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:  # pragma: no cover - encodage absent du cache local
+        logger.warning("Encodage tiktoken indisponible, comptage approché des tokens", exc_info=exc)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else a fast regex estimate."""
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode_ordinary(text))
+    return sum(1 for _ in _TOKEN_PATTERN.finditer(text))
+
+
+def get_length_function(length_unit: LengthUnit) -> Callable[[str], int]:
+    if length_unit == "chars":
+        return len
+    if length_unit == "tokens":
+        return count_tokens
+    raise ValueError(f"Unité de longueur inconnue: {length_unit}")
+
+
+# ----------------------------------------------------------------------
+# Unit packing (sentence / structure)
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class _Unit:
+    """Indivisible piece of text (sentence, paragraph) and how it attaches."""
+
+    text: str
+    length: int
+    page: Optional[int]
+    joiner: str  # inserted before this unit when it follows another one
+    joiner_length: int
+    starts_section: bool = False  # heading: never packed with what precedes
+
+
+class UnitChunker:
+    """
+    Greedy packing of units under ``chunk_size`` (measured by ``length``).
+
+    A chunk is emitted as soon as the next unit does not fit; the next chunk
+    starts with the trailing units of the previous one, up to
+    ``chunk_overlap``. Overlap therefore repeats whole sentences or
+    paragraphs instead of cut words. Units longer than the budget are split
+    into sentences, then into words.
+
+    Subclasses define ``_units(text, page_number)``.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 512,
+        chunk_overlap: int = 128,
+        length: Callable[[str], int] = len,
+    ):
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_overlap = max(0, chunk_overlap)
+        self.length = length
+        self._current: Deque[_Unit] = deque()
+        self._current_length = 0
+        self._fresh = 0  # units added since the last emitted chunk
+        self._sections = 0
+
+    def feed(self, text: str, page_number: Optional[int] = None) -> List[TextChunk]:
+        """Add a section and return the chunks that are now complete."""
+        chunks: List[TextChunk] = []
+        for index, unit in enumerate(self._units(text, page_number)):
+            if index == 0 and not self._sections:
+                unit.joiner, unit.joiner_length = "", 0
+            self._add(unit, chunks)
+        self._sections += 1
+        return chunks
+
+    def flush(self) -> List[TextChunk]:
+        """Return the last chunk once every section has been fed."""
+        chunks = [self._emit()] if self._fresh else []
+        self._current.clear()
+        self._current_length = 0
+        self._fresh = 0
+        return chunks
+
+    def _units(self, text: str, page_number: Optional[int]) -> Iterator[_Unit]:
+        raise NotImplementedError
+
+    def _unit(
+        self, text: str, page: Optional[int], joiner: str, starts_section: bool = False
+    ) -> _Unit:
+        return _Unit(text, self.length(text), page, joiner, self.length(joiner), starts_section)
+
+    def _add(self, unit: _Unit, chunks: List[TextChunk]) -> None:
+        if unit.length > self.chunk_size:
+            for piece in self._split_oversized(unit):
+                self._add(piece, chunks)
+            return
+
+        if unit.starts_section:
+            if self._fresh:
+                chunks.append(self._emit())
+            self._reset()
+        elif self._current and not self._fits(unit):
+            if self._fresh:
+                chunks.append(self._emit())
+                self._keep_overlap()
+            while self._current and not self._fits(unit):
+                self._pop_front()
+
+        if self._current:
+            self._current_length += unit.joiner_length
+        self._current.append(unit)
+        self._current_length += unit.length
+        self._fresh += 1
+
+    def _fits(self, unit: _Unit) -> bool:
+        return self._current_length + unit.joiner_length + unit.length <= self.chunk_size
+
+    def _emit(self) -> TextChunk:
+        units = self._current
+        content = units[0].text + "".join(unit.joiner + unit.text for unit in list(units)[1:])
+        self._fresh = 0
+        return TextChunk(content, units[0].page, units[-1].page)
+
+    def _keep_overlap(self) -> None:
+        # Trailing units within the overlap budget, never the whole chunk
+        kept = 0
+        kept_length = 0
+        for unit in reversed(self._current):
+            if kept + 1 >= len(self._current):
+                break
+            extra = unit.length + (unit.joiner_length if kept else 0)
+            if kept_length + extra > self.chunk_overlap:
+                break
+            kept += 1
+            kept_length += extra
+        while len(self._current) > kept:
+            self._pop_front()
+
+    def _pop_front(self) -> None:
+        unit = self._current.popleft()
+        self._current_length -= unit.length
+        if self._current:
+            self._current_length -= self._current[0].joiner_length
+
+    def _reset(self) -> None:
+        self._current.clear()
+        self._current_length = 0
+
+    def _split_oversized(self, unit: _Unit) -> Iterator[_Unit]:
+        """Sentences of an oversized unit, or word groups if it is one long sentence."""
+        sentences = _SENTENCE_BREAK.split(unit.text)
+        if len(sentences) > 1:
+            for index, sentence in enumerate(sentences):
+                if index == 0:
+                    yield self._unit(sentence, unit.page, unit.joiner, unit.starts_section)
+                else:
+                    yield self._unit(sentence, unit.page, " ")
+            return
+
+        words: List[str] = []
+        words_length = 0
+        first = True
+        for word in unit.text.split(" "):
+            word_length = self.length(word) + (self.length(" ") if words else 0)
+            if words and words_length + word_length > self.chunk_size:
+                yield self._piece(words, unit, first)
+                first = False
+                words, words_length = [], 0
+                word_length = self.length(word)
+            words.append(word)
+            words_length += word_length
+        if words:
+            yield self._piece(words, unit, first)
+
+    def _piece(self, words: List[str], unit: _Unit, first: bool) -> _Unit:
+        text = " ".join(words)
+        joiner = unit.joiner if first else " "
+        # A single word longer than the budget is kept whole
+        return _Unit(
+            text,
+            min(self.length(text), self.chunk_size),
+            unit.page,
+            joiner,
+            self.length(joiner),
+            unit.starts_section and first,
+        )
+
+
+class SentenceChunker(UnitChunker):
+    """Whole sentences packed under the budget; paragraphs stay separated."""
+
+    def _units(self, text: str, page_number: Optional[int]) -> Iterator[_Unit]:
+        for paragraph in _paragraphs(text):
+            for index, sentence in enumerate(_SENTENCE_BREAK.split(paragraph)):
+                yield self._unit(sentence, page_number, SECTION_SEPARATOR if index == 0 else " ")
+
+
+class StructureChunker(UnitChunker):
+    """
+    Paragraphs packed under the budget, with a new chunk at every heading.
+
+    Parsed Markdown/HTML/DOCX put each heading in its own paragraph: a short
+    single-line paragraph without final punctuation (or a Markdown ``#``
+    line) counts as a heading. Overlap never crosses a heading.
+    """
+
+    def _units(self, text: str, page_number: Optional[int]) -> Iterator[_Unit]:
+        for paragraph in _paragraphs(text):
+            yield self._unit(
+                paragraph, page_number, SECTION_SEPARATOR, starts_section=_is_heading(paragraph)
+            )
+
+
+def _paragraphs(text: str) -> Iterator[str]:
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        normalized = " ".join(paragraph.split())
+        if normalized:
+            yield normalized
+
+
+def _is_heading(paragraph: str) -> bool:
+    if paragraph.startswith("#"):
+        return True
+    return (
+        len(paragraph) <= _HEADING_MAX_CHARS
+        and paragraph[-1] not in ".!?:;,…)»\""
+        and (paragraph[0].isupper() or paragraph[0].isdigit())
+    )
+
+
+def create_chunker(
+    strategy: ChunkingStrategy = "window",
+    chunk_size: int = 512,
+    chunk_overlap: int = 128,
+    length_unit: LengthUnit = "chars",
+):
+    """Build a chunker exposing ``feed(text, page_number)`` and ``flush()``."""
+    if strategy == "window":
+        if length_unit != "chars":
+            raise ValueError("La stratégie 'window' ne mesure qu'en caractères")
+        return IncrementalChunker(chunk_size, chunk_overlap)
+    length = get_length_function(length_unit)
+    if strategy == "sentence":
+        return SentenceChunker(chunk_size, chunk_overlap, length)
+    if strategy == "structure":
+        return StructureChunker(chunk_size, chunk_overlap, length)
+    raise ValueError(f"Stratégie de chunking inconnue: {strategy}")
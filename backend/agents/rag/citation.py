@@ -27,21 +27,40 @@ class Citation:
         year = self.metadata.get("year", "n.d.")
         title = self.metadata.get("title", self.doc_id)
         source = self.metadata.get("source", "")
+        pages = self._page_label()
 
+        citation = f"{author} ({year}). {title}"
         if source:
-            return f"{author} ({year}). {title}. {source}"
-        return f"{author} ({year}). {title}"
+            citation += f". {source}"
+        if pages:
+            citation += f", {pages}"
+        return citation
 
     def format_markdown(self) -> str:
         """Format citation in Markdown with snippet."""
         title = self.metadata.get("title", self.doc_id)
         source = self.metadata.get("source", "")
 
+        pages = self._page_label()
+
         snippet = self._truncate_snippet(self.content_snippet, max_length=200)
 
+        reference = f"*{title}*"
         if source:
-            return f"> {snippet}\n\n— *{title}*, {source} (relevance: {self.score:.2f})"
-        return f"> {snippet}\n\n— *{title}* (relevance: {self.score:.2f})"
+            reference += f", {source}"
+        if pages:
+            reference += f", {pages}"
+        return f"> {snippet}\n\n— {reference} (relevance: {self.score:.2f})"
+
+    def _page_label(self) -> str:
+        """Page provenance recorded at indexing ("p. 3", "pp. 3-4"), if any."""
+        page_start = self.metadata.get("page_start")
+        page_end = self.metadata.get("page_end", page_start)
+        if page_start is None:
+            return ""
+        if page_end is None or page_end == page_start:
+            return f"p. {page_start}"
+        return f"pp. {page_start}-{page_end}"
 
     def _truncate_snippet(self, text: str, max_length: int = 200) -> str:
         """Truncate snippet to max length, preserving words."""
@@ -2,30 +2,78 @@
 Agent RAG Document Loader - Charge et indexe des documents de différents formats
 """
 
+import asyncio
 import logging
-from typing import Dict, List, Optional
+import os
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Set
 from pathlib import Path
 
 from models.agent import AgentExecutionRequest, AgentExecutionResult
-from services.document_parser import DocumentParserService, DocumentFormat
+from services.document_parser import (
+    DocumentFormat,
+    DocumentParserService,
+    DocumentSection,
+    ParsedDocument,
+)
+from services.index_manifest import IndexManifestService, ManifestEntry, hash_file
 from agents.rag.indexer import RAGIndexerAgent
 
 logger = logging.getLogger(__name__)
 
+# Sauvegarde intermédiaire du manifeste tous les N fichiers indexés
+MANIFEST_SAVE_INTERVAL = 200
+
+# Chemins listés par aller-retour dans le thread de découverte
+DISCOVERY_BATCH_SIZE = 256
+
+
+@dataclass
+class _ParsedFile:
+    """
+    Fichier en attente d'indexation (entre les étages 2 et 3). ``parsed`` vaut
+    None pour un format streamé, parsé page par page par l'étage 3.
+    """
+    file_path: str
+    doc_id: str
+    parsed: Optional[ParsedDocument]
+    stat: os.stat_result
+    content_hash: str = ""
+    previous_chunk_ids: List[str] = field(default_factory=list)
+    metadata: Dict = field(default_factory=dict)
+
 
 class RAGDocumentLoaderAgent:
     """
     Agent spécialisé pour charger et indexer des documents multi-formats.
     Combine le parsing et l'indexation en une seule opération.
+
+    ``load_directory`` est un pipeline à trois étages reliés par des files
+    bornées: découverte des fichiers -> ``parse_workers`` parsings
+    concurrents (dans le pool du parser) -> ``index_workers`` consommateurs
+    qui embeddent et upsertent par batch. Les files bornées limitent la
+    mémoire: la découverte attend quand le parsing est en retard, le
+    parsing attend quand l'indexation l'est.
+
+    Les PDF ne sont jamais chargés en entier: leurs pages sont extraites,
+    découpées et embeddées au fil de l'eau (``_index_stream``).
     """
 
     def __init__(
         self,
         parser: DocumentParserService,
         indexer: RAGIndexerAgent,
+        manifest: Optional[IndexManifestService] = None,
+        parse_workers: int = 4,
+        index_workers: int = 4,
+        queue_size: int = 64,
     ):
         self.parser = parser
         self.indexer = indexer
+        self.manifest = manifest
+        self.parse_workers = max(1, parse_workers)
+        self.index_workers = max(1, index_workers)
+        self.queue_size = max(1, queue_size)
         self.name = "RAG Document Loader"
         self.description = "Charge et indexe des documents de multiples formats (PDF, DOCX, TXT, MD, HTML)"
 
@@ -39,6 +87,8 @@ class RAGDocumentLoaderAgent:
                 - doc_id: ID unique du document (optionnel, déduit du fichier)
                 - metadata: Métadonnées supplémentaires (optionnel)
                 - collection_name: Nom de la collection (défaut: "documents")
+                - previous_chunk_ids: Chunks d'une indexation précédente (optionnel)
+                - force_reembed: Ré-embedder même les chunks inchangés (optionnel)
 
         Returns:
             AgentExecutionResult avec:
@@ -63,142 +113,475 @@ class RAGDocumentLoaderAgent:
 
             metadata = request.input.get("metadata", {})
             collection_name = request.input.get("collection_name", "documents")
+            previous_chunk_ids = request.input.get("previous_chunk_ids") or []
+            force_reembed = bool(request.input.get("force_reembed"))
 
-            logger.info(f"[RAGDocumentLoader] Chargement: {file_path}")
+            if self.parser.supports_streaming(file_path):
+                # 1-3. Parser, découper et indexer page par page
+                return await self._index_stream(
+                    file_path, doc_id, metadata, collection_name, previous_chunk_ids, force_reembed
+                )
 
             # 1. Parser le document
-            parsed_doc = await self.parser.parse_file(file_path, metadata)
-
-            logger.info(
-                f"[RAGDocumentLoader] Document parsé - Format: {parsed_doc.format}, "
-                f"Mots: {parsed_doc.word_count}, Pages: {parsed_doc.page_count or 'N/A'}"
+            parsed_doc = await self._parse(file_path, metadata)
+
+            # 2-3. Indexer le document
+            return await self._index(
+                file_path,
+                doc_id,
+                parsed_doc,
+                collection_name,
+                previous_chunk_ids=previous_chunk_ids,
+                force_reembed=force_reembed,
             )
 
-            # 2. Ajouter info de format dans les métadonnées
-            final_metadata = {
-                **parsed_doc.metadata,
-                "format": parsed_doc.format.value,
-                "word_count": str(parsed_doc.word_count or 0),
-                "file_path": file_path,
+        except Exception as e:
+            return self._failure(e)
+
+    async def _parse(self, file_path: str, metadata: Dict) -> ParsedDocument:
+        logger.info(f"[RAGDocumentLoader] Chargement: {file_path}")
+
+        parsed_doc = await self.parser.parse_file(file_path, metadata)
+
+        logger.info(
+            f"[RAGDocumentLoader] Document parsé - Format: {parsed_doc.format}, "
+            f"Mots: {parsed_doc.word_count}, Pages: {parsed_doc.page_count or 'N/A'}"
+        )
+        return parsed_doc
+
+    async def _index(
+        self,
+        file_path: str,
+        doc_id: str,
+        parsed_doc: ParsedDocument,
+        collection_name: str,
+        previous_chunk_ids: List[str],
+        force_reembed: bool,
+        require_durable: bool = False,
+    ) -> AgentExecutionResult:
+        # Ajouter info de format dans les métadonnées
+        final_metadata = {
+            **parsed_doc.metadata,
+            "format": parsed_doc.format.value,
+            "word_count": str(parsed_doc.word_count or 0),
+            "file_path": file_path,
+        }
+
+        if parsed_doc.page_count:
+            final_metadata["page_count"] = str(parsed_doc.page_count)
+
+        indexer_request = AgentExecutionRequest(
+            agent_id="rag_indexer",
+            input={
+                "doc_id": doc_id,
+                "content": parsed_doc.content,
+                "metadata": final_metadata,
+                "collection_name": collection_name,
+                "previous_chunk_ids": previous_chunk_ids,
+                "force_reembed": force_reembed,
+                "require_durable": require_durable,
             }
+        )
 
-            if parsed_doc.page_count:
-                final_metadata["page_count"] = str(parsed_doc.page_count)
-
-            # 3. Indexer le document
-            indexer_request = AgentExecutionRequest(
-                agent_id="rag_indexer",
-                input={
-                    "doc_id": doc_id,
-                    "content": parsed_doc.content,
-                    "metadata": final_metadata,
-                    "collection_name": collection_name,
-                }
-            )
+        indexer_result = await self.indexer.execute(indexer_request)
 
-            indexer_result = await self.indexer.execute(indexer_request)
-
-            if not indexer_result.success:
-                raise Exception(f"Indexation échouée: {indexer_result.error}")
-
-            return AgentExecutionResult(
-                success=True,
-                output={
-                    "doc_id": doc_id,
-                    "chunks_created": indexer_result.output["chunks_created"],
-                    "chunk_ids": indexer_result.output["chunk_ids"],
-                    "format": parsed_doc.format.value,
-                    "metadata": final_metadata,
-                    "word_count": parsed_doc.word_count,
-                    "page_count": parsed_doc.page_count,
-                }
-            )
+        if not indexer_result.success:
+            raise Exception(f"Indexation échouée: {indexer_result.error}")
 
-        except FileNotFoundError as e:
-            logger.error(f"[RAGDocumentLoader] Fichier introuvable: {e}")
-            return AgentExecutionResult(
-                success=False,
-                output={},
-                error=f"Fichier introuvable: {str(e)}"
-            )
-        except ValueError as e:
-            logger.error(f"[RAGDocumentLoader] Erreur validation: {e}")
-            return AgentExecutionResult(
-                success=False,
-                output={},
-                error=f"Erreur validation: {str(e)}"
-            )
-        except Exception as e:
-            logger.error(f"[RAGDocumentLoader] Erreur: {e}", exc_info=True)
-            return AgentExecutionResult(
-                success=False,
-                output={},
-                error=f"Chargement échoué: {str(e)}"
-            )
+        return self._indexed_result(
+            doc_id,
+            indexer_result.output,
+            parsed_doc.format,
+            final_metadata,
+            parsed_doc.word_count,
+            parsed_doc.page_count,
+        )
+
+    async def _index_stream(
+        self,
+        file_path: str,
+        doc_id: str,
+        metadata: Dict,
+        collection_name: str,
+        previous_chunk_ids: List[str],
+        force_reembed: bool,
+        require_durable: bool = False,
+    ) -> AgentExecutionResult:
+        """
+        Parse et indexe un document section par section: le texte complet
+        n'est jamais construit et l'embedding commence pendant l'extraction
+        des pages suivantes.
+
+        Le nombre de mots n'est connu qu'à la fin: il figure dans le
+        résultat mais pas dans le payload des chunks.
+        """
+        logger.info(f"[RAGDocumentLoader] Chargement (streaming): {file_path}")
+        doc_format = self.parser.detect_format(file_path)
+        final_metadata = {
+            **metadata,
+            "format": doc_format.value,
+            "file_path": file_path,
+        }
+        counts = {"words": 0, "pages": None}
+
+        async def sections() -> AsyncIterator[DocumentSection]:
+            # Le parser complète final_metadata (titre, auteur) avant la première section
+            async for section in self.parser.iter_sections(file_path, final_metadata):
+                if section.page_count and counts["pages"] is None:
+                    counts["pages"] = section.page_count
+                    final_metadata["page_count"] = str(section.page_count)
+                counts["words"] += len(section.content.split())
+                yield section
+
+        output = await self.indexer.index_sections(
+            sections(),
+            doc_id,
+            final_metadata,
+            collection_name=collection_name,
+            previous_chunk_ids=previous_chunk_ids,
+            force_reembed=force_reembed,
+            require_durable=require_durable,
+        )
+
+        logger.info(
+            f"[RAGDocumentLoader] Document indexé - Format: {doc_format}, "
+            f"Mots: {counts['words']}, Pages: {counts['pages'] or 'N/A'}"
+        )
+        final_metadata["word_count"] = str(counts["words"])
+        return self._indexed_result(
+            doc_id, output, doc_format, final_metadata, counts["words"], counts["pages"]
+        )
+
+    @staticmethod
+    def _indexed_result(
+        doc_id: str,
+        indexer_output: Dict,
+        doc_format: DocumentFormat,
+        metadata: Dict,
+        word_count: Optional[int],
+        page_count: Optional[int],
+    ) -> AgentExecutionResult:
+        return AgentExecutionResult(
+            success=True,
+            output={
+                "doc_id": doc_id,
+                "chunks_created": indexer_output["chunks_created"],
+                "chunk_ids": indexer_output["chunk_ids"],
+                "chunks_embedded": indexer_output["chunks_embedded"],
+                "chunks_deleted": indexer_output["chunks_deleted"],
+                "format": doc_format.value,
+                "metadata": metadata,
+                "word_count": word_count,
+                "page_count": page_count,
+            }
+        )
+
+    @staticmethod
+    def _failure(error: Exception) -> AgentExecutionResult:
+        if isinstance(error, FileNotFoundError):
+            logger.error(f"[RAGDocumentLoader] Fichier introuvable: {error}")
+            message = f"Fichier introuvable: {str(error)}"
+        elif isinstance(error, ValueError):
+            logger.error(f"[RAGDocumentLoader] Erreur validation: {error}")
+            message = f"Erreur validation: {str(error)}"
+        else:
+            logger.error(f"[RAGDocumentLoader] Erreur: {error}", exc_info=error)
+            message = f"Chargement échoué: {str(error)}"
+        return AgentExecutionResult(success=False, output={}, error=message)
 
     async def load_directory(
         self,
         directory_path: str,
         collection_name: str = "documents",
         recursive: bool = True,
-        metadata: Optional[Dict] = None
+        metadata: Optional[Dict] = None,
+        full_reindex: bool = False,
+        skip_paths: Optional[Set[str]] = None,
+        on_discovered: Optional[Callable[[str], None]] = None,
+        on_result: Optional[Callable[[str, AgentExecutionResult], None]] = None,
     ) -> Dict[str, AgentExecutionResult]:
         """
         Charge tous les documents supportés d'un répertoire.
 
+        Avec un manifeste, le chargement est incrémental: les fichiers dont
+        mtime/taille (ou à défaut le hash) n'ont pas changé sont ignorés, seuls
+        les chunks nouveaux ou modifiés sont embeddés, et les points des
+        chunks ou fichiers disparus sont supprimés. Un fichier n'entre dans le
+        manifeste (ou n'en sort) que si Ollama et Qdrant ont réellement
+        traité ses points: sinon il est en échec et retraité au prochain scan.
+
+        Le doc_id d'un fichier est son chemin relatif au répertoire scanné.
+
         Args:
             directory_path: Chemin du répertoire
             collection_name: Collection de destination
             recursive: Parcourir les sous-répertoires
             metadata: Métadonnées à ajouter à tous les documents
+            full_reindex: Ignorer le manifeste et tout ré-embedder
+            skip_paths: Fichiers (chemins absolus) déjà traités, ignorés sans
+                être relus (reprise d'un job interrompu)
+            on_discovered: Appelé pour chaque fichier découvert à traiter
+            on_result: Appelé dès qu'un fichier a son résultat
 
         Returns:
-            Dict mapping file_path -> AgentExecutionResult
+            Dict mapping file_path -> AgentExecutionResult. Les fichiers
+            inchangés ont ``output["unchanged"]``, les fichiers supprimés
+            ``output["removed"]``.
         """
-        results = {}
-        directory = Path(directory_path)
+        results: Dict[str, AgentExecutionResult] = {}
+        directory = Path(directory_path).resolve()
 
         if not directory.exists():
             logger.error(f"Répertoire introuvable: {directory_path}")
             return results
 
         # Obtenir les extensions supportées
-        supported_extensions = self.parser.get_supported_extensions()
+        supported_extensions = set(self.parser.get_supported_extensions())
 
         # Pattern de recherche
         pattern = "**/*" if recursive else "*"
 
         logger.info(f"[RAGDocumentLoader] Scan: {directory_path} (recursive={recursive})")
 
-        for file_path in directory.glob(pattern):
-            if not file_path.is_file():
-                continue
-
-            if file_path.suffix.lower() not in supported_extensions:
-                continue
-
-            logger.info(f"[RAGDocumentLoader] Traitement: {file_path}")
-
-            request = AgentExecutionRequest(
-                agent_id="rag_document_loader",
-                input={
-                    "file_path": str(file_path),
-                    "metadata": metadata or {},
-                    "collection_name": collection_name,
-                }
-            )
+        skip_paths = skip_paths or set()
+        seen: Set[str] = set(skip_paths)
+        parse_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        index_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def discover() -> None:
+            # glob() fait des appels système bloquants: parcours par lots dans un thread
+            paths = directory.glob(pattern)
+            while batch := await asyncio.to_thread(
+                self._next_files, paths, supported_extensions, DISCOVERY_BATCH_SIZE
+            ):
+                for file_path in batch:
+                    path_key = str(file_path)
+                    if path_key in skip_paths:
+                        continue
+                    seen.add(path_key)
+                    if on_discovered:
+                        on_discovered(path_key)
+                    await parse_queue.put(file_path)
+
+        def record(path_key: str, result: AgentExecutionResult) -> None:
+            results[path_key] = result
+            if on_result:
+                on_result(path_key, result)
+
+        async def parse_worker() -> None:
+            while (file_path := await parse_queue.get()) is not None:
+                try:
+                    item = await self._prepare_file(
+                        file_path, directory, collection_name, metadata or {}, full_reindex
+                    )
+                except Exception as e:
+                    record(str(file_path), self._failure(e))
+                    continue
+                if isinstance(item, AgentExecutionResult):
+                    record(str(file_path), item)
+                else:
+                    await index_queue.put(item)
+
+        indexed = 0
+
+        async def index_worker() -> None:
+            nonlocal indexed
+            while (item := await index_queue.get()) is not None:
+                record(item.file_path, await self._index_file(item, collection_name, full_reindex))
+                # Compteur propre aux index workers: ``results`` reçoit aussi
+                # les fichiers inchangés et les échecs de parsing
+                indexed += 1
+                if self.manifest and indexed % MANIFEST_SAVE_INTERVAL == 0:
+                    await self.manifest.save_async(collection_name)
 
-            result = await self.execute(request)
-            results[str(file_path)] = result
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(
+                    self._run_stage([discover()], parse_queue, self.parse_workers)
+                )
+                group.create_task(
+                    self._run_stage(
+                        [parse_worker() for _ in range(self.parse_workers)],
+                        index_queue,
+                        self.index_workers,
+                    )
+                )
+                for _ in range(self.index_workers):
+                    group.create_task(index_worker())
+
+            if self.manifest:
+                removed = self._removed_entries(collection_name, directory, recursive, seen)
+                for path_key, entry in removed:
+                    logger.info(f"[RAGDocumentLoader] Fichier supprimé: {path_key}")
+                    deleted = await self.indexer.vector_store.delete_points(
+                        collection_name, entry.chunk_ids
+                    )
+                    if not deleted:
+                        # Points toujours dans Qdrant: l'entrée reste pour le prochain scan
+                        record(path_key, self._failure(
+                            RuntimeError("Suppression limitée au fallback mémoire")
+                        ))
+                        continue
+                    self.manifest.remove(collection_name, path_key)
+                    record(path_key, AgentExecutionResult(
+                        success=True,
+                        output={
+                            "doc_id": entry.doc_id,
+                            "removed": True,
+                            "chunks_deleted": len(entry.chunk_ids),
+                        },
+                    ))
+        finally:
+            if self.manifest:
+                await self.manifest.save_async(collection_name)
 
         logger.info(
             f"[RAGDocumentLoader] Scan terminé - "
             f"Fichiers traités: {len(results)}, "
-            f"Succès: {sum(1 for r in results.values() if r.success)}"
+            f"Succès: {sum(1 for r in results.values() if r.success)}, "
+            f"Inchangés: {sum(1 for r in results.values() if r.output.get('unchanged'))}"
         )
 
         return results
 
+    @staticmethod
+    async def _run_stage(workers: List, downstream: asyncio.Queue, consumers: int) -> None:
+        """Attend la fin d'un étage puis signale la fin à chaque consommateur suivant."""
+        await asyncio.gather(*workers)
+        for _ in range(consumers):
+            await downstream.put(None)
+
+    @staticmethod
+    def _next_files(paths: Iterator[Path], extensions: Set[str], limit: int) -> List[Path]:
+        batch = []
+        for file_path in paths:
+            if file_path.suffix.lower() in extensions and file_path.is_file():
+                batch.append(file_path)
+                if len(batch) >= limit:
+                    break
+        return batch
+
+    async def _prepare_file(
+        self,
+        file_path: Path,
+        directory: Path,
+        collection_name: str,
+        metadata: Dict,
+        full_reindex: bool,
+    ) -> AgentExecutionResult | _ParsedFile:
+        """
+        Étage 2: saute le fichier s'il n'a pas changé depuis le manifeste,
+        sinon le parse (sauf format streamé).
+        """
+        path_key = str(file_path)
+        stat = await asyncio.to_thread(file_path.stat)
+        previous = None
+        content_hash = ""
+
+        if self.manifest:
+            previous = self.manifest.get(collection_name, path_key)
+            unchanged_stat = previous and (previous.mtime, previous.size) == (
+                stat.st_mtime, stat.st_size
+            )
+            if unchanged_stat and not full_reindex:
+                return self._unchanged_result(previous)
+
+            content_hash = await asyncio.to_thread(hash_file, path_key)
+            if previous and not full_reindex and previous.content_hash == content_hash:
+                previous.mtime = stat.st_mtime
+                return self._unchanged_result(previous)
+
+        # Formats streamés: parsing différé à l'étage 3, page par page
+        parsed = None
+        if not self.parser.supports_streaming(path_key):
+            parsed = await self._parse(path_key, dict(metadata))
+        return _ParsedFile(
+            file_path=path_key,
+            doc_id=file_path.relative_to(directory).as_posix(),
+            parsed=parsed,
+            stat=stat,
+            content_hash=content_hash,
+            previous_chunk_ids=previous.chunk_ids if previous else [],
+            metadata=dict(metadata),
+        )
+
+    async def _index_file(
+        self, item: _ParsedFile, collection_name: str, full_reindex: bool
+    ) -> AgentExecutionResult:
+        """
+        Étage 3: embedding + upsert, puis mise à jour du manifeste. Avec un
+        manifeste, les vecteurs de repli et le fallback mémoire du vector
+        store mettent le fichier en échec (``require_durable``).
+        """
+        require_durable = self.manifest is not None
+        try:
+            if item.parsed is None:
+                result = await self._index_stream(
+                    item.file_path,
+                    item.doc_id,
+                    item.metadata,
+                    collection_name,
+                    item.previous_chunk_ids,
+                    full_reindex,
+                    require_durable=require_durable,
+                )
+            else:
+                result = await self._index(
+                    item.file_path,
+                    item.doc_id,
+                    item.parsed,
+                    collection_name,
+                    previous_chunk_ids=item.previous_chunk_ids,
+                    force_reembed=full_reindex,
+                    require_durable=require_durable,
+                )
+        except Exception as e:
+            return self._failure(e)
+
+        if self.manifest:
+            self.manifest.set(
+                collection_name,
+                item.file_path,
+                ManifestEntry(
+                    mtime=item.stat.st_mtime,
+                    size=item.stat.st_size,
+                    content_hash=item.content_hash,
+                    doc_id=item.doc_id,
+                    chunk_ids=list(result.output["chunk_ids"]),
+                ),
+            )
+        return result
+
+    def _removed_entries(
+        self,
+        collection_name: str,
+        directory: Path,
+        recursive: bool,
+        seen: set,
+    ) -> List[tuple]:
+        """Entrées du manifeste situées dans le périmètre scanné mais absentes du disque."""
+        removed = []
+        for path_key, entry in self.manifest.entries(collection_name).items():
+            if path_key in seen:
+                continue
+            path = Path(path_key)
+            in_scope = directory in path.parents if recursive else path.parent == directory
+            if in_scope and not path.exists():
+                removed.append((path_key, entry))
+        return removed
+
+    @staticmethod
+    def _unchanged_result(entry: ManifestEntry) -> AgentExecutionResult:
+        return AgentExecutionResult(
+            success=True,
+            output={
+                "doc_id": entry.doc_id,
+                "chunks_created": len(entry.chunk_ids),
+                "chunk_ids": entry.chunk_ids,
+                "unchanged": True,
+            },
+        )
+
     def get_supported_formats(self) -> List[str]:
         """Retourne la liste des formats supportés"""
         return [fmt.value for fmt in DocumentFormat if fmt != DocumentFormat.UNKNOWN]
@@ -1,13 +1,17 @@
 """RAG.Indexer Agent - Document chunking and embedding generation."""
 from __future__ import annotations
 
+import asyncio
 import hashlib
-from typing import Any, Dict, List
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, List
 
 from models import AgentExecutionRequest, AgentExecutionResult
+from services.document_parser import DocumentSection
 from services.ollama import OllamaService
 from services.vector_store import VectorStoreService
 
+from .chunking import ChunkingStrategy, LengthUnit, TextChunk, create_chunker
+
 
 class DocumentChunk:
     """Represents a chunk of a document with metadata."""
@@ -18,16 +22,41 @@ class DocumentChunk:
         doc_id: str,
         chunk_index: int,
         metadata: Dict[str, Any] | None = None,
+        occurrence: int = 0,
+        page_start: int | None = None,
+        page_end: int | None = None,
     ):
         self.content = content
         self.doc_id = doc_id
         self.chunk_index = chunk_index
         self.metadata = metadata or {}
+        self.occurrence = occurrence
+        self.page_start = page_start
+        self.page_end = page_end
         self.chunk_id = self._generate_chunk_id()
 
+    def to_payload(self) -> Dict[str, Any]:
+        """Vector store payload: chunk fields, page provenance and document metadata."""
+        payload = {
+            "content": self.content,
+            "doc_id": self.doc_id,
+            "chunk_index": self.chunk_index,
+            **self.metadata,
+        }
+        if self.page_start is not None:
+            payload["page_start"] = self.page_start
+            payload["page_end"] = self.page_end
+        return payload
+
     def _generate_chunk_id(self) -> str:
-        """Generate unique ID for this chunk."""
-        raw = f"{self.doc_id}:{self.chunk_index}:{self.content[:50]}"
+        """
+        Generate a content-addressed ID for this chunk.
+
+        The ID depends on the document and the chunk text, not on its
+        position, so editing one passage leaves the IDs of unchanged chunks
+        intact. ``occurrence`` disambiguates identical chunks within a document.
+        """
+        raw = f"{self.doc_id}:{self.occurrence}:{self.content}"
         return hashlib.sha256(raw.encode()).hexdigest()[:16]
 
 
@@ -37,8 +66,8 @@ class RAGIndexerAgent:
 
     Capabilities:
     - Split documents into semantic chunks
-    - Generate embeddings using Ollama
-    - Store chunks in Qdrant vector store
+    - Generate embeddings using Ollama (batched)
+    - Store chunks in Qdrant vector store (bulk upserts)
     - Handle metadata and provenance
     """
 
@@ -48,11 +77,21 @@ class RAGIndexerAgent:
         vector_store: VectorStoreService,
         chunk_size: int = 512,
         chunk_overlap: int = 128,
+        embed_batch_size: int = 32,
+        max_concurrent_batches: int = 4,
+        chunking_strategy: ChunkingStrategy = "window",
+        length_unit: LengthUnit = "chars",
     ):
         self.ollama = ollama_service
         self.vector_store = vector_store
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.chunking_strategy = chunking_strategy
+        self.length_unit = length_unit
+        # Fails fast on an invalid combination (window + tokens)
+        self._new_chunker()
         self.collection_name = "documents"
 
     async def execute(self, request: AgentExecutionRequest) -> AgentExecutionResult:
@@ -63,15 +102,29 @@ class RAGIndexerAgent:
         - content: str - Document content to index
         - doc_id: str - Unique document identifier
         - metadata: dict - Optional metadata (source, author, date, etc.)
+        - collection_name: str - Target collection (default: "documents")
+        - previous_chunk_ids: list[str] - Chunk IDs from a previous indexing of
+          this document. Chunks still present are not re-embedded (only
+          their position and metadata payload is refreshed), and points for
+          chunks that disappeared are deleted.
+        - force_reembed: bool - Re-embed every chunk, even unchanged ones
+        - require_durable: bool - Fail instead of storing fallback embeddings
+          or keeping points in the vector store's memory fallback
 
         Returns:
         - chunks_created: int
         - chunk_ids: list[str]
+        - chunks_embedded: int - Chunks actually embedded and upserted
+        - chunks_deleted: int - Stale points removed
         - embedding_model: str
         """
         content = request.payload.get("content", "")
         doc_id = request.payload.get("doc_id", "unknown")
         metadata = request.payload.get("metadata", {})
+        collection_name = request.payload.get("collection_name") or self.collection_name
+        previous_chunk_ids = set(request.payload.get("previous_chunk_ids") or [])
+        force_reembed = bool(request.payload.get("force_reembed"))
+        require_durable = bool(request.payload.get("require_durable"))
 
         if not content:
             return AgentExecutionResult(
@@ -81,41 +134,16 @@ class RAGIndexerAgent:
             )
 
         try:
-            # 1. Split document into chunks
-            chunks = self._chunk_document(content, doc_id, metadata)
-
-            # 2. Generate embeddings for each chunk
-            chunk_ids = []
-            for chunk in chunks:
-                embedding = await self.ollama.generate_embedding(
-                    text=chunk.content,
-                    model="nomic-embed-text:latest",
-                )
-
-                # 3. Store in vector store
-                point_id = await self.vector_store.upsert_point(
-                    collection_name=self.collection_name,
-                    point_id=chunk.chunk_id,
-                    vector=embedding,
-                    payload={
-                        "content": chunk.content,
-                        "doc_id": chunk.doc_id,
-                        "chunk_index": chunk.chunk_index,
-                        **chunk.metadata,
-                    },
-                )
-                chunk_ids.append(point_id)
-
-            return AgentExecutionResult(
-                success=True,
-                output={
-                    "chunks_created": len(chunks),
-                    "chunk_ids": chunk_ids,
-                    "embedding_model": "nomic-embed-text:latest",
-                    "doc_id": doc_id,
-                },
-                error=None,
+            output = await self.index_sections(
+                _single_section(content),
+                doc_id,
+                metadata,
+                collection_name=collection_name,
+                previous_chunk_ids=previous_chunk_ids,
+                force_reembed=force_reembed,
+                require_durable=require_durable,
             )
+            return AgentExecutionResult(success=True, output=output, error=None)
 
         except Exception as e:
             return AgentExecutionResult(
@@ -124,43 +152,181 @@ class RAGIndexerAgent:
                 error=f"Indexing failed: {str(e)}",
             )
 
+    async def index_sections(
+        self,
+        sections: AsyncIterable[DocumentSection],
+        doc_id: str,
+        metadata: Dict[str, Any] | None = None,
+        collection_name: str | None = None,
+        previous_chunk_ids: Iterable[str] = (),
+        force_reembed: bool = False,
+        require_durable: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Index a document streamed section by section (e.g. PDF pages).
+
+        Sections are chunked as they arrive and each full batch of
+        ``embed_batch_size`` new chunks is embedded and bulk-upserted right
+        away, so embedding overlaps with the extraction of later pages. At
+        most ``max_concurrent_batches`` batches are in flight; when they all
+        are, reading further sections waits.
+
+        ``metadata`` is shared by every chunk payload and must be complete
+        when the first section is yielded.
+
+        Chunks listed in ``previous_chunk_ids`` keep their vectors, but an
+        edit may have moved them: their payload (``chunk_index``, pages,
+        document metadata) is refreshed in one ``set_payloads`` call.
+
+        With ``require_durable``, fallback embeddings (Ollama unreachable) and
+        writes that only reach the vector store's memory fallback (upserts and
+        stale deletes) raise, so callers that record the result (the index
+        manifest) never record points that were not stored.
+
+        Returns the same output as ``execute``; raises on failure.
+        """
+        collection_name = collection_name or self.collection_name
+        metadata = metadata if metadata is not None else {}
+        previous_chunk_ids = set(previous_chunk_ids)
+        chunker = self._new_chunker()
+        seen: Dict[str, int] = {}
+        chunk_ids: List[str] = []
+        pending: List[DocumentChunk] = []
+        kept: List[DocumentChunk] = []
+        embedded = 0
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+
+                async def run_batch(batch: List[DocumentChunk]) -> None:
+                    try:
+                        await self._index_batch(batch, collection_name, require_durable)
+                    finally:
+                        slots.release()
+
+                async def take(pieces: List[TextChunk], final: bool = False) -> None:
+                    nonlocal pending, embedded
+                    for chunk in self._build_chunks(pieces, doc_id, metadata, seen, len(chunk_ids)):
+                        chunk_ids.append(chunk.chunk_id)
+                        if force_reembed or chunk.chunk_id not in previous_chunk_ids:
+                            pending.append(chunk)
+                        else:
+                            kept.append(chunk)
+                    while pending and (final or len(pending) >= self.embed_batch_size):
+                        batch = pending[: self.embed_batch_size]
+                        pending = pending[self.embed_batch_size :]
+                        embedded += len(batch)
+                        await slots.acquire()
+                        group.create_task(run_batch(batch))
+
+                async for section in sections:
+                    await take(chunker.feed(section.content, section.page_number))
+                await take(chunker.flush(), final=True)
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0] from errors
+
+        if not chunk_ids:
+            raise ValueError("No content provided for indexing")
+
+        if kept:
+            # Content unchanged, so the text (and the vector) stays as stored
+            refreshed = await self.vector_store.set_payloads(
+                collection_name,
+                {
+                    chunk.chunk_id: {
+                        key: value for key, value in chunk.to_payload().items() if key != "content"
+                    }
+                    for chunk in kept
+                },
+            )
+            if require_durable and not refreshed:
+                raise RuntimeError("Kept chunk payloads were only updated in the memory fallback")
+
+        # Drop points of chunks that no longer exist
+        stale_ids = previous_chunk_ids.difference(chunk_ids)
+        if stale_ids:
+            deleted = await self.vector_store.delete_points(collection_name, sorted(stale_ids))
+            if require_durable and not deleted:
+                raise RuntimeError("Stale points were only deleted from the memory fallback")
+
+        return {
+            "chunks_created": len(chunk_ids),
+            "chunk_ids": chunk_ids,
+            "chunks_embedded": embedded,
+            "chunks_deleted": len(stale_ids),
+            "embedding_model": "nomic-embed-text:latest",
+            "doc_id": doc_id,
+        }
+
+    async def _index_batch(
+        self, batch: List[DocumentChunk], collection_name: str, require_durable: bool = False
+    ) -> None:
+        """Embed one batch of chunks and upsert it in a single call."""
+        embeddings = await self.ollama.embed(
+            [chunk.content for chunk in batch], allow_fallback=not require_durable
+        )
+        if len(embeddings) != len(batch):
+            raise RuntimeError(
+                f"Expected {len(batch)} embeddings, got {len(embeddings)}"
+            )
+
+        stored = await self.vector_store.upsert_documents(
+            collection=collection_name,
+            vectors=[
+                {
+                    "id": chunk.chunk_id,
+                    "vector": embedding,
+                    "payload": chunk.to_payload(),
+                }
+                for chunk, embedding in zip(batch, embeddings, strict=True)
+            ],
+        )
+        if require_durable and not stored:
+            raise RuntimeError("Vector store kept the batch in its memory fallback only")
+
     def _chunk_document(
         self, content: str, doc_id: str, metadata: Dict[str, Any]
     ) -> List[DocumentChunk]:
-        """
-        Split document into overlapping chunks.
+        """Split document into overlapping chunks with the configured strategy."""
+        chunker = self._new_chunker()
+        pieces = chunker.feed(content) + chunker.flush()
+        return self._build_chunks(pieces, doc_id, metadata, seen={}, first_index=0)
 
-        Strategy: Simple sliding window with character-based chunking.
-        Future: Use sentence boundaries, paragraph detection, etc.
-        """
+    def _new_chunker(self):
+        return create_chunker(
+            self.chunking_strategy, self.chunk_size, self.chunk_overlap, self.length_unit
+        )
+
+    @staticmethod
+    def _build_chunks(
+        pieces: List[TextChunk],
+        doc_id: str,
+        metadata: Dict[str, Any],
+        seen: Dict[str, int],
+        first_index: int,
+    ) -> List[DocumentChunk]:
+        """Turn chunker output into DocumentChunks, numbering repeated texts via ``seen``."""
         chunks = []
-        start = 0
-        chunk_index = 0
-
-        while start < len(content):
-            end = start + self.chunk_size
-            chunk_content = content[start:end]
-
-            # Avoid breaking words - find last space
-            if end < len(content):
-                last_space = chunk_content.rfind(" ")
-                if last_space > 0:
-                    chunk_content = chunk_content[:last_space]
-                    end = start + last_space
-
-            chunk = DocumentChunk(
-                content=chunk_content.strip(),
-                doc_id=doc_id,
-                chunk_index=chunk_index,
-                metadata=metadata,
+        for offset, piece in enumerate(pieces):
+            occurrence = seen.get(piece.content, 0)
+            seen[piece.content] = occurrence + 1
+            chunks.append(
+                DocumentChunk(
+                    content=piece.content,
+                    doc_id=doc_id,
+                    chunk_index=first_index + offset,
+                    metadata=metadata,
+                    occurrence=occurrence,
+                    page_start=piece.page_start,
+                    page_end=piece.page_end,
+                )
             )
-            chunks.append(chunk)
+        return chunks
 
-            # Move to next chunk with overlap
-            start = end - self.chunk_overlap
-            chunk_index += 1
 
-        return chunks
+async def _single_section(content: str) -> AsyncIterator[DocumentSection]:
+    yield DocumentSection(content=content)
 
 
 async def create_rag_indexer_agent(
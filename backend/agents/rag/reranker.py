@@ -2,12 +2,17 @@
 Agent RAG Reranker - Réordonne les résultats de recherche par pertinence
 """
 
+import asyncio
+import hashlib
+import json
 import logging
-from typing import List, Dict, Optional
+import re
+from typing import Any, List, Dict, Optional
 from dataclasses import dataclass
 
 from models.agent import AgentExecutionRequest, AgentExecutionResult
 from services.ollama import OllamaService
+from services.search_cache import SearchCacheService
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +27,18 @@ class RerankResult:
     rerank_score: float
     final_score: float
     metadata: Dict
+    collection: str = ""
 
 
 class RAGRerankerAgent:
     """
     Agent qui réordonne les résultats de recherche sémantique
     en utilisant un LLM pour évaluer la pertinence contextuelle.
+
+    Les évaluations sont lancées en parallèle, bornées par un sémaphore
+    partagé par l'instance (aligné sur OLLAMA_NUM_PARALLEL), si bien que
+    reranker 20 résultats coûte environ ``20 / max_concurrency`` appels LLM
+    au lieu de 20 appels séquentiels.
     """
 
     def __init__(
@@ -36,6 +47,11 @@ class RAGRerankerAgent:
         model: str = "qwen2.5:14b",
         weight_original: float = 0.3,
         weight_rerank: float = 0.7,
+        max_concurrency: int = 4,
+        score_timeout: float = 15.0,
+        max_candidates: Optional[int] = 20,
+        listwise_batch_size: int = 0,
+        score_cache: Optional[SearchCacheService] = None,
     ):
         """
         Args:
@@ -43,11 +59,25 @@ class RAGRerankerAgent:
             model: Modèle à utiliser pour le reranking
             weight_original: Poids du score de recherche vectorielle (0-1)
             weight_rerank: Poids du score de reranking LLM (0-1)
+            max_concurrency: Appels LLM simultanés max (OLLAMA_NUM_PARALLEL)
+            score_timeout: Délai max d'un appel LLM (secondes), score neutre au-delà
+            max_candidates: Seuls les N meilleurs résultats vectoriels sont évalués
+                par le LLM, les suivants sont rendus après eux (None = tous)
+            listwise_batch_size: Si > 1, évalue ce nombre de passages par prompt
+                (mode listwise) au lieu d'un prompt par passage
+            score_cache: Cache des scores LLM, clé (hash requête, chunk_id, modèle).
+                Partagé entre utilisateurs et sessions (None = pas de cache)
         """
         self.ollama = ollama_service
         self.model = model
         self.weight_original = weight_original
         self.weight_rerank = weight_rerank
+        self.max_concurrency = max(1, max_concurrency)
+        self.score_timeout = score_timeout
+        self.max_candidates = max_candidates
+        self.listwise_batch_size = listwise_batch_size
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.score_cache = score_cache
         self.name = "RAG Reranker"
         self.description = "Réordonne les résultats de recherche par pertinence contextuelle"
 
@@ -89,15 +119,16 @@ class RAGRerankerAgent:
 
             logger.info(f"[RAGReranker] Reranking {len(results)} résultats pour: {query[:50]}...")
 
-            # Reranker chaque résultat
-            reranked = []
-            for result in results:
-                rerank_score = await self._compute_relevance_score(
-                    query=query,
-                    content=result.get("content", ""),
-                    metadata=result.get("metadata", {})
-                )
+            # Coupure anticipée: seuls les meilleurs candidats vectoriels passent au LLM
+            ordered = sorted(results, key=lambda r: r.get("score", 0.5), reverse=True)
+            cutoff = self.max_candidates if self.max_candidates else len(ordered)
+            candidates, skipped = ordered[:cutoff], ordered[cutoff:]
+
+            # Évaluer les candidats en parallèle (sémaphore + timeout par appel)
+            rerank_scores = await self._score_candidates(query, candidates)
 
+            reranked = []
+            for result, rerank_score in zip(candidates, rerank_scores, strict=True):
                 original_score = result.get("score", 0.5)
 
                 # Combiner les scores
@@ -106,18 +137,14 @@ class RAGRerankerAgent:
                     self.weight_rerank * rerank_score
                 )
 
-                reranked.append(RerankResult(
-                    doc_id=result.get("doc_id", ""),
-                    chunk_id=result.get("chunk_id", result.get("id", "")),
-                    content=result.get("content", ""),
-                    original_score=original_score,
-                    rerank_score=rerank_score,
-                    final_score=final_score,
-                    metadata=result.get("metadata", {})
-                ))
-
-            # Trier par score final décroissant
+                reranked.append(self._to_rerank_result(result, rerank_score, final_score))
+
+            # Trier par score final décroissant, les candidats non évalués ensuite
             reranked.sort(key=lambda x: x.final_score, reverse=True)
+            reranked.extend(
+                self._to_rerank_result(result, result.get("score", 0.5), result.get("score", 0.5))
+                for result in skipped
+            )
 
             # Limiter à top_k si spécifié
             if top_k and top_k > 0:
@@ -133,6 +160,7 @@ class RAGRerankerAgent:
                     "rerank_score": r.rerank_score,
                     "final_score": r.final_score,
                     "metadata": r.metadata,
+                    "collection": r.collection,
                 }
                 for r in reranked
             ]
@@ -163,44 +191,139 @@ class RAGRerankerAgent:
                 error=f"Reranking échoué: {str(e)}"
             )
 
+    async def _score_candidates(self, query: str, candidates: List[Dict]) -> List[float]:
+        """Scores LLM des candidats, en parallèle, dans l'ordre des candidats."""
+        if self.listwise_batch_size > 1:
+            # Seuls les passages absents du cache sont envoyés au LLM
+            scores = [self._get_cached_score(query, result) for result in candidates]
+            misses = [i for i, score in enumerate(scores) if score is None]
+            groups = [
+                misses[i:i + self.listwise_batch_size]
+                for i in range(0, len(misses), self.listwise_batch_size)
+            ]
+            group_scores = await asyncio.gather(*(
+                self._compute_listwise_scores(query, [candidates[i] for i in group])
+                for group in groups
+            ))
+            for group, computed in zip(groups, group_scores, strict=True):
+                for i, score in zip(group, computed, strict=True):
+                    scores[i] = score
+            return scores
+
+        return list(await asyncio.gather(*(
+            self._compute_relevance_score(
+                query=query,
+                content=result.get("content", ""),
+                metadata=result.get("metadata", {}),
+                chunk_id=self._chunk_key(result),
+            )
+            for result in candidates
+        )))
+
+    @staticmethod
+    def _chunk_key(result: Dict) -> str:
+        """Identifiant stable du passage: chunk_id, sinon hash du contenu."""
+        chunk_id = result.get("chunk_id") or result.get("id")
+        if chunk_id:
+            return str(chunk_id)
+        return hashlib.sha256(result.get("content", "").encode()).hexdigest()[:16]
+
+    def _get_cached_score(self, query: str, result: Dict) -> Optional[float]:
+        if self.score_cache is None:
+            return None
+        return self.score_cache.get(query, chunk_id=self._chunk_key(result), model=self.model)
+
+    def _cache_score(self, query: str, chunk_id: str, score: float) -> None:
+        if self.score_cache is not None:
+            self.score_cache.set(query, score, chunk_id=chunk_id, model=self.model)
+
+    async def _generate(self, prompt: str, num_predict: int) -> str:
+        """Appel LLM borné par le sémaphore partagé et le timeout par appel."""
+        async with self._semaphore:
+            return await asyncio.wait_for(
+                self.ollama.generate(
+                    model=self.model,
+                    prompt=prompt,
+                    options={
+                        "temperature": 0.1,  # Faible pour cohérence
+                        "num_predict": num_predict,  # Court pour vitesse
+                    }
+                ),
+                timeout=self.score_timeout,
+            )
+
+    async def _compute_listwise_scores(self, query: str, results: List[Dict]) -> List[float]:
+        """
+        Évalue plusieurs passages en un seul prompt.
+
+        Le LLM doit répondre par une liste JSON de scores, un par passage.
+        En cas de réponse inexploitable, tous les passages reçoivent le score neutre.
+        """
+        try:
+            prompt = self._build_listwise_prompt(query, results)
+            response = await self._generate(prompt, num_predict=16 * len(results))
+            scores = self._parse_listwise_scores(response, len(results))
+            if scores is not None:
+                for result, score in zip(results, scores, strict=True):
+                    self._cache_score(query, self._chunk_key(result), score)
+                return scores
+            logger.warning(f"[RAGReranker] Réponse listwise inexploitable: {response[:100]}")
+        except TimeoutError:
+            logger.warning(f"[RAGReranker] Timeout listwise ({self.score_timeout}s)")
+        except Exception as e:
+            logger.error(f"[RAGReranker] Erreur calcul scores listwise: {e}")
+        return [0.5] * len(results)
+
     async def _compute_relevance_score(
         self,
         query: str,
         content: str,
-        metadata: Dict
+        metadata: Dict,
+        chunk_id: Optional[str] = None,
     ) -> float:
         """
         Calcule un score de pertinence entre 0 et 1 en utilisant un LLM.
 
+        Le score est d'abord cherché dans ``score_cache``; seuls les scores
+        réellement produits par le LLM y sont stockés (pas les scores neutres
+        de repli).
+
         Args:
             query: Question de l'utilisateur
             content: Contenu du document
             metadata: Métadonnées du document
+            chunk_id: Identifiant du passage pour le cache (défaut: hash du contenu)
 
         Returns:
             Score de pertinence entre 0.0 et 1.0
         """
+        chunk_id = chunk_id or self._chunk_key({"content": content})
+        if self.score_cache is not None:
+            cached = self.score_cache.get(query, chunk_id=chunk_id, model=self.model)
+            if cached is not None:
+                return cached
+
         try:
             # Construire le prompt pour évaluation de pertinence
             prompt = self._build_relevance_prompt(query, content, metadata)
 
             # Requête au LLM
-            response = await self.ollama.generate(
-                model=self.model,
-                prompt=prompt,
-                options={
-                    "temperature": 0.1,  # Faible pour cohérence
-                    "num_predict": 100,  # Court pour vitesse
-                }
-            )
+            response = await self._generate(prompt, num_predict=100)
 
-            # Extraire et parser le score
+            # Extraire et parser le score (le repli neutre n'est pas mis en cache)
             score = self._parse_relevance_score(response)
+            if score is None:
+                logger.warning(f"[RAGReranker] Impossible de parser score: {response[:100]}")
+                return 0.5
+            self._cache_score(query, chunk_id, score)
 
             logger.debug(f"[RAGReranker] Score calculé: {score:.3f}")
 
             return score
 
+        except TimeoutError:
+            logger.warning(f"[RAGReranker] Timeout calcul score ({self.score_timeout}s)")
+            return 0.5
         except Exception as e:
             logger.error(f"[RAGReranker] Erreur calcul score: {e}")
             # Score neutre en cas d'erreur
@@ -230,14 +353,73 @@ Réponds uniquement avec le score numérique (ex: 0.75)"""
 
         return prompt
 
-    def _parse_relevance_score(self, response: str) -> float:
+    def _build_listwise_prompt(self, query: str, results: List[Dict]) -> str:
+        """Construit un prompt évaluant plusieurs passages à la fois"""
+        passages = []
+        for position, result in enumerate(results, start=1):
+            content = result.get("content", "")
+            content_preview = content[:500] + ("..." if len(content) > 500 else "")
+            title = result.get("metadata", {}).get("title", "Document sans titre")
+            passages.append(f"[{position}] {title}\n{content_preview}")
+
+        passages_text = "\n\n".join(passages)
+
+        return (
+            "Évalue la pertinence de chaque passage par rapport à la question.\n\n"
+            f"Question: {query}\n\n"
+            f"Passages:\n{passages_text}\n\n"
+            "Pour chaque passage, donne un score de pertinence entre 0.0 (hors sujet) "
+            "et 1.0 (répond directement).\n"
+            f"Réponds uniquement avec une liste JSON de {len(results)} scores "
+            "dans l'ordre des passages (ex: [0.8, 0.1])"
+        )
+
+    def _parse_listwise_scores(self, response: str, expected: int) -> Optional[List[float]]:
+        """Extrait la liste de scores d'une réponse listwise, None si inexploitable"""
+        match = re.search(r"\[[^\]]*\]", response)
+        candidates: List[Any] = []
+        if match:
+            try:
+                candidates = json.loads(match.group(0))
+            except json.JSONDecodeError:
+                candidates = []
+        if len(candidates) != expected:
+            candidates = re.findall(r"\d*\.\d+|\d+", response)
+        if len(candidates) != expected:
+            return None
+
+        scores = []
+        for value in candidates:
+            try:
+                score = float(value)
+            except (TypeError, ValueError):
+                return None
+            if score > 1.0:
+                score = score / 10.0  # Ex: 7.5 -> 0.75
+            scores.append(min(max(score, 0.0), 1.0))
+        return scores
+
+    def _to_rerank_result(
+        self, result: Dict, rerank_score: float, final_score: float
+    ) -> RerankResult:
+        return RerankResult(
+            doc_id=result.get("doc_id", ""),
+            chunk_id=result.get("chunk_id", result.get("id", "")),
+            content=result.get("content", ""),
+            original_score=result.get("score", 0.5),
+            rerank_score=rerank_score,
+            final_score=final_score,
+            metadata=result.get("metadata", {}),
+            collection=result.get("collection", ""),
+        )
+
+    def _parse_relevance_score(self, response: str) -> Optional[float]:
         """
         Parse le score de pertinence depuis la réponse du LLM.
 
-        Recherche un nombre décimal entre 0 et 1.
+        Recherche un nombre décimal entre 0 et 1, sinon des mots-clés de
+        pertinence. None si la réponse est inexploitable.
         """
-        import re
-
         # Nettoyer la réponse
         response = response.strip().lower()
 
@@ -268,6 +450,4 @@ Réponds uniquement avec le score numérique (ex: 0.75)"""
         elif any(word in response for word in ["pas pertinent", "not relevant", "hors sujet"]):
             return 0.2
 
-        # Score neutre par défaut
-        logger.warning(f"[RAGReranker] Impossible de parser score: {response[:100]}")
-        return 0.5
+        return None
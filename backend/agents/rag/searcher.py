@@ -1,12 +1,22 @@
 """RAG.Searcher Agent - Hybrid search with vector similarity and keyword matching."""
 from __future__ import annotations
 
-from typing import Any, Dict, List
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import numpy as np
 
 from models import AgentExecutionRequest, AgentExecutionResult
 from services.ollama import OllamaService
 from services.vector_store import VectorStoreService
 
+# Payload fields kept out of result metadata: chunk fields returned on their
+# own, and owner fields of chunks shared between users (owner list, and the
+# uploader details stored by older uploads)
+HIDDEN_PAYLOAD_FIELDS = frozenset(
+    {"content", "doc_id", "chunk_index", "user_id", "username", "filename"}
+)
+
 
 class SearchResult:
     """Represents a search result with score and metadata."""
@@ -18,22 +28,40 @@ class SearchResult:
         doc_id: str,
         chunk_index: int,
         metadata: Dict[str, Any],
+        chunk_id: str = "",
+        vector_score: Optional[float] = None,
+        keyword_score: Optional[float] = None,
+        collection: str = "",
+        vector: Optional[List[float]] = None,
     ):
         self.content = content
         self.score = score
         self.doc_id = doc_id
         self.chunk_index = chunk_index
         self.metadata = metadata
+        self.chunk_id = chunk_id
+        self.vector_score = vector_score
+        self.keyword_score = keyword_score
+        self.collection = collection
+        # Used for diversity re-ranking only, never serialized
+        self.vector = vector
 
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary for JSON serialization."""
-        return {
+        result = {
             "content": self.content,
             "score": self.score,
             "doc_id": self.doc_id,
             "chunk_index": self.chunk_index,
+            "chunk_id": self.chunk_id,
             "metadata": self.metadata,
+            "collection": self.collection,
         }
+        if self.vector_score is not None:
+            result["vector_score"] = self.vector_score
+        if self.keyword_score is not None:
+            result["keyword_score"] = self.keyword_score
+        return result
 
 
 class RAGSearcherAgent:
@@ -42,8 +70,14 @@ class RAGSearcherAgent:
 
     Capabilities:
     - Semantic search using vector similarity
-    - Keyword filtering
-    - Result ranking and deduplication
+    - BM25 keyword search (error codes, project ids...), run concurrently
+      and fused with the vector ranking by reciprocal rank fusion (RRF)
+    - Metadata filtering
+    - Fan-out over several collections (one query embedding, searches run
+      concurrently, scores normalized per collection before merging)
+    - Over-fetching, chunk-level deduplication and maximal marginal
+      relevance (MMR) re-ranking, so callers get ``top_k`` diverse chunks
+      from a single backend query
     - Citation extraction
     """
 
@@ -53,11 +87,32 @@ class RAGSearcherAgent:
         vector_store: VectorStoreService,
         top_k: int = 5,
         score_threshold: float = 0.7,
+        hybrid: bool = True,
+        rrf_k: int = 60,
+        fusion_depth: int = 20,
+        overfetch_factor: int = 4,
+        diversify: bool = True,
+        mmr_lambda: float = 0.7,
     ):
+        """
+        Args:
+            hybrid: Fuse BM25 and vector rankings (False = vector only)
+            rrf_k: RRF constant, a result at rank r scores 1 / (rrf_k + r) per list
+            fusion_depth: Candidates fetched from each retriever before fusion
+            overfetch_factor: Candidates fetched per collection = top_k * factor
+            diversify: Re-rank candidates with MMR (False = by score only)
+            mmr_lambda: MMR trade-off, 1 = relevance only, 0 = diversity only
+        """
         self.ollama = ollama_service
         self.vector_store = vector_store
         self.top_k = top_k
         self.score_threshold = score_threshold
+        self.hybrid = hybrid
+        self.rrf_k = rrf_k
+        self.fusion_depth = fusion_depth
+        self.overfetch_factor = max(1, overfetch_factor)
+        self.diversify = diversify
+        self.mmr_lambda = mmr_lambda
         self.collection_name = "documents"
 
     async def execute(self, request: AgentExecutionRequest) -> AgentExecutionResult:
@@ -68,6 +123,18 @@ class RAGSearcherAgent:
         - query: str - Search query
         - top_k: int (optional) - Number of results to return
         - filters: dict (optional) - Metadata filters (e.g., {"doc_id": "doc123"})
+        - query_embedding: list[float] (optional) - Precomputed query embedding
+        - hybrid: bool (optional) - Override the agent's hybrid setting
+        - collections: list[str] (optional) - Collections to search
+          (default: ``collection_name``, or the agent's collection)
+        - diversify: bool, mmr_lambda: float (optional) - Override MMR settings
+
+        In hybrid mode, ``score`` is the RRF score normalized to [0, 1]
+        (1 = first in every list); ``vector_score`` (cosine) and
+        ``keyword_score`` (BM25) are kept when the result came from that list.
+        Across several collections, scores are divided by the best score of
+        their collection, so that a collection whose scores run higher (denser
+        embeddings, longer chunks) does not crowd out the others.
 
         Returns:
         - results: list[SearchResult]
@@ -77,6 +144,10 @@ class RAGSearcherAgent:
         query = request.payload.get("query", "")
         top_k = request.payload.get("top_k", self.top_k)
         filters = request.payload.get("filters", {})
+        hybrid = request.payload.get("hybrid", self.hybrid)
+        collections = self._requested_collections(request.payload)
+        diversify = request.payload.get("diversify", self.diversify)
+        mmr_lambda = request.payload.get("mmr_lambda", self.mmr_lambda)
 
         if not query:
             return AgentExecutionResult(
@@ -85,74 +156,209 @@ class RAGSearcherAgent:
                 error="No query provided for search",
             )
 
+        keyword_tasks: Dict[str, asyncio.Future] = {}
         try:
-            # 1. Generate query embedding
-            query_embedding = await self.ollama.generate_embedding(
-                text=query,
-                model="nomic-embed-text:latest",
-            )
+            depth = top_k * self.overfetch_factor
+            if hybrid:
+                depth = max(depth, self.fusion_depth)
+            # BM25 runs while the query is embedded and the vectors searched
+            if hybrid:
+                keyword_tasks = {
+                    collection: asyncio.ensure_future(
+                        self.vector_store.keyword_search(
+                            collection_name=collection,
+                            query=query,
+                            top_k=depth,
+                            filters=filters,
+                        )
+                    )
+                    for collection in collections
+                }
 
-            # 2. Search vector store
-            search_results = await self.vector_store.search(
-                collection_name=self.collection_name,
-                query_vector=query_embedding,
-                top_k=top_k,
-                score_threshold=self.score_threshold,
-                filters=filters,
-            )
+            # 1. Generate query embedding once (unless the caller already has it)
+            query_embedding = request.payload.get("query_embedding")
+            if not query_embedding:
+                query_embedding = await self.ollama.generate_embedding(
+                    text=query,
+                    model="nomic-embed-text:latest",
+                )
 
-            # 3. Convert to SearchResult objects
-            results = []
-            for result in search_results:
-                search_result = SearchResult(
-                    content=result["payload"]["content"],
-                    score=result["score"],
-                    doc_id=result["payload"]["doc_id"],
-                    chunk_index=result["payload"]["chunk_index"],
-                    metadata={
-                        k: v
-                        for k, v in result["payload"].items()
-                        if k not in ["content", "doc_id", "chunk_index"]
-                    },
+            # 2. Search every collection at once
+            vector_hits = await asyncio.gather(
+                *(
+                    self.vector_store.search(
+                        collection_name=collection,
+                        query_vector=query_embedding,
+                        top_k=depth,
+                        score_threshold=self.score_threshold,
+                        filters=filters,
+                        with_vectors=diversify,
+                    )
+                    for collection in collections
                 )
-                results.append(search_result)
+            )
 
-            # 4. Deduplicate by doc_id (keep highest scoring chunk per doc)
-            deduplicated = self._deduplicate_results(results)
+            # 3. Convert to SearchResult objects (fused with BM25 in hybrid mode)
+            results: List[SearchResult] = []
+            for collection, hits in zip(collections, vector_hits, strict=True):
+                if hybrid:
+                    collection_results = self._fuse(hits, await keyword_tasks[collection])
+                else:
+                    collection_results = [self._to_result(hit, hit["score"]) for hit in hits]
+                for result in collection_results:
+                    result.collection = collection
+                if len(collections) > 1:
+                    self._normalize_scores(collection_results)
+                results.extend(collection_results)
+
+            # 4. Drop duplicate chunks, then pick top_k relevant and diverse ones
+            candidates = self._deduplicate_results(results)
+            if diversify:
+                selected = self._select_mmr(candidates, top_k, mmr_lambda)
+            else:
+                selected = candidates[:top_k]
 
             return AgentExecutionResult(
                 success=True,
                 output={
-                    "results": [r.to_dict() for r in deduplicated],
+                    "results": [r.to_dict() for r in selected],
                     "query_embedding_model": "nomic-embed-text:latest",
-                    "total_matches": len(deduplicated),
+                    "total_matches": len(selected),
                 },
                 error=None,
             )
 
         except Exception as e:
+            for task in keyword_tasks.values():
+                task.cancel()
             return AgentExecutionResult(
                 success=False,
                 output={},
                 error=f"Search failed: {str(e)}",
             )
 
+    def _requested_collections(self, payload: Dict[str, Any]) -> List[str]:
+        collections = payload.get("collections") or [
+            payload.get("collection_name") or self.collection_name
+        ]
+        # Order kept, duplicates dropped
+        return list(dict.fromkeys(collections))
+
+    @staticmethod
+    def _normalize_scores(results: List[SearchResult]) -> None:
+        """Divide scores by the best one, putting the collection on a [0, 1] scale."""
+        best = max((result.score for result in results), default=0.0)
+        if best > 0:
+            for result in results:
+                result.score /= best
+
+    def _fuse(
+        self, vector_hits: List[Dict[str, Any]], keyword_hits: List[Dict[str, Any]]
+    ) -> List[SearchResult]:
+        """
+        Reciprocal rank fusion of the vector and BM25 rankings.
+
+        Only ranks are combined, so cosine and BM25 scores need no
+        calibration against each other.
+        """
+        fused: Dict[str, Dict[str, Any]] = {}
+        for source, hits in (("vector_score", vector_hits), ("keyword_score", keyword_hits)):
+            for rank, hit in enumerate(hits, start=1):
+                entry = fused.setdefault(str(hit["id"]), {"hit": hit, "rrf": 0.0})
+                entry["rrf"] += 1.0 / (self.rrf_k + rank)
+                entry[source] = hit["score"]
+
+        lists = sum(1 for hits in (vector_hits, keyword_hits) if hits)
+        best = lists / (self.rrf_k + 1) if lists else 1.0
+        return [
+            self._to_result(
+                entry["hit"],
+                entry["rrf"] / best,
+                vector_score=entry.get("vector_score"),
+                keyword_score=entry.get("keyword_score"),
+            )
+            for entry in fused.values()
+        ]
+
+    @staticmethod
+    def _to_result(
+        hit: Dict[str, Any],
+        score: float,
+        vector_score: Optional[float] = None,
+        keyword_score: Optional[float] = None,
+    ) -> SearchResult:
+        payload = hit["payload"]
+        return SearchResult(
+            content=payload["content"],
+            score=score,
+            doc_id=payload["doc_id"],
+            chunk_index=payload["chunk_index"],
+            chunk_id=str(hit["id"]),
+            metadata={k: v for k, v in payload.items() if k not in HIDDEN_PAYLOAD_FIELDS},
+            vector_score=vector_score,
+            keyword_score=keyword_score,
+            vector=hit.get("vector"),
+        )
+
     def _deduplicate_results(self, results: List[SearchResult]) -> List[SearchResult]:
         """
-        Deduplicate results by doc_id, keeping the highest scoring chunk.
+        Deduplicate results by chunk text, keeping the highest scoring copy.
 
-        This prevents the same document from appearing multiple times
-        when multiple chunks match the query.
+        Identical chunks come from documents shared between collections or
+        from boilerplate repeated across documents. Several chunks of the
+        same document are kept: MMR decides whether they are redundant.
         """
-        seen_docs: Dict[str, SearchResult] = {}
+        seen_chunks: Dict[str, SearchResult] = {}
 
         for result in results:
-            doc_id = result.doc_id
-            if doc_id not in seen_docs or result.score > seen_docs[doc_id].score:
-                seen_docs[doc_id] = result
+            key = result.content
+            if key not in seen_chunks or result.score > seen_chunks[key].score:
+                seen_chunks[key] = result
 
         # Return sorted by score
-        return sorted(seen_docs.values(), key=lambda x: x.score, reverse=True)
+        return sorted(seen_chunks.values(), key=lambda x: x.score, reverse=True)
+
+    @staticmethod
+    def _select_mmr(
+        candidates: List[SearchResult], top_k: int, mmr_lambda: float
+    ) -> List[SearchResult]:
+        """
+        Maximal marginal relevance over the candidates' vectors.
+
+        Each step picks the candidate maximizing
+        ``lambda * relevance - (1 - lambda) * max cosine to the picked ones``.
+        Similarities are computed once as a matrix product and the max is
+        updated with one vector operation per pick. Candidates without a
+        vector (BM25-only hits) are never penalized as redundant.
+        """
+        if len(candidates) <= 1 or top_k <= 1:
+            return candidates[:top_k]
+
+        relevance = np.array([candidate.score for candidate in candidates], dtype=np.float32)
+        best = relevance.max()
+        if best > 0:
+            relevance /= best
+
+        dim = next((len(c.vector) for c in candidates if c.vector is not None), 0)
+        vectors = np.zeros((len(candidates), dim), dtype=np.float32)
+        for row, candidate in enumerate(candidates):
+            if candidate.vector is not None and len(candidate.vector) == dim:
+                vectors[row] = candidate.vector
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms > 0, norms, 1.0)
+        similarity = vectors @ vectors.T
+
+        redundancy = np.zeros(len(candidates), dtype=np.float32)
+        available = np.ones(len(candidates), dtype=bool)
+        picked: List[int] = []
+        for _ in range(min(top_k, len(candidates))):
+            mmr = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+            mmr[~available] = -np.inf
+            choice = int(np.argmax(mmr))
+            picked.append(choice)
+            available[choice] = False
+            np.maximum(redundancy, similarity[choice], out=redundancy)
+        return [candidates[row] for row in picked]
 
 
 async def create_rag_searcher_agent(
@@ -8,13 +8,26 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from agents import AgentRegistry, get_registry
+from config import get_settings
+from agents.rag.document_loader import RAGDocumentLoaderAgent
+from agents.rag.indexer import RAGIndexerAgent
+from agents.rag.reranker import RAGRerankerAgent
 from orchestrators import MasterOrchestrator
 from services import (
     AgentExecutor,
+    CircuitBreaker,
     DatabaseService,
+    DocumentParserService,
+    DocumentRegistryService,
+    HealthMonitor,
+    IndexManifestService,
+    IngestionJobService,
+    KeywordIndexService,
     MessagingService,
     MonitoringService,
     OllamaService,
+    SearchCacheService,
+    SingleFlight,
     VectorStoreService,
 )
 from models.user import User, UserStatus, TokenData
@@ -34,12 +47,115 @@ def get_agent_registry() -> AgentRegistry:
 
 @lru_cache
 def get_ollama_service() -> OllamaService:
-    return OllamaService()
+    settings = get_settings()
+    return OllamaService(
+        breaker=CircuitBreaker(
+            "ollama",
+            failure_threshold=settings.ollama_breaker_failure_threshold,
+            recovery_timeout=settings.ollama_breaker_recovery_seconds,
+        )
+    )
+
+
+@lru_cache
+def get_ollama_health() -> HealthMonitor:
+    ollama = get_ollama_service()
+    return HealthMonitor(
+        ollama.is_available,
+        ollama.breaker,
+        interval=get_settings().ollama_health_interval_seconds,
+    )
 
 
 @lru_cache
 def get_vector_store() -> VectorStoreService:
-    return VectorStoreService()
+    return VectorStoreService(keyword_index=KeywordIndexService(get_settings().keyword_index_path))
+
+
+@lru_cache
+def get_search_cache() -> SearchCacheService:
+    return SearchCacheService(
+        max_size=1000,
+        default_ttl=3600,
+        semantic_max_distance=get_settings().search_cache_semantic_max_distance,
+    )
+
+
+@lru_cache
+def get_search_flights() -> SingleFlight:
+    """Recherches en cours, partagées par les RAGCachedSearcherAgent créés par requête."""
+    return SingleFlight()
+
+
+@lru_cache
+def get_document_parser() -> DocumentParserService:
+    settings = get_settings()
+    return DocumentParserService(
+        executor=settings.document_parser_executor,
+        max_workers=settings.ingest_parse_workers,
+        inline_max_bytes=settings.document_parser_inline_max_bytes,
+    )
+
+
+@lru_cache
+def get_rag_indexer() -> RAGIndexerAgent:
+    settings = get_settings()
+    return RAGIndexerAgent(
+        get_ollama_service(),
+        get_vector_store(),
+        chunk_size=settings.chunk_size,
+        chunk_overlap=settings.chunk_overlap,
+        chunking_strategy=settings.chunking_strategy,
+        length_unit=settings.chunk_length_unit,
+    )
+
+
+@lru_cache
+def get_index_manifest() -> IndexManifestService:
+    return IndexManifestService(get_settings().index_manifest_dir)
+
+
+@lru_cache
+def get_document_registry() -> DocumentRegistryService:
+    return DocumentRegistryService(get_settings().document_registry_dir)
+
+
+@lru_cache
+def get_document_loader() -> RAGDocumentLoaderAgent:
+    settings = get_settings()
+    return RAGDocumentLoaderAgent(
+        get_document_parser(),
+        get_rag_indexer(),
+        get_index_manifest(),
+        parse_workers=settings.ingest_parse_workers,
+        index_workers=settings.ingest_index_workers,
+        queue_size=settings.ingest_queue_size,
+    )
+
+
+@lru_cache
+def get_ingestion_jobs() -> IngestionJobService:
+    settings = get_settings()
+    return IngestionJobService(
+        get_document_loader(),
+        storage_dir=settings.ingestion_jobs_dir,
+        max_concurrent_jobs=settings.ingestion_max_concurrent_jobs,
+    )
+
+
+@lru_cache
+def get_rerank_cache() -> SearchCacheService:
+    return SearchCacheService(max_size=10000, default_ttl=24 * 3600)
+
+
+@lru_cache
+def get_reranker() -> RAGRerankerAgent:
+    # Une seule instance: son sémaphore borne les appels LLM de tout le process
+    return RAGRerankerAgent(
+        get_ollama_service(),
+        max_concurrency=4,
+        score_cache=get_rerank_cache(),
+    )
 
 
 @lru_cache
@@ -32,6 +32,8 @@ from api.routes import (
 from agents import seed_default_agents
 from config import get_settings
 from models import AgentDomain, OrchestrationRequest
+from services.circuit_breaker import CircuitState
+from services.ollama import close_shared_clients
 
 logging.basicConfig(
     level=logging.INFO,
@@ -54,9 +56,23 @@ async def lifespan(app: FastAPI):
     # Initialize agents and orchestrator
     seed_default_agents()
     dependencies.get_master_orchestrator()
+
+    # Services partagés par les routes (pools de connexions, cache de recherche)
+    dependencies.get_search_cache()
+    dependencies.get_document_loader()
+    dependencies.get_ingestion_jobs()
+    dependencies.get_ollama_health().start()
     logger.info("✅ Système prêt")
 
     yield
+
+    await dependencies.get_ollama_health().stop()
+    await dependencies.get_ingestion_jobs().shutdown()
+    dependencies.get_document_parser().close()
+    await dependencies.get_ollama_service().aclose()
+    await close_shared_clients()
+    await dependencies.get_vector_store().aclose()
+    dependencies.get_vector_store().keyword_index.close()
     logger.info("🛑 AgenticAI V4 - Arrêt")
 
 
@@ -107,16 +123,37 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    """
+    État des dépendances lu dans leurs disjoncteurs, sans appel réseau:
+    Ollama est sondé en tâche de fond, Qdrant, Redis et Postgres d'après
+    l'issue de leurs derniers appels. Un disjoncteur qui n'a encore rien
+    observé donne "unknown": "ok" exige une preuve pour chaque dépendance.
+    """
+    circuits = {
+        "ollama": dependencies.get_ollama_service().breaker,
+        "postgres": dependencies.get_database_service().breaker,
+        "qdrant": dependencies.get_vector_store().breaker,
+        "redis": dependencies.get_messaging_service().breaker,
+    }
+    services = {
+        name: {
+            CircuitState.CLOSED: "up" if breaker.checked else "unknown",
+            CircuitState.HALF_OPEN: "recovering",
+            CircuitState.OPEN: "down",
+        }[breaker.state]
+        for name, breaker in circuits.items()
+    }
+    if all(state == "up" for state in services.values()):
+        status = "ok"
+    elif all(state in ("up", "unknown") for state in services.values()):
+        status = "unknown"
+    else:
+        status = "degraded"
     return {
-        "status": "degraded",
+        "status": status,
         "timestamp": datetime.utcnow().isoformat(),
-        "services": {
-            "api": "up",
-            "ollama": "pending",
-            "postgres": "pending",
-            "qdrant": "pending",
-            "redis": "pending",
-        },
+        "services": {"api": "up", **services},
+        "circuits": {name: breaker.snapshot() for name, breaker in circuits.items()},
     }
 
 
@@ -3,6 +3,7 @@ Route API pour le chat avec l'orchestrateur multi-agents
 """
 from __future__ import annotations
 
+from contextlib import aclosing
 from typing import Annotated
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException
@@ -11,7 +12,13 @@ from pydantic import BaseModel
 import uuid
 import json
 
-from api.dependencies import get_master_orchestrator, get_current_active_user, get_ollama_service
+from api.dependencies import (
+    get_current_active_user,
+    get_master_orchestrator,
+    get_ollama_health,
+    get_ollama_service,
+)
+from services.health_monitor import HealthMonitor
 from services.ollama import OllamaService
 from models import AgentDomain, OrchestrationRequest
 from models.user import User
@@ -37,7 +44,8 @@ class ChatResponse(BaseModel):
 async def send_message(
     current_user: Annotated[User, Depends(get_current_active_user)],
     message: ChatMessage,
-    ollama: Annotated[OllamaService, Depends(get_ollama_service)]
+    ollama: Annotated[OllamaService, Depends(get_ollama_service)],
+    health: Annotated[HealthMonitor, Depends(get_ollama_health)],
 ):
     """
     Envoie un message et retourne une réponse générée par Ollama.
@@ -71,8 +79,8 @@ Si on te demande des informations sur le système, explique ses capacités.
 Tu peux converser en français et en anglais."""
 
     try:
-        # Vérifier si Ollama est disponible
-        is_available = await ollama.is_available()
+        # État publié par le moniteur de santé: pas d'appel /api/tags par message
+        is_available = health.available
 
         if not is_available:
             # Fallback en mode démo si Ollama n'est pas disponible
@@ -107,7 +115,8 @@ Tu peux converser en français et en anglais."""
 async def stream_message(
     current_user: Annotated[User, Depends(get_current_active_user)],
     message: ChatMessage,
-    ollama: Annotated[OllamaService, Depends(get_ollama_service)]
+    ollama: Annotated[OllamaService, Depends(get_ollama_service)],
+    health: Annotated[HealthMonitor, Depends(get_ollama_health)],
 ):
     """
     Envoie un message et retourne une réponse en streaming.
@@ -142,8 +151,8 @@ Tu peux converser en français et en anglais."""
     async def generate_stream():
         """Générateur pour le streaming SSE"""
         try:
-            # Vérifier si Ollama est disponible
-            is_available = await ollama.is_available()
+            # État publié par le moniteur de santé: pas d'appel /api/tags par message
+            is_available = health.available
 
             if not is_available:
                 # Fallback message
@@ -151,17 +160,18 @@ Tu peux converser en français et en anglais."""
                 yield f"data: {json.dumps({'content': '', 'done': True})}\n\n"
                 return
 
-            # Streamer depuis Ollama
-            full_response = ""
-            async for chunk in ollama.generate_stream(
+            # Streamer depuis Ollama. Si le client se déconnecte, Starlette annule
+            # ce générateur et aclosing() ferme le flux Ollama immédiatement.
+            token_stream = ollama.generate_stream(
                 prompt=message.content,
                 system_prompt=system_prompt,
                 temperature=0.7,
                 max_tokens=2000
-            ):
-                full_response += chunk
-                # Envoyer le chunk au format SSE
-                yield f"data: {json.dumps({'content': chunk, 'done': False})}\n\n"
+            )
+            async with aclosing(token_stream):
+                async for chunk in token_stream:
+                    # Envoyer le chunk au format SSE
+                    yield f"data: {json.dumps({'content': chunk, 'done': False})}\n\n"
 
             # Signal de fin
             yield f"data: {json.dumps({'content': '', 'done': True, 'agent': 'ollama.qwen2.5'})}\n\n"
@@ -2,21 +2,52 @@
 Routes API pour la gestion des documents RAG
 """
 
-from typing import List, Optional, Dict, Any, Annotated
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Depends
+from typing import List, Optional, Dict, Any, Annotated, Tuple
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+import asyncio
+import hashlib
+import json
 import logging
 import tempfile
 from pathlib import Path
 
-from models.user import User
-from api.dependencies import get_current_active_user
+from models.user import User, UserRole
+from models.agent import AgentExecutionRequest
+from agents.rag.cached_searcher import RAGCachedSearcherAgent
+from agents.rag.document_loader import RAGDocumentLoaderAgent
+from agents.rag.reranker import RAGRerankerAgent
+from api.dependencies import (
+    get_current_active_user,
+    get_document_loader,
+    get_document_parser,
+    get_document_registry,
+    get_ingestion_jobs,
+    get_ollama_service,
+    get_rerank_cache,
+    get_reranker,
+    get_search_cache,
+    get_search_flights,
+    get_vector_store,
+)
+from config import get_settings
+from services.document_parser import DocumentParserService
+from services.document_registry import DocumentRegistryService, RegisteredDocument
+from services.ingestion_jobs import IngestionJob, IngestionJobService
+from services.ollama import OllamaService
+from services.search_cache import SearchCacheService
+from services.singleflight import SingleFlight
+from services.vector_store import VectorStoreService
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
 
+# Champs identifiant l'uploader, exclus des payloads de chunks partageables
+UPLOADER_PAYLOAD_FIELDS = ("username", "filename")
+
 
 # ============================================================================
 # Models
@@ -37,6 +68,9 @@ class DocumentUploadResponse(BaseModel):
     word_count: Optional[int] = None
     page_count: Optional[int] = None
     metadata: Dict[str, str]
+    content_hash: Optional[str] = None
+    # Contenu déjà indexé: ni parsing ni embedding, chunks existants réutilisés
+    reused: bool = False
 
 
 class DirectoryLoadRequest(BaseModel):
@@ -45,14 +79,32 @@ class DirectoryLoadRequest(BaseModel):
     collection_name: str = "documents"
     recursive: bool = True
     metadata: Optional[Dict[str, str]] = Field(default_factory=dict)
+    full_reindex: bool = False
 
 
-class DirectoryLoadResponse(BaseModel):
-    """Réponse après chargement de répertoire"""
-    files_processed: int
-    files_succeeded: int
-    files_failed: int
-    results: Dict[str, Any]
+class IngestionJobResponse(BaseModel):
+    """État d'un job d'ingestion de répertoire"""
+    job_id: str
+    directory_path: str
+    collection_name: str
+    user_id: Optional[str] = None
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    elapsed_seconds: float = 0.0
+    files_discovered: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    files_unchanged: int = 0
+    files_removed: int = 0
+    chunks_created: int = 0
+    chunks_embedded: int = 0
+    files_per_second: float = 0.0
+    chunks_per_second: float = 0.0
+    error_count: int = 0
+    errors: List[Dict[str, str]] = Field(default_factory=list)
+    error: Optional[str] = None
 
 
 class SearchRequest(BaseModel):
@@ -60,6 +112,8 @@ class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
     collection_name: str = "documents"
+    # Recherche sur plusieurs collections (remplace collection_name)
+    collections: Optional[List[str]] = None
     filters: Optional[Dict[str, str]] = None
     use_cache: bool = True
     enable_reranking: bool = False
@@ -71,7 +125,8 @@ class SearchResult(BaseModel):
     chunk_id: str
     content: str
     score: float
-    metadata: Dict[str, str]
+    metadata: Dict[str, Any]
+    collection: str = ""
 
 
 class SearchResponse(BaseModel):
@@ -92,15 +147,187 @@ class CacheStatsResponse(BaseModel):
     evictions: int
     expirations: int
     total_requests: int
+    semantic_size: int = 0
+    semantic_hits: int = 0
+    semantic_misses: int = 0
+    semantic_hit_rate: float = 0.0
+    rerank_cache: Optional[Dict] = None
+    embedding_cache: Optional[Dict] = None
+    # Appels coalescés (single-flight): recherches et textes vectorisés
+    coalescing: Optional[Dict] = None
+    # Micro-batching des embeddings: histogrammes taille de lot / file d'attente
+    embedding_batcher: Optional[Dict] = None
 
 
 # ============================================================================
 # Routes
 # ============================================================================
 
+async def _save_upload(
+    upload: UploadFile, max_bytes: int, chunk_bytes: int
+) -> Tuple[str, str, int]:
+    """
+    Copie l'upload dans un fichier temporaire par blocs de ``chunk_bytes``
+    en calculant son SHA-256 au passage: l'upload n'est jamais entier en mémoire.
+
+    Returns:
+        (chemin du fichier temporaire, hash du contenu, taille)
+
+    Raises:
+        HTTPException 413 au-delà de ``max_bytes``
+    """
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"Fichier trop volumineux (max {max_bytes // (1024 * 1024)} Mo)",
+    )
+    if upload.size is not None and upload.size > max_bytes:
+        raise too_large
+
+    digest = hashlib.sha256()
+    size = 0
+
+    def write_block(tmp_file, block: bytes) -> None:
+        digest.update(block)
+        tmp_file.write(block)
+
+    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(upload.filename).suffix)
+    try:
+        with tmp_file:
+            while block := await upload.read(chunk_bytes):
+                size += len(block)
+                if size > max_bytes:
+                    raise too_large
+                await asyncio.to_thread(write_block, tmp_file, block)
+    except BaseException:
+        Path(tmp_file.name).unlink(missing_ok=True)
+        raise
+
+    return tmp_file.name, digest.hexdigest(), size
+
+
+async def _reuse_document(
+    registry: DocumentRegistryService,
+    vector_store: VectorStoreService,
+    collection_name: str,
+    content_hash: str,
+    size: int,
+    user: User,
+    owner_metadata: Dict[str, Any],
+) -> Optional[DocumentUploadResponse]:
+    """
+    Réutilise un contenu déjà indexé au lieu de le parser et l'embedder.
+
+    - même collection: l'utilisateur est ajouté aux propriétaires et le
+      ``user_id`` des chunks devient la liste des propriétaires (les filtres
+      par utilisateur matchent un élément de la liste); 409 s'il en était
+      déjà propriétaire
+    - autre collection: les points sont recopiés avec leurs vecteurs, avec
+      l'utilisateur comme seul propriétaire
+
+    Les payloads ne portent aucune information propre à un propriétaire
+    hors ``user_id``: son nom de fichier et ses métadonnées
+    (``owner_metadata``) sont enregistrés dans le registre.
+
+    Returns:
+        None si le contenu n'est indexé nulle part (ou que ses points ont
+        disparu): il faut alors l'indexer
+    """
+    async with registry.lock(collection_name, content_hash):
+        existing = registry.get(collection_name, content_hash)
+        if existing is not None:
+            if user.id in existing.owners:
+                filename = existing.owner_metadata.get(user.id, {}).get("filename")
+                raise HTTPException(
+                    status_code=409, detail=f"Document déjà indexé: {filename or existing.doc_id}"
+                )
+            owners = existing.owners + [user.id]
+            await vector_store.set_payload(
+                collection_name, existing.chunk_ids, {"user_id": owners}
+            )
+            registry.add_owner(collection_name, content_hash, user.id, owner_metadata)
+            logger.info(
+                f"Document {existing.doc_id} partagé avec {user.id} ({len(owners)} propriétaires)"
+            )
+            return _upload_response(existing, user, content_hash, reused=True)
+
+    found = registry.find(content_hash)
+    if found is None:
+        return None
+    source_collection, source = found
+    if not registry.reserve(collection_name, content_hash):
+        raise HTTPException(status_code=409, detail="Document identique en cours d'indexation")
+
+    try:
+        points = await vector_store.retrieve_points(source_collection, source.chunk_ids)
+        if len(points) != len(source.chunk_ids):
+            registry.release(collection_name, content_hash)
+            return None
+        for point in points:
+            # Points indexés avant que l'uploader ne soit retiré des payloads
+            payload = {
+                key: value
+                for key, value in point["payload"].items()
+                if key not in UPLOADER_PAYLOAD_FIELDS
+            }
+            point["payload"] = {**payload, "user_id": user.id}
+        await vector_store.upsert_documents(collection_name, points)
+    except BaseException:
+        registry.release(collection_name, content_hash)
+        raise
+
+    document = RegisteredDocument(
+        content_hash=content_hash,
+        doc_id=source.doc_id,
+        filename=owner_metadata["filename"],
+        size=size,
+        user_id=user.id,
+        chunk_ids=list(source.chunk_ids),
+        format=source.format,
+        word_count=source.word_count,
+        page_count=source.page_count,
+        metadata=dict(source.metadata),
+        owner_metadata={user.id: owner_metadata},
+    )
+    registry.register(collection_name, document)
+    logger.info(
+        f"Document {source.doc_id} recopié de '{source_collection}' vers '{collection_name}'"
+    )
+    return _upload_response(document, user, content_hash, reused=True)
+
+
+def _shared_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Métadonnées de chunks communes à tous les propriétaires (sans ``user_id``)."""
+    return {key: value for key, value in metadata.items() if key != "user_id"}
+
+
+def _owner_view(document: RegisteredDocument, user_id: str) -> Dict[str, Any]:
+    """Métadonnées d'un document vues par un propriétaire: communes puis les siennes."""
+    return {**document.metadata, **document.owner_metadata.get(user_id, {})}
+
+
+def _upload_response(
+    document: RegisteredDocument, user: User, content_hash: str, reused: bool = False
+) -> DocumentUploadResponse:
+    metadata = _owner_view(document, user.id)
+    return DocumentUploadResponse(
+        doc_id=document.doc_id,
+        filename=metadata.get("filename", document.filename),
+        format=document.format,
+        chunks_created=len(document.chunk_ids),
+        word_count=document.word_count,
+        page_count=document.page_count,
+        metadata={key: str(value) for key, value in metadata.items()},
+        content_hash=content_hash,
+        reused=reused,
+    )
+
+
 @router.post("/upload", response_model=DocumentUploadResponse)
 async def upload_document(
     current_user: Annotated[User, Depends(get_current_active_user)],
+    loader: Annotated[RAGDocumentLoaderAgent, Depends(get_document_loader)],
+    registry: Annotated[DocumentRegistryService, Depends(get_document_registry)],
+    vector_store: Annotated[VectorStoreService, Depends(get_vector_store)],
     file: UploadFile = File(...),
     metadata: Optional[str] = None,
     collection_name: str = "documents"
@@ -110,64 +337,82 @@ async def upload_document(
 
     Supporte: PDF, DOCX, TXT, MD, HTML
 
+    Le fichier est copié sur disque par blocs (taille max ``upload_max_bytes``,
+    sinon 413) et haché pendant la copie. Un contenu déjà indexé est
+    réutilisé sans parsing ni embedding (voir ``_reuse_document``); le même
+    contenu uploadé deux fois par un utilisateur est refusé (409).
+
     Requiert authentification. Le document sera associé à l'utilisateur courant.
     """
+    settings = get_settings()
     try:
         # Parser métadonnées JSON si fourni
-        import json
         meta = json.loads(metadata) if metadata else {}
 
-        # Ajouter user_id aux métadonnées
-        meta["user_id"] = current_user.id
-        meta["username"] = current_user.username
+        # Un contenu pouvant être partagé entre utilisateurs (voir
+        # _reuse_document), les chunks ne portent que user_id: le nom du
+        # fichier et les métadonnées fournies restent propres à l'utilisateur,
+        # dans le registre, et le doc_id est le hash du contenu.
+        owner_metadata = {**meta, "filename": file.filename}
 
-        # Sauvegarder temporairement le fichier
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        # Copier le fichier sur disque par blocs
+        tmp_path, content_hash, size = await _save_upload(
+            file, settings.upload_max_bytes, settings.upload_chunk_bytes
+        )
 
         try:
-            # Importer les services (lazy import pour éviter circular dependency)
-            from services.document_parser import DocumentParserService
-            from services.ollama import OllamaService
-            from services.vector_store import VectorStoreService
-            from agents.rag.indexer import RAGIndexerAgent
-            from agents.rag.document_loader import RAGDocumentLoaderAgent
-            from models.agent import AgentExecutionRequest
-
-            # Initialiser les services
-            parser = DocumentParserService()
-            ollama = OllamaService()
-            vector_store = VectorStoreService()
-            indexer = RAGIndexerAgent(ollama, vector_store)
-            loader = RAGDocumentLoaderAgent(parser, indexer)
-
-            # Charger le document
-            request = AgentExecutionRequest(
-                agent_id="document_loader",
-                input={
-                    "file_path": tmp_path,
-                    "doc_id": Path(file.filename).stem,
-                    "metadata": {**meta, "filename": file.filename},
-                    "collection_name": collection_name,
-                }
+            reused = await _reuse_document(
+                registry,
+                vector_store,
+                collection_name,
+                content_hash,
+                size,
+                current_user,
+                owner_metadata,
             )
-
-            result = await loader.execute(request)
-
-            if not result.success:
-                raise HTTPException(status_code=500, detail=result.error)
-
-            return DocumentUploadResponse(
+            if reused is not None:
+                return reused
+
+            if not registry.reserve(collection_name, content_hash):
+                raise HTTPException(
+                    status_code=409, detail="Document identique en cours d'indexation"
+                )
+
+            try:
+                # Charger le document
+                request = AgentExecutionRequest(
+                    agent_id="document_loader",
+                    input={
+                        "file_path": tmp_path,
+                        "doc_id": content_hash,
+                        "metadata": {"user_id": current_user.id},
+                        "collection_name": collection_name,
+                    }
+                )
+
+                result = await loader.execute(request)
+
+                if not result.success:
+                    raise HTTPException(status_code=500, detail=result.error)
+            except BaseException:
+                registry.release(collection_name, content_hash)
+                raise
+
+            document = RegisteredDocument(
+                content_hash=content_hash,
                 doc_id=result.output["doc_id"],
                 filename=file.filename,
+                size=size,
+                user_id=current_user.id,
+                chunk_ids=list(result.output["chunk_ids"]),
                 format=result.output["format"],
-                chunks_created=result.output["chunks_created"],
                 word_count=result.output.get("word_count"),
                 page_count=result.output.get("page_count"),
-                metadata=result.output["metadata"]
+                metadata=_shared_metadata(result.output["metadata"]),
+                owner_metadata={current_user.id: owner_metadata},
             )
+            registry.register(collection_name, document)
+            return _upload_response(document, current_user, content_hash)
 
         finally:
             # Nettoyer le fichier temporaire
@@ -175,63 +420,142 @@ async def upload_document(
 
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Métadonnées JSON invalides")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur upload document: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("/load-directory", response_model=DirectoryLoadResponse)
+@router.post("/load-directory", response_model=IngestionJobResponse, status_code=202)
 async def load_directory(
+    current_user: Annotated[User, Depends(get_current_active_user)],
     payload: DirectoryLoadRequest,
-    background_tasks: BackgroundTasks
+    jobs: Annotated[IngestionJobService, Depends(get_ingestion_jobs)],
 ):
     """
-    Charge tous les documents d'un répertoire.
+    Lance le chargement d'un répertoire dans un job d'arrière-plan.
 
-    Traite les fichiers en background si nombreux.
+    Retourne immédiatement l'identifiant du job; la progression se suit via
+    /jobs/{job_id} ou le flux SSE /jobs/{job_id}/events.
     """
-    try:
-        from services.document_parser import DocumentParserService
-        from services.ollama import OllamaService
-        from services.vector_store import VectorStoreService
-        from agents.rag.indexer import RAGIndexerAgent
-        from agents.rag.document_loader import RAGDocumentLoaderAgent
-
-        # Initialiser les services
-        parser = DocumentParserService()
-        ollama = OllamaService()
-        vector_store = VectorStoreService()
-        indexer = RAGIndexerAgent(ollama, vector_store)
-        loader = RAGDocumentLoaderAgent(parser, indexer)
-
-        # Charger le répertoire
-        results = await loader.load_directory(
-            directory_path=payload.directory_path,
-            collection_name=payload.collection_name,
-            recursive=payload.recursive,
-            metadata=payload.metadata
+    if not Path(payload.directory_path).is_dir():
+        raise HTTPException(
+            status_code=404, detail=f"Répertoire introuvable: {payload.directory_path}"
         )
 
-        # Compter succès/échecs
-        succeeded = sum(1 for r in results.values() if r.success)
-        failed = len(results) - succeeded
+    job = jobs.start(
+        directory_path=payload.directory_path,
+        collection_name=payload.collection_name,
+        recursive=payload.recursive,
+        metadata=payload.metadata,
+        full_reindex=payload.full_reindex,
+        user_id=current_user.id,
+    )
+    logger.info(
+        f"Job d'ingestion {job.job_id} lancé par {current_user.username}: "
+        f"{payload.directory_path}"
+    )
+    return IngestionJobResponse(**job.to_dict())
+
+
+@router.get("/jobs", response_model=List[IngestionJobResponse])
+async def list_ingestion_jobs(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    jobs: Annotated[IngestionJobService, Depends(get_ingestion_jobs)],
+):
+    """
+    Liste les jobs d'ingestion, du plus récent au plus ancien: ceux de
+    l'utilisateur, ou tous pour un admin.
+    """
+    user_id = None if current_user.role == UserRole.ADMIN else current_user.id
+    return [IngestionJobResponse(**job.to_dict()) for job in jobs.list_jobs(user_id)]
 
-        return DirectoryLoadResponse(
-            files_processed=len(results),
-            files_succeeded=succeeded,
-            files_failed=failed,
-            results={path: {"success": r.success, "error": r.error} for path, r in results.items()}
-        )
 
-    except Exception as e:
-        logger.error(f"Erreur chargement répertoire: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+def _owned_job(jobs: IngestionJobService, job_id: str, user: User) -> IngestionJob:
+    """Job visible par ``user`` (son créateur ou un admin), sinon 404."""
+    job = jobs.get(job_id)
+    if job is None or (user.role != UserRole.ADMIN and job.user_id != user.id):
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobResponse)
+async def get_ingestion_job(
+    job_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    jobs: Annotated[IngestionJobService, Depends(get_ingestion_jobs)],
+):
+    """Retourne la progression d'un job d'ingestion."""
+    job = _owned_job(jobs, job_id, current_user)
+    return IngestionJobResponse(**job.to_dict())
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_ingestion_job(
+    job_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    jobs: Annotated[IngestionJobService, Depends(get_ingestion_jobs)],
+):
+    """
+    Flux SSE de la progression d'un job, jusqu'à sa fin.
+
+    La déconnexion du client n'interrompt que le flux, pas le job.
+    """
+    _owned_job(jobs, job_id, current_user)
+
+    async def event_stream():
+        async for state in jobs.watch(job_id):
+            yield f"data: {json.dumps(state)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=IngestionJobResponse)
+async def cancel_ingestion_job(
+    job_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    jobs: Annotated[IngestionJobService, Depends(get_ingestion_jobs)],
+):
+    """Annule un job en attente ou en cours (les fichiers terminés restent indexés)."""
+    _owned_job(jobs, job_id, current_user)
+    job = await jobs.cancel(job_id)
+    return IngestionJobResponse(**job.to_dict())
+
+
+@router.post("/jobs/{job_id}/resume", response_model=IngestionJobResponse, status_code=202)
+async def resume_ingestion_job(
+    job_id: str,
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    jobs: Annotated[IngestionJobService, Depends(get_ingestion_jobs)],
+):
+    """Reprend un job annulé, échoué ou interrompu après le dernier fichier terminé."""
+    _owned_job(jobs, job_id, current_user)
+    try:
+        job = jobs.resume(job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e)) from e
+    return IngestionJobResponse(**job.to_dict())
 
 
 @router.post("/search", response_model=SearchResponse)
 async def search_documents(
     current_user: Annotated[User, Depends(get_current_active_user)],
-    payload: SearchRequest
+    payload: SearchRequest,
+    ollama: Annotated[OllamaService, Depends(get_ollama_service)],
+    vector_store: Annotated[VectorStoreService, Depends(get_vector_store)],
+    cache: Annotated[SearchCacheService, Depends(get_search_cache)],
+    flights: Annotated[SingleFlight, Depends(get_search_flights)],
+    reranker: Annotated[RAGRerankerAgent, Depends(get_reranker)],
+    registry: Annotated[DocumentRegistryService, Depends(get_document_registry)],
 ):
     """
     Recherche sémantique dans les documents indexés.
@@ -241,20 +565,10 @@ async def search_documents(
     - Reranking optionnel pour meilleure pertinence
 
     Requiert authentification. Recherche uniquement dans les documents de l'utilisateur.
+    Les résultats d'un document uploadé portent les métadonnées de l'utilisateur
+    (nom de fichier compris), jamais celles des autres propriétaires.
     """
     try:
-        from services.ollama import OllamaService
-        from services.vector_store import VectorStoreService
-        from services.search_cache import SearchCacheService
-        from agents.rag.cached_searcher import RAGCachedSearcherAgent
-        from agents.rag.reranker import RAGRerankerAgent
-        from models.agent import AgentExecutionRequest
-
-        # Initialiser les services
-        ollama = OllamaService()
-        vector_store = VectorStoreService()
-        cache = SearchCacheService()
-
         # Ajouter le filtre user_id
         filters = payload.filters or {}
         filters["user_id"] = current_user.id
@@ -264,7 +578,8 @@ async def search_documents(
             ollama_service=ollama,
             vector_store=vector_store,
             cache=cache,
-            enable_cache=payload.use_cache
+            enable_cache=payload.use_cache,
+            flights=flights,
         )
 
         # Recherche
@@ -274,6 +589,7 @@ async def search_documents(
                 "query": payload.query,
                 "top_k": payload.top_k,
                 "filters": filters,  # Utilise les filtres avec user_id
+                "collections": payload.collections or [payload.collection_name],
                 "use_cache": payload.use_cache,
             }
         )
@@ -287,8 +603,6 @@ async def search_documents(
 
         # Reranking optionnel
         if payload.enable_reranking and search_results:
-            reranker = RAGRerankerAgent(ollama)
-
             rerank_request = AgentExecutionRequest(
                 agent_id="reranker",
                 input={
@@ -304,16 +618,24 @@ async def search_documents(
                 search_results = rerank_result.output.get("reranked_results", search_results)
 
         # Formater les résultats
-        formatted_results = [
-            SearchResult(
-                doc_id=r.get("doc_id", ""),
-                chunk_id=r.get("chunk_id", r.get("id", "")),
-                content=r.get("content", ""),
-                score=r.get("final_score", r.get("score", 0.0)),
-                metadata=r.get("metadata", {})
+        formatted_results = []
+        for r in search_results:
+            metadata = r.get("metadata", {})
+            document = registry.get(
+                r.get("collection") or payload.collection_name, r.get("doc_id", "")
+            )
+            if document is not None:
+                metadata = {**metadata, **document.owner_metadata.get(current_user.id, {})}
+            formatted_results.append(
+                SearchResult(
+                    doc_id=r.get("doc_id", ""),
+                    chunk_id=r.get("chunk_id", r.get("id", "")),
+                    content=r.get("content", ""),
+                    score=r.get("final_score", r.get("score", 0.0)),
+                    metadata=metadata,
+                    collection=r.get("collection", ""),
+                )
             )
-            for r in search_results
-        ]
 
         return SearchResponse(
             results=formatted_results,
@@ -329,20 +651,31 @@ async def search_documents(
 
 @router.get("/cache/stats", response_model=CacheStatsResponse)
 async def get_cache_stats(
-    current_user: Annotated[User, Depends(get_current_active_user)]
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    cache: Annotated[SearchCacheService, Depends(get_search_cache)],
+    rerank_cache: Annotated[SearchCacheService, Depends(get_rerank_cache)],
+    ollama: Annotated[OllamaService, Depends(get_ollama_service)],
+    flights: Annotated[SingleFlight, Depends(get_search_flights)],
 ):
     """
-    Retourne les statistiques du cache de recherche.
+    Retourne les statistiques du cache de recherche, avec celles du cache
+    de scores du reranker, du cache d'embeddings, des appels coalescés et
+    du micro-batching des embeddings.
 
     Requiert authentification.
     """
     try:
-        from services.search_cache import SearchCacheService
-
-        cache = SearchCacheService()
         stats = cache.get_stats()
 
-        return CacheStatsResponse(**stats)
+        embedding_stats = ollama.embedding_cache.get_stats() if ollama.embedding_cache else None
+
+        return CacheStatsResponse(
+            **stats,
+            rerank_cache=rerank_cache.get_stats(),
+            embedding_cache=embedding_stats,
+            coalescing={"search": flights.stats(), "embeddings": ollama.embed_flights.stats()},
+            embedding_batcher=ollama.embed_batcher.get_stats(),
+        )
 
     except Exception as e:
         logger.error(f"Erreur récupération stats cache: {e}", exc_info=True)
@@ -351,7 +684,8 @@ async def get_cache_stats(
 
 @router.post("/cache/clear")
 async def clear_cache(
-    current_user: Annotated[User, Depends(get_current_active_user)]
+    current_user: Annotated[User, Depends(get_current_active_user)],
+    cache: Annotated[SearchCacheService, Depends(get_search_cache)],
 ):
     """
     Vide complètement le cache de recherche.
@@ -359,9 +693,6 @@ async def clear_cache(
     Requiert authentification.
     """
     try:
-        from services.search_cache import SearchCacheService
-
-        cache = SearchCacheService()
         count = cache.clear()
 
         return {"message": f"Cache vidé: {count} entrées supprimées", "count": count}
@@ -372,12 +703,11 @@ async def clear_cache(
 
 
 @router.post("/cache/cleanup")
-async def cleanup_cache():
+async def cleanup_cache(
+    cache: Annotated[SearchCacheService, Depends(get_search_cache)],
+):
     """Nettoie les entrées expirées du cache"""
     try:
-        from services.search_cache import SearchCacheService
-
-        cache = SearchCacheService()
         count = cache.cleanup_expired()
 
         return {"message": f"Nettoyage terminé: {count} entrées expirées supprimées", "count": count}
@@ -388,12 +718,11 @@ async def cleanup_cache():
 
 
 @router.get("/formats")
-async def get_supported_formats():
+async def get_supported_formats(
+    parser: Annotated[DocumentParserService, Depends(get_document_parser)],
+):
     """Liste les formats de documents supportés"""
     try:
-        from services.document_parser import DocumentParserService
-
-        parser = DocumentParserService()
         extensions = parser.get_supported_extensions()
 
         return {
@@ -38,6 +38,17 @@ class DatabaseConfig(BaseModel):
     blob_secret_key: str = "agenticai"
 
 
+class ResilienceConfig(BaseModel):
+    # Disjoncteurs de Qdrant, Redis et Postgres: ouverture après N échecs
+    # consécutifs, puis réessai après un délai doublé à chaque essai raté
+    failure_threshold: int = 3
+    recovery_seconds: float = 5.0
+    backoff_factor: float = 2.0
+    max_recovery_seconds: float = 300.0
+    # Timeout d'établissement de connexion (Postgres, Redis)
+    connect_timeout_seconds: float = 3.0
+
+
 class MonitoringThresholds(BaseModel):
     rag_p_at_1_min: float = 0.75
     asr_max_wer: float = 0.18
@@ -70,11 +81,66 @@ class AppSettings(BaseSettings):
     messaging: MessagingConfig = Field(default_factory=MessagingConfig)
     database: DatabaseConfig = Field(default_factory=DatabaseConfig)
     monitoring: MonitoringThresholds = Field(default_factory=MonitoringThresholds)
+    resilience: ResilienceConfig = Field(default_factory=ResilienceConfig)
     security: SecurityConfig = Field(default_factory=SecurityConfig)
     ollama_base_url: str = "http://localhost:11434"
     ollama_model: str = "qwen2.5:14b"
     ollama_embedding_model: str = "nomic-embed-text"
+    # Timeouts par opération: génération (lecture entre deux fragments), embeddings,
+    # health check, établissement de connexion
     ollama_timeout_seconds: float = 60.0
+    ollama_embed_timeout_seconds: float = 30.0
+    ollama_health_timeout_seconds: float = 2.0
+    ollama_connect_timeout_seconds: float = 5.0
+    # Pool HTTP partagé par toutes les instances d'OllamaService, réparti sur
+    # ollama_pool_shards clients. Garder autant de connexions keep-alive que de
+    # connexions: sous charge, httpx ferme sinon le surplus après chaque requête
+    # et en rouvre une pour la suivante
+    ollama_max_connections: int = 32
+    ollama_max_keepalive_connections: int = 32
+    ollama_pool_shards: int = 4
+    ollama_keepalive_expiry_seconds: float = 30.0
+    # HTTP/2 (nécessite httpx[http2]); utile derrière un proxy TLS, Ollama parle HTTP/1.1
+    ollama_http2: bool = False
+    # Sonde de santé en tâche de fond et disjoncteur: après N échecs consécutifs
+    # (sondes ou appels), replis immédiats jusqu'à la prochaine sonde réussie
+    ollama_health_interval_seconds: float = 10.0
+    ollama_breaker_failure_threshold: int = 3
+    ollama_breaker_recovery_seconds: float = 30.0
+    # Tier sémantique du cache de recherche: distance cosinus max, None = désactivé
+    search_cache_semantic_max_distance: float | None = None
+    # Micro-batching des embeddings concurrents: attente max d'un lot incomplet
+    # (0 = désactivé) et nombre de textes par appel /api/embed
+    embedding_batch_window_ms: float = 5.0
+    embedding_batch_max_size: int = 32
+    # Cache d'embeddings: entrées en mémoire (0 = désactivé) et fichier SQLite optionnel
+    embedding_cache_size: int = 20000
+    embedding_cache_path: str | None = None
+    # Manifestes de l'indexation incrémentale (un JSON par collection)
+    index_manifest_dir: str = "./data/index_manifests"
+    # Ingestion de répertoires: pool de parsing et concurrence de chaque étage du pipeline
+    document_parser_executor: Literal["inline", "thread", "process"] = "process"
+    # Fichiers parsés inline sous ce seuil (le pool coûte plus cher que le parsing)
+    document_parser_inline_max_bytes: int = 64 * 1024
+    ingest_parse_workers: int = 4
+    ingest_index_workers: int = 4
+    ingest_queue_size: int = 64
+    # Jobs d'ingestion en arrière-plan: persistance (None = mémoire seule) et parallélisme
+    ingestion_jobs_dir: str | None = "./data/ingestion_jobs"
+    ingestion_max_concurrent_jobs: int = 1
+    # Uploads: copiés sur disque par blocs, taille max,
+    # registre de déduplication (None = mémoire)
+    upload_max_bytes: int = 200 * 1024 * 1024
+    upload_chunk_bytes: int = 1024 * 1024
+    document_registry_dir: str | None = "./data/document_registry"
+    # Index plein texte (BM25, SQLite FTS5) de la recherche hybride (None = mémoire)
+    keyword_index_path: str | None = "./data/keyword_index.sqlite3"
+    # Découpage des documents: fenêtre glissante (ids historiques), phrases ou structure;
+    # taille et chevauchement en caractères ou en tokens (sentence/structure uniquement)
+    chunking_strategy: Literal["window", "sentence", "structure"] = "window"
+    chunk_length_unit: Literal["chars", "tokens"] = "chars"
+    chunk_size: int = 512
+    chunk_overlap: int = 128
     ollama_models: List[OllamaModelConfig] = Field(
         default_factory=lambda: [
             OllamaModelConfig(
@@ -5,13 +5,34 @@ from .monitoring import MonitoringService
 from .ollama import OllamaService
 from .vector_store import VectorStoreService
 from .document_parser import DocumentParserService
+from .search_cache import SearchCacheService
+from .embedding_cache import EmbeddingCacheService
+from .embedding_batcher import EmbeddingBatcher
+from .index_manifest import IndexManifestService
+from .keyword_index import KeywordIndexService
+from .document_registry import DocumentRegistryService
+from .ingestion_jobs import IngestionJobService
+from .circuit_breaker import CircuitBreaker, CircuitState
+from .health_monitor import HealthMonitor
+from .singleflight import SingleFlight
 
 __all__ = [
     'AgentExecutor',
+    'CircuitBreaker',
+    'CircuitState',
     'DatabaseService',
     'DocumentParserService',
+    'DocumentRegistryService',
+    'EmbeddingBatcher',
+    'EmbeddingCacheService',
+    'HealthMonitor',
+    'IndexManifestService',
+    'IngestionJobService',
+    'KeywordIndexService',
     'MessagingService',
     'MonitoringService',
     'OllamaService',
+    'SearchCacheService',
+    'SingleFlight',
     'VectorStoreService',
 ]
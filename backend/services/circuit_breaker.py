@@ -0,0 +1,157 @@
+"""
+Disjoncteur (circuit breaker) pour les dépendances externes.
+
+- fermé: les appels passent; après ``failure_threshold`` échecs consécutifs
+  le circuit s'ouvre
+- ouvert: les appels sont refusés sans attendre de timeout (repli immédiat)
+  pendant ``recovery_timeout`` secondes
+- semi-ouvert: un appel d'essai passe; un succès referme le circuit, un
+  échec le rouvre pour une durée multipliée par ``backoff_factor`` (backoff
+  exponentiel des reconnexions, plafonné à ``max_recovery_timeout``)
+
+L'état est lu sans E/S: les routes le consultent à chaque requête. Tant
+qu'aucun appel n'a abouti ni échoué (``checked`` faux), un circuit fermé ne
+prouve rien: les clients se connectent paresseusement.
+"""
+
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+
+from config import get_settings
+
+
+class CircuitState(str, Enum):
+    """États d'un disjoncteur"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Disjoncteur à seuil d'échecs consécutifs et délai de réessai."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        recovery_timeout: float = 30.0,
+        backoff_factor: float = 1.0,
+        max_recovery_timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            name: Nom de la dépendance (logs, /health)
+            failure_threshold: Échecs consécutifs avant ouverture
+            recovery_timeout: Secondes d'ouverture avant le premier appel d'essai
+            backoff_factor: Multiplicateur du délai après chaque essai raté
+            max_recovery_timeout: Plafond du délai (None = recovery_timeout)
+            clock: Horloge monotone (injectable pour les tests)
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.backoff_factor = max(1.0, backoff_factor)
+        self.max_recovery_timeout = max(recovery_timeout, max_recovery_timeout or recovery_timeout)
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        # Ouvertures successives sans succès: fixe le délai avant l'essai suivant
+        self._openings = 0
+        self._opened_at = 0.0
+        self._trial_started_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._checked = False
+        self._last_change = time.time()
+
+    @property
+    def state(self) -> CircuitState:
+        if (
+            self._state == CircuitState.OPEN
+            and self._clock() - self._opened_at >= self.retry_delay
+        ):
+            return CircuitState.HALF_OPEN
+        return self._state
+
+    @property
+    def checked(self) -> bool:
+        """Vrai dès qu'un premier succès ou échec a été rapporté."""
+        return self._checked
+
+    @property
+    def retry_delay(self) -> float:
+        """Durée de l'ouverture en cours (backoff exponentiel plafonné)."""
+        delay = self.recovery_timeout * self.backoff_factor ** max(0, self._openings - 1)
+        return min(delay, self.max_recovery_timeout)
+
+    @property
+    def available(self) -> bool:
+        """Faux seulement quand le circuit est ouvert (dépendance connue en panne)."""
+        return self.state != CircuitState.OPEN
+
+    def allow_request(self) -> bool:
+        """
+        Autorise (ou non) un appel. En semi-ouvert, un seul appel d'essai
+        passe par ``retry_delay``: un essai dont le résultat n'est jamais
+        rapporté ne bloque pas le circuit.
+        """
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.OPEN:
+            return False
+        now = self._clock()
+        if self._trial_started_at is None or now - self._trial_started_at >= self.retry_delay:
+            self._trial_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._checked = True
+        self._failures = 0
+        self._openings = 0
+        self._trial_started_at = None
+        self._set_state(CircuitState.CLOSED)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        self._checked = True
+        self._failures += 1
+        if error is not None:
+            self._last_error = f"{type(error).__name__}: {error}"
+        state = self.state
+        if state == CircuitState.HALF_OPEN or (
+            state == CircuitState.CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._openings += 1
+            self._opened_at = self._clock()
+            self._trial_started_at = None
+            self._set_state(CircuitState.OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self.state.value,
+            "checked": self._checked,
+            "consecutive_failures": self._failures,
+            "retry_delay": self.retry_delay if self._state == CircuitState.OPEN else None,
+            "last_error": self._last_error,
+            "since": self._last_change,
+        }
+
+    def _set_state(self, state: CircuitState) -> None:
+        if self._state != state:
+            self._state = state
+            self._last_change = time.time()
+
+
+def backend_breaker(name: str) -> CircuitBreaker:
+    """Disjoncteur d'un backend (Qdrant, Redis, Postgres) réglé par ``settings.resilience``."""
+    config = get_settings().resilience
+    return CircuitBreaker(
+        name,
+        failure_threshold=config.failure_threshold,
+        recovery_timeout=config.recovery_seconds,
+        backoff_factor=config.backoff_factor,
+        max_recovery_timeout=config.max_recovery_seconds,
+    )
@@ -11,15 +11,23 @@ except ImportError:  # pragma: no cover - dépendance optionnelle
     asyncpg = None  # type: ignore
 
 from config import get_settings
+from services.circuit_breaker import CircuitBreaker, backend_breaker
 
 logger = logging.getLogger(__name__)
 
 
 class DatabaseService:
-    """Accès Postgres minimal avec fallback mémoire si la connexion échoue."""
+    """
+    Accès Postgres minimal avec fallback mémoire si la connexion échoue.
 
-    def __init__(self) -> None:
+    Tant que le disjoncteur ``breaker`` est ouvert, ni création de pool ni
+    requête: les appels vont directement au fallback mémoire. La création du
+    pool est retentée avec un backoff exponentiel (délai du disjoncteur).
+    """
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None) -> None:
         self.settings = get_settings()
+        self.breaker = breaker if breaker is not None else backend_breaker("postgres")
         self._pool: Optional["asyncpg.Pool"] = None
         self._executions: List[Dict[str, Any]] = []
         self._health_logs: List[Dict[str, Any]] = []
@@ -34,16 +42,36 @@ class DatabaseService:
         }
 
     async def _ensure_pool(self) -> Optional["asyncpg.Pool"]:
-        if self._pool or not asyncpg:
+        """Pool Postgres, ou None (fallback mémoire) si Postgres est connu indisponible."""
+        if not asyncpg or not self.breaker.allow_request():
+            return None
+        if self._pool:
             return self._pool
         try:
-            self._pool = await asyncpg.create_pool(self.settings.database.postgres_url, min_size=1, max_size=5)
+            self._pool = await asyncpg.create_pool(
+                self.settings.database.postgres_url,
+                min_size=1,
+                max_size=5,
+                timeout=self.settings.resilience.connect_timeout_seconds,
+            )
             logger.info("Pool Postgres initialisé")
         except Exception as exc:  # pragma: no cover - dépend réseau
-            logger.warning("Connexion Postgres indisponible, fallback mémoire actif", exc_info=exc)
+            self.breaker.record_failure(exc)
+            logger.warning(
+                "Connexion Postgres indisponible, fallback mémoire actif "
+                f"(circuit {self.breaker.state.value})",
+                exc_info=exc,
+            )
             self._pool = None
         return self._pool
 
+    def _report(self, error: Optional[BaseException] = None) -> None:
+        # Une erreur SQL (table absente...) prouve que Postgres répond
+        if error is None or isinstance(error, asyncpg.PostgresError):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(error)
+
     async def fetch_health_logs(self, user_id: str) -> List[Dict[str, Any]]:
         pool = await self._ensure_pool()
         if pool:
@@ -52,8 +80,10 @@ class DatabaseService:
                     "SELECT ts, type, value, note FROM health_logs WHERE user_id=$1 ORDER BY ts DESC LIMIT 100",
                     user_id,
                 )
+                self._report()
                 return [dict(row) for row in rows]
             except Exception as exc:
+                self._report(exc)
                 logger.error("Lecture health_logs échouée, fallback mémoire", exc_info=exc)
         return [log for log in self._health_logs if log.get("user_id") == user_id]
 
@@ -67,8 +97,10 @@ class DatabaseService:
                     json.dumps(record),
                     record.get("latency_ms"),
                 )
+                self._report()
                 return
             except Exception as exc:
+                self._report(exc)
                 logger.error("Echec insertion agent_executions, fallback mémoire", exc_info=exc)
         self._executions.append(record)
 
@@ -80,7 +112,9 @@ class DatabaseService:
                     "SELECT id, name, body FROM templates WHERE kind=$1 ORDER BY updated_at DESC LIMIT 20",
                     kind,
                 )
+                self._report()
                 return [dict(row) for row in rows]
             except Exception as exc:
+                self._report(exc)
                 logger.error("Lecture templates échouée, fallback mémoire", exc_info=exc)
         return self._templates.get(kind, [])
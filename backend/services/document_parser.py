@@ -3,14 +3,21 @@ Service de parsing de documents multi-formats.
 Supporte: PDF, DOCX, TXT, MD, HTML
 """
 
+import asyncio
 import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Literal, Optional, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Pages extraites par aller-retour vers le pool en mode streaming
+PDF_PAGES_PER_BATCH = 16
+
 
 class DocumentFormat(str, Enum):
     """Formats de documents supportés"""
@@ -32,10 +39,46 @@ class ParsedDocument:
     word_count: Optional[int] = None
 
 
+@dataclass
+class DocumentSection:
+    """Portion de document produite par ``iter_sections`` (une page pour un PDF)"""
+    content: str
+    page_number: Optional[int] = None
+    page_count: Optional[int] = None
+
+
+@dataclass
+class PdfPageBatch:
+    """Lot de pages non vides extrait par ``read_pdf_pages``"""
+    pages: List[Tuple[int, str]]
+    next_page: int
+    page_count: int
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
 class DocumentParserService:
-    """Service de parsing de documents multi-formats"""
+    """
+    Service de parsing de documents multi-formats.
 
-    def __init__(self):
+    ``executor`` choisit où tourne le parsing appelé via ``parse_file``:
+    "inline" (dans la boucle asyncio), "thread" ou "process". Les parsers
+    PDF/DOCX/HTML sont CPU-bound: le mode "process" les sort du GIL et
+    laisse la boucle servir les autres requêtes.
+
+    Les fichiers de moins de ``inline_max_bytes`` sont parsés inline: pour
+    eux, l'aller-retour vers le pool coûte plus cher que le parsing.
+    """
+
+    def __init__(
+        self,
+        executor: Literal["inline", "thread", "process"] = "inline",
+        max_workers: int = 4,
+        inline_max_bytes: int = 64 * 1024,
+    ):
+        self.executor_kind = executor
+        self.max_workers = max(1, max_workers)
+        self.inline_max_bytes = inline_max_bytes
+        self._executor: Optional[Executor] = None
         self.supported_formats = {
             ".pdf": DocumentFormat.PDF,
             ".docx": DocumentFormat.DOCX,
@@ -52,6 +95,20 @@ class DocumentParserService:
 
     async def parse_file(self, file_path: str, metadata: Optional[Dict] = None) -> ParsedDocument:
         """Parse un document et retourne son contenu avec métadonnées"""
+        executor = self._executor_for(file_path)
+        if executor is None:
+            return self.parse_file_sync(file_path, metadata)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.parse_file_sync, file_path, metadata)
+
+    def parse_file_sync(self, file_path: str, metadata: Optional[Dict] = None) -> ParsedDocument:
+        """
+        Version synchrone de ``parse_file``.
+
+        Les parsers (pypdf, python-docx, BeautifulSoup) sont CPU-bound: cette
+        méthode est celle à soumettre à un pool de threads ou de processus
+        (le service est picklable).
+        """
         doc_format = self.detect_format(file_path)
 
         if doc_format == DocumentFormat.UNKNOWN:
@@ -61,18 +118,95 @@ class DocumentParserService:
 
         # Parser selon le format
         if doc_format == DocumentFormat.PDF:
-            return await self._parse_pdf(file_path, metadata or {})
+            return self._parse_pdf(file_path, metadata or {})
         elif doc_format == DocumentFormat.DOCX:
-            return await self._parse_docx(file_path, metadata or {})
+            return self._parse_docx(file_path, metadata or {})
         elif doc_format == DocumentFormat.TXT:
-            return await self._parse_text(file_path, metadata or {})
+            return self._parse_text(file_path, metadata or {})
         elif doc_format == DocumentFormat.MARKDOWN:
-            return await self._parse_markdown(file_path, metadata or {})
+            return self._parse_markdown(file_path, metadata or {})
         elif doc_format == DocumentFormat.HTML:
-            return await self._parse_html(file_path, metadata or {})
+            return self._parse_html(file_path, metadata or {})
 
         raise ValueError(f"Parser non implémenté pour: {doc_format}")
 
+    def supports_streaming(self, file_path: str) -> bool:
+        """Vrai si ``iter_sections`` découpe ce format en plusieurs sections."""
+        return self.detect_format(file_path) == DocumentFormat.PDF
+
+    async def iter_sections(
+        self, file_path: str, metadata: Optional[Dict] = None
+    ) -> AsyncIterator[DocumentSection]:
+        """
+        Parse un document section par section, sans construire son texte complet.
+
+        Les PDF sont lus par lots de ``PDF_PAGES_PER_BATCH`` pages (dans le pool
+        selon la même règle que ``parse_file``); le lot suivant est extrait
+        pendant que l'appelant consomme le lot courant. Les autres formats
+        donnent une seule section.
+
+        ``metadata`` est complété (titre, auteur...) avant la première section.
+        """
+        metadata = metadata if metadata is not None else {}
+
+        if not self.supports_streaming(file_path):
+            parsed = await self.parse_file(file_path, metadata)
+            metadata.update(parsed.metadata)
+            yield DocumentSection(content=parsed.content, page_count=parsed.page_count)
+            return
+
+        logger.info(f"[DocumentParser] Parsing pdf (streaming): {file_path}")
+        executor = self._executor_for(file_path)
+        loop = asyncio.get_running_loop()
+
+        async def extract(first_page: int) -> PdfPageBatch:
+            if executor is None:
+                return self.read_pdf_pages(file_path, first_page)
+            return await loop.run_in_executor(executor, self.read_pdf_pages, file_path, first_page)
+
+        pending: Optional[asyncio.Future] = asyncio.ensure_future(extract(0))
+        try:
+            while pending is not None:
+                batch = await pending
+                pending = None
+                if batch.next_page < batch.page_count:
+                    pending = asyncio.ensure_future(extract(batch.next_page))
+                if batch.metadata:
+                    metadata.update(batch.metadata)
+                for page_number, text in batch.pages:
+                    yield DocumentSection(
+                        content=text, page_number=page_number, page_count=batch.page_count
+                    )
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    def read_pdf_pages(
+        self, file_path: str, first_page: int, max_pages: Optional[int] = None
+    ) -> PdfPageBatch:
+        """
+        Extrait le texte des pages ``first_page`` à ``first_page + max_pages``
+        (défaut: ``PDF_PAGES_PER_BATCH``).
+
+        Les numéros de pages renvoyés commencent à 1; les métadonnées du PDF
+        ne sont lues qu'avec le premier lot.
+        """
+        from pypdf import PdfReader
+
+        # close() vide les caches de pypdf: sans cela, les cycles de références
+        # gardent chaque lecteur en mémoire jusqu'au prochain gc complet
+        with PdfReader(file_path) as reader:
+            page_count = len(reader.pages)
+            stop = min(page_count, first_page + (max_pages or PDF_PAGES_PER_BATCH))
+            pages = []
+            for index in range(first_page, stop):
+                text = reader.pages[index].extract_text()
+                if text.strip():
+                    pages.append((index + 1, text))
+            metadata = self._pdf_metadata(reader) if first_page == 0 else {}
+
+        return PdfPageBatch(pages=pages, next_page=stop, page_count=page_count, metadata=metadata)
+
     async def parse_content(
         self,
         content: str,
@@ -89,7 +223,7 @@ class DocumentParserService:
             word_count=word_count
         )
 
-    async def _parse_pdf(self, file_path: str, metadata: Dict) -> ParsedDocument:
+    def _parse_pdf(self, file_path: str, metadata: Dict) -> ParsedDocument:
         """Parse un fichier PDF"""
         try:
             from pypdf import PdfReader
@@ -105,13 +239,7 @@ class DocumentParserService:
             content = "\n\n".join(pages)
 
             # Extraire métadonnées PDF
-            pdf_metadata = reader.metadata or {}
-            metadata.update({
-                "title": pdf_metadata.get("/Title", ""),
-                "author": pdf_metadata.get("/Author", ""),
-                "subject": pdf_metadata.get("/Subject", ""),
-                "creator": pdf_metadata.get("/Creator", ""),
-            })
+            metadata.update(self._pdf_metadata(reader))
 
             return ParsedDocument(
                 content=content,
@@ -127,7 +255,17 @@ class DocumentParserService:
             logger.error(f"Erreur parsing PDF: {e}", exc_info=True)
             raise
 
-    async def _parse_docx(self, file_path: str, metadata: Dict) -> ParsedDocument:
+    @staticmethod
+    def _pdf_metadata(reader) -> Dict[str, str]:
+        pdf_metadata = reader.metadata or {}
+        return {
+            "title": pdf_metadata.get("/Title", ""),
+            "author": pdf_metadata.get("/Author", ""),
+            "subject": pdf_metadata.get("/Subject", ""),
+            "creator": pdf_metadata.get("/Creator", ""),
+        }
+
+    def _parse_docx(self, file_path: str, metadata: Dict) -> ParsedDocument:
         """Parse un fichier DOCX"""
         try:
             from docx import Document
@@ -160,7 +298,7 @@ class DocumentParserService:
             logger.error(f"Erreur parsing DOCX: {e}", exc_info=True)
             raise
 
-    async def _parse_text(self, file_path: str, metadata: Dict) -> ParsedDocument:
+    def _parse_text(self, file_path: str, metadata: Dict) -> ParsedDocument:
         """Parse un fichier texte brut"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -176,7 +314,7 @@ class DocumentParserService:
             logger.error(f"Erreur parsing TXT: {e}", exc_info=True)
             raise
 
-    async def _parse_markdown(self, file_path: str, metadata: Dict) -> ParsedDocument:
+    def _parse_markdown(self, file_path: str, metadata: Dict) -> ParsedDocument:
         """Parse un fichier Markdown"""
         try:
             import markdown
@@ -208,7 +346,7 @@ class DocumentParserService:
             logger.error(f"Erreur parsing Markdown: {e}", exc_info=True)
             raise
 
-    async def _parse_html(self, file_path: str, metadata: Dict) -> ParsedDocument:
+    def _parse_html(self, file_path: str, metadata: Dict) -> ParsedDocument:
         """Parse un fichier HTML"""
         try:
             from bs4 import BeautifulSoup
@@ -251,6 +389,44 @@ class DocumentParserService:
             logger.error(f"Erreur parsing HTML: {e}", exc_info=True)
             raise
 
+    def close(self) -> None:
+        """Arrête le pool de parsing (les parsings en attente sont annulés)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _executor_for(self, file_path: str) -> Optional[Executor]:
+        """Pool à utiliser pour ce fichier, ou None pour parser inline."""
+        if self.executor_kind == "inline":
+            return None
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            return None  # parse_file_sync remontera l'erreur
+        if size <= self.inline_max_bytes:
+            return None
+        return self._get_executor()
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self._executor is None and self.executor_kind != "inline":
+            if self.executor_kind == "process":
+                # "spawn": pas de fork d'un process qui a déjà des threads (uvicorn, httpx)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="document-parser"
+                )
+        return self._executor
+
+    def __getstate__(self) -> Dict:
+        # Le service est envoyé aux workers du pool: sans son executor
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
+
     def get_supported_extensions(self) -> List[str]:
         """Retourne la liste des extensions supportées"""
         return list(self.supported_formats.keys())
@@ -0,0 +1,171 @@
+"""
+Registre des documents uploadés, adressé par le SHA-256 de leur contenu.
+
+Le hash est calculé pendant la copie de l'upload sur disque. Un contenu
+déjà indexé n'est ni re-parsé ni re-embeddé: dans la même collection, le
+nouvel utilisateur est ajouté aux propriétaires des chunks existants; dans
+une autre collection, les points (vecteurs compris) sont recopiés.
+
+Une entrée est réservée pendant l'indexation, pour que deux uploads
+simultanés du même fichier ne soient pas indexés tous les deux.
+
+Les chunks d'un contenu partagé ne portent que des informations communes
+(``doc_id`` = hash du contenu, métadonnées extraites du fichier, liste des
+propriétaires). Le nom de fichier et les métadonnées fournies par chaque
+propriétaire restent dans le registre (``owner_metadata``).
+"""
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILENAME = "documents.json"
+
+
+@dataclass
+class RegisteredDocument:
+    """Document indexé à partir d'un upload"""
+    content_hash: str
+    doc_id: str
+    filename: str
+    size: int
+    user_id: str
+    chunk_ids: List[str] = field(default_factory=list)
+    created_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    # Utilisateurs ayant uploadé ce contenu (user_id des payloads de chunks)
+    owners: List[str] = field(default_factory=list)
+    format: str = ""
+    word_count: Optional[int] = None
+    page_count: Optional[int] = None
+    # Métadonnées communes aux payloads des chunks (hors propriétaires)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    # user_id -> métadonnées propres à ce propriétaire (nom de fichier compris)
+    owner_metadata: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.owners:
+            self.owners = [self.user_id]
+
+
+class DocumentRegistryService:
+    """
+    Registre JSON (``documents.json``, toutes collections) stocké dans
+    ``directory``. Sans ``directory``, le registre reste en mémoire.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory) if directory else None
+        self._documents: Dict[str, Dict[str, RegisteredDocument]] = self._load()
+        self._reserved: Set[Tuple[str, str]] = set()
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+
+    def get(self, collection: str, content_hash: str) -> Optional[RegisteredDocument]:
+        return self._documents.get(collection, {}).get(content_hash)
+
+    def find(self, content_hash: str) -> Optional[Tuple[str, RegisteredDocument]]:
+        """Première collection où ce contenu est indexé, avec son entrée."""
+        for collection, documents in self._documents.items():
+            document = documents.get(content_hash)
+            if document is not None:
+                return collection, document
+        return None
+
+    def lock(self, collection: str, content_hash: str) -> asyncio.Lock:
+        """Verrou sérialisant les mises à jour d'un même document (propriétaires)."""
+        return self._locks.setdefault((collection, content_hash), asyncio.Lock())
+
+    def reserve(self, collection: str, content_hash: str) -> bool:
+        """
+        Réserve un hash le temps de l'indexation.
+
+        Returns:
+            False si le contenu est déjà indexé ou en cours d'indexation
+        """
+        key = (collection, content_hash)
+        if key in self._reserved or self.get(collection, content_hash) is not None:
+            return False
+        self._reserved.add(key)
+        return True
+
+    def release(self, collection: str, content_hash: str) -> None:
+        """Libère une réservation (indexation échouée)."""
+        self._reserved.discard((collection, content_hash))
+
+    def register(self, collection: str, document: RegisteredDocument) -> None:
+        """Enregistre un document indexé et libère sa réservation."""
+        self._documents.setdefault(collection, {})[document.content_hash] = document
+        self._reserved.discard((collection, document.content_hash))
+        self.save()
+
+    def add_owner(
+        self,
+        collection: str,
+        content_hash: str,
+        user_id: str,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """
+        Ajoute un propriétaire à un document, avec ses métadonnées propres.
+
+        Returns:
+            False si l'utilisateur en était déjà propriétaire
+        """
+        document = self.get(collection, content_hash)
+        if document is None:
+            raise KeyError(content_hash)
+        if user_id in document.owners:
+            return False
+        document.owners.append(user_id)
+        document.owner_metadata[user_id] = dict(metadata or {})
+        self.save()
+        return True
+
+    def remove(self, collection: str, content_hash: str) -> Optional[RegisteredDocument]:
+        document = self._documents.get(collection, {}).pop(content_hash, None)
+        if document is not None:
+            self.save()
+        return document
+
+    def save(self) -> None:
+        """Écrit le registre de façon atomique (fichier temporaire + rename)."""
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / REGISTRY_FILENAME
+        data = {
+            collection: {
+                content_hash: asdict(document) for content_hash, document in documents.items()
+            }
+            for collection, documents in self._documents.items()
+        }
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _load(self) -> Dict[str, Dict[str, RegisteredDocument]]:
+        if self.directory is None:
+            return {}
+        path = self.directory / REGISTRY_FILENAME
+        if not path.exists():
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {
+                collection: {
+                    content_hash: RegisteredDocument(**entry)
+                    for content_hash, entry in documents.items()
+                }
+                for collection, documents in data.items()
+            }
+        except (OSError, ValueError, TypeError) as exc:
+            logger.warning(f"Registre de documents illisible ({path}): {exc}")
+            return {}
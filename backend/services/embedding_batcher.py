@@ -0,0 +1,166 @@
+"""
+Micro-batching des embeddings concurrents.
+
+Les embeddings de requête arrivent un texte à la fois depuis de nombreuses
+recherches concurrentes. Le batcher les retient au plus ``max_wait_ms``
+millisecondes (ou jusqu'à ``max_batch_size`` textes), envoie un seul appel
+``/api/embed`` et rend à chaque appelant ses vecteurs.
+
+Les histogrammes de taille de lot et de profondeur de file sont exposés par
+``get_stats`` (/cache/stats) et, si OpenTelemetry est configuré, exportés
+comme instruments ``ollama.embed.batch_size`` et ``ollama.embed.queue_depth``.
+"""
+
+import asyncio
+import bisect
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set
+
+try:
+    from opentelemetry import metrics
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    metrics = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+# Bornes des buckets (textes par lot, requêtes en attente)
+HISTOGRAM_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+_meter = metrics.get_meter(__name__) if metrics is not None else None
+_batch_size_instrument = (
+    _meter.create_histogram("ollama.embed.batch_size", unit="{text}") if _meter else None
+)
+_queue_depth_instrument = (
+    _meter.create_histogram("ollama.embed.queue_depth", unit="{request}") if _meter else None
+)
+
+SendEmbeddings = Callable[[str, List[str]], Awaitable[Optional[List[List[float]]]]]
+
+
+class Histogram:
+    """Histogramme à buckets fixes (compteurs cumulés façon Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float] = HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*self.buckets, "+Inf"), self._counts, strict=True):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+        }
+
+
+@dataclass
+class _Waiter:
+    texts: List[str]
+    future: asyncio.Future
+
+
+class EmbeddingBatcher:
+    """Regroupe les embeddings concurrents d'un même modèle en un appel."""
+
+    def __init__(self, send: SendEmbeddings, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        """
+        Args:
+            send: Appel groupé (modèle, textes) -> vecteurs, ou None si indisponible
+            max_batch_size: Textes par appel; un lot plein part sans attendre
+            max_wait_ms: Attente maximale d'un lot incomplet (0 = pas de batching)
+        """
+        self._send = send
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queues: Dict[str, List[_Waiter]] = {}
+        self._queued_texts: Dict[str, int] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._flushes: Set[asyncio.Task] = set()
+        self.batch_sizes = Histogram()
+        self.queue_depths = Histogram()
+        self.calls = 0
+
+    async def embed(self, model: str, texts: List[str]) -> Optional[List[List[float]]]:
+        """Vecteurs de ``texts`` (dans l'ordre), ou None si Ollama est indisponible."""
+        if self.max_wait == 0 or len(texts) >= self.max_batch_size:
+            # Lot déjà plein (indexation): envoyé tel quel
+            self._observe_batch(len(texts))
+            return await self._send(model, texts)
+
+        if self._queued_texts.get(model, 0) + len(texts) > self.max_batch_size:
+            self._flush(model)
+        waiter = _Waiter(texts, asyncio.get_running_loop().create_future())
+        queue = self._queues.setdefault(model, [])
+        queue.append(waiter)
+        self._queued_texts[model] = self._queued_texts.get(model, 0) + len(texts)
+        self.queue_depths.observe(len(queue))
+        if _queue_depth_instrument is not None:
+            _queue_depth_instrument.record(len(queue))
+
+        if self._queued_texts[model] >= self.max_batch_size:
+            self._flush(model)
+        elif model not in self._timers:
+            self._timers[model] = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush, model
+            )
+        return await waiter.future
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "calls": self.calls,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_depth": self.queue_depths.snapshot(),
+        }
+
+    def _observe_batch(self, size: int) -> None:
+        self.calls += 1
+        self.batch_sizes.observe(size)
+        if _batch_size_instrument is not None:
+            _batch_size_instrument.record(size)
+
+    def _flush(self, model: str) -> None:
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+        waiters = self._queues.pop(model, [])
+        self._queued_texts.pop(model, None)
+        if waiters:
+            # Tâche référencée jusqu'à sa fin (sinon collectable en cours de route)
+            task = asyncio.ensure_future(self._send_batch(model, waiters))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _send_batch(self, model: str, waiters: List[_Waiter]) -> None:
+        texts = [text for waiter in waiters for text in waiter.texts]
+        self._observe_batch(len(texts))
+        try:
+            vectors = await self._send(model, texts)
+        except Exception as exc:
+            for waiter in waiters:
+                if not waiter.future.done():
+                    waiter.future.set_exception(exc)
+            return
+
+        offset = 0
+        for waiter in waiters:
+            size = len(waiter.texts)
+            if not waiter.future.done():  # appelant annulé entre-temps
+                waiter.future.set_result(
+                    vectors[offset:offset + size] if vectors is not None else None
+                )
+            offset += size
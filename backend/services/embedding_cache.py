@@ -0,0 +1,174 @@
+"""
+Cache d'embeddings adressé par contenu.
+
+Clé = SHA-256(modèle + texte normalisé): un même texte (ré-upload, chunk
+identique entre deux versions d'un document, requête répétée) n'est
+embeddé qu'une fois par modèle.
+
+Deux tiers:
+- mémoire: LRU de vecteurs float32
+- disque (optionnel): table SQLite qui survit aux redémarrages
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Limite de variables SQLite par requête "IN (...)"
+SQLITE_BATCH_SIZE = 500
+
+
+class EmbeddingCacheService:
+    """Cache d'embeddings à deux tiers (mémoire LRU + SQLite optionnel)."""
+
+    def __init__(self, max_entries: int = 20000, disk_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Nombre max de vecteurs gardés en mémoire
+            disk_path: Fichier SQLite du tier disque (None = mémoire seule)
+        """
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._memory_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+        }
+
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Clé de cache: hash du modèle et du texte normalisé (NFC, espaces)."""
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode()).hexdigest()
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """
+        Récupère les vecteurs connus parmi ``keys``.
+
+        Returns:
+            Dict clé -> vecteur, uniquement pour les clés trouvées
+        """
+        found: Dict[str, List[float]] = {}
+        missing: List[str] = []
+
+        for key in dict.fromkeys(keys):
+            vector = self._memory.get(key)
+            if vector is None:
+                missing.append(key)
+                continue
+            self._memory.move_to_end(key)
+            found[key] = vector.tolist()
+            self.stats["memory_hits"] += 1
+
+        if missing and self._db is not None:
+            from_disk = await asyncio.to_thread(self._disk_get, missing)
+            for key, vector in from_disk.items():
+                self._remember(key, vector)
+                found[key] = vector.tolist()
+            self.stats["disk_hits"] += len(from_disk)
+            self.stats["misses"] += len(missing) - len(from_disk)
+        else:
+            self.stats["misses"] += len(missing)
+        return found
+
+    async def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        """Stocke des vecteurs dans les deux tiers."""
+        arrays = {
+            key: np.asarray(vector, dtype=np.float32)
+            for key, vector in vectors.items()
+            if vector
+        }
+        for key, array in arrays.items():
+            self._remember(key, array)
+        if arrays and self._db is not None:
+            await asyncio.to_thread(self._disk_put, arrays)
+
+    def get_stats(self) -> Dict:
+        """Hit rate par tier, nombre d'entrées et octets stockés."""
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        stats = {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "memory_bytes": self._memory_bytes,
+            "memory_hits": self.stats["memory_hits"],
+            "disk_hits": self.stats["disk_hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": hits / lookups if lookups > 0 else 0.0,
+            "disk_enabled": self._db is not None,
+        }
+        if self._db is not None:
+            with self._db_lock:
+                stats["disk_entries"] = self._db.execute(
+                    "SELECT COUNT(*) FROM embeddings"
+                ).fetchone()[0]
+            stats["disk_bytes"] = sum(
+                os.path.getsize(path)
+                for path in (self.disk_path, f"{self.disk_path}-wal")
+                if os.path.exists(path)
+            )
+        return stats
+
+    def close(self) -> None:
+        """Ferme la base SQLite du tier disque."""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes
+        while len(self._memory) > self.max_entries:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _disk_get(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._db_lock:
+            for i in range(0, len(keys), SQLITE_BATCH_SIZE):
+                batch = keys[i:i + SQLITE_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).copy()
+        return found
+
+    def _disk_put(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._db_lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()],
+            )
+            self._db.commit()
@@ -0,0 +1,100 @@
+"""
+Sonde de santé périodique d'une dépendance, en tâche de fond.
+
+Le moniteur appelle ``probe`` toutes les ``interval`` secondes et publie le
+résultat dans un CircuitBreaker: les routes lisent l'état en mémoire au lieu
+de sonder la dépendance à chaque requête. Les sondes ne passent pas par le
+disjoncteur: ce sont elles qui le referment dès que la dépendance répond.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+
+class HealthMonitor:
+    """Sonde ``probe`` en boucle et alimente ``breaker``."""
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[bool]],
+        breaker: CircuitBreaker,
+        interval: float = 10.0,
+    ):
+        """
+        Args:
+            probe: Coroutine de sonde (True = dépendance disponible)
+            breaker: Disjoncteur mis à jour par chaque sonde
+            interval: Secondes entre deux sondes
+        """
+        self.probe = probe
+        self.breaker = breaker
+        self.interval = interval
+        self.last_check: Optional[float] = None
+        self.last_latency_ms: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def available(self) -> bool:
+        """État en cache: aucun appel réseau."""
+        return self.breaker.available
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def check(self) -> bool:
+        """Une sonde, dont le résultat est rapporté au disjoncteur."""
+        start = time.perf_counter()
+        try:
+            ok = await self.probe()
+            error = None
+        except Exception as exc:
+            ok, error = False, exc
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        self.last_check = time.time()
+
+        was_available = self.breaker.available
+        if ok:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(error)
+        if was_available != self.breaker.available:
+            logger.warning(
+                f"[Health] {self.breaker.name}: "
+                f"{'disponible' if self.breaker.available else 'indisponible'}"
+            )
+        return ok
+
+    def start(self) -> None:
+        """Démarre la boucle de sonde (idempotent)."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run(), name=f"health:{self.breaker.name}")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.breaker.snapshot(),
+            "available": self.available,
+            "last_check": self.last_check,
+            "last_latency_ms": self.last_latency_ms,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,110 @@
+"""
+Manifeste d'indexation: état des fichiers déjà indexés, par collection.
+
+Pour chaque fichier on conserve mtime, taille, hash du contenu et les ids
+des chunks produits. Un fichier dont mtime et taille n'ont pas bougé est
+ignoré sans être relu; si seul le mtime change, le hash évite un
+re-parsing. Les ids de chunks permettent de supprimer les points devenus
+obsolètes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+@dataclass
+class ManifestEntry:
+    """État d'un fichier indexé"""
+    mtime: float
+    size: int
+    content_hash: str
+    doc_id: str
+    chunk_ids: List[str] = field(default_factory=list)
+
+
+def hash_file(file_path: str) -> str:
+    """SHA-256 du contenu d'un fichier, lu par blocs."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class IndexManifestService:
+    """Manifestes JSON (un fichier par collection) stockés dans ``directory``."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._manifests: Dict[str, Dict[str, ManifestEntry]] = {}
+        self._save_locks: Dict[str, asyncio.Lock] = {}
+
+    def entries(self, collection: str) -> Dict[str, ManifestEntry]:
+        """Entrées de la collection (chargées depuis le disque au premier accès)."""
+        if collection not in self._manifests:
+            self._manifests[collection] = self._load(collection)
+        return self._manifests[collection]
+
+    def get(self, collection: str, file_path: str) -> Optional[ManifestEntry]:
+        return self.entries(collection).get(file_path)
+
+    def set(self, collection: str, file_path: str, entry: ManifestEntry) -> None:
+        self.entries(collection)[file_path] = entry
+
+    def remove(self, collection: str, file_path: str) -> Optional[ManifestEntry]:
+        return self.entries(collection).pop(file_path, None)
+
+    def clear(self, collection: str) -> None:
+        """Oublie tous les fichiers de la collection (ré-indexation complète)."""
+        self._manifests[collection] = {}
+        self.save(collection)
+
+    def save(self, collection: str) -> None:
+        """Écrit le manifeste de façon atomique (fichier temporaire + rename)."""
+        self._write(collection, self.entries(collection))
+
+    async def save_async(self, collection: str) -> None:
+        """
+        ``save`` hors de la boucle asyncio (JSON d'un gros manifeste écrit dans
+        un thread). Les entrées sont copiées au moment de l'écriture, les
+        sauvegardes d'une même collection s'exécutent l'une après l'autre.
+        """
+        async with self._save_locks.setdefault(collection, asyncio.Lock()):
+            entries = dict(self.entries(collection))
+            await asyncio.to_thread(self._write, collection, entries)
+
+    def _write(self, collection: str, entries: Dict[str, ManifestEntry]) -> None:
+        path = self._path(collection)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {file_path: asdict(entry) for file_path, entry in entries.items()}
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def _load(self, collection: str) -> Dict[str, ManifestEntry]:
+        path = self._path(collection)
+        if not path.exists():
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return {file_path: ManifestEntry(**entry) for file_path, entry in data.items()}
+        except (OSError, ValueError, TypeError) as exc:
+            logger.warning(f"Manifeste illisible ({path}), ré-indexation complète: {exc}")
+            return {}
+
+    def _path(self, collection: str) -> Path:
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", collection)
+        return self.directory / f"{safe_name}.json"
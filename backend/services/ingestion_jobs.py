@@ -0,0 +1,411 @@
+"""
+Jobs d'ingestion de répertoires en arrière-plan.
+
+Un job enveloppe ``RAGDocumentLoaderAgent.load_directory`` dans une tâche
+asyncio détachée de la requête HTTP: il survit à la déconnexion du client,
+expose sa progression (fichiers, chunks, débit, erreurs), peut être annulé
+puis repris à partir des fichiers déjà terminés.
+
+Avec ``storage_dir``, l'état des jobs est écrit dans ``jobs.json`` et la
+liste des fichiers terminés de chaque job dans ``<job_id>.done`` (une ligne
+par fichier, en ajout). Au redémarrage, les jobs en cours sont marqués
+"interrupted" et peuvent être repris.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Set, TextIO
+
+if TYPE_CHECKING:  # pragma: no cover - évite un import circulaire services <-> agents
+    from agents.rag.document_loader import RAGDocumentLoaderAgent
+    from models.agent import AgentExecutionResult
+
+logger = logging.getLogger(__name__)
+
+# Erreurs conservées par job (les suivantes ne sont que comptées)
+MAX_JOB_ERRORS = 100
+
+# Jobs terminés conservés dans l'historique
+MAX_FINISHED_JOBS = 100
+
+# Intervalle minimal entre deux sauvegardes de progression (secondes)
+PROGRESS_SAVE_INTERVAL = 5.0
+
+
+class IngestionJobStatus(str, Enum):
+    """États d'un job d'ingestion"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    INTERRUPTED = "interrupted"
+
+
+FINISHED_STATUSES = {
+    IngestionJobStatus.COMPLETED,
+    IngestionJobStatus.FAILED,
+    IngestionJobStatus.CANCELLED,
+    IngestionJobStatus.INTERRUPTED,
+}
+
+RESUMABLE_STATUSES = {
+    IngestionJobStatus.FAILED,
+    IngestionJobStatus.CANCELLED,
+    IngestionJobStatus.INTERRUPTED,
+}
+
+
+@dataclass
+class IngestionJob:
+    """Paramètres et progression d'un job d'ingestion"""
+    job_id: str
+    directory_path: str
+    collection_name: str = "documents"
+    recursive: bool = True
+    metadata: Dict[str, str] = field(default_factory=dict)
+    full_reindex: bool = False
+    # Utilisateur ayant lancé le job (None: job d'avant le suivi, admins seuls)
+    user_id: Optional[str] = None
+    status: IngestionJobStatus = IngestionJobStatus.PENDING
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # Durée cumulée des exécutions terminées
+    previous_run_seconds: float = 0.0
+    files_discovered: int = 0
+    files_done: int = 0
+    files_failed: int = 0
+    files_unchanged: int = 0
+    files_removed: int = 0
+    chunks_created: int = 0
+    chunks_embedded: int = 0
+    error_count: int = 0
+    errors: List[Dict[str, str]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Durée d'exécution cumulée sur toutes les reprises."""
+        if self.status == IngestionJobStatus.RUNNING and self.started_at is not None:
+            return self.previous_run_seconds + time.time() - self.started_at
+        return self.previous_run_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """État sérialisable, avec le débit calculé."""
+        data = asdict(self)
+        data["status"] = self.status.value
+        elapsed = self.elapsed_seconds
+        data["elapsed_seconds"] = elapsed
+        data["files_per_second"] = self.files_done / elapsed if elapsed > 0 else 0.0
+        data["chunks_per_second"] = self.chunks_embedded / elapsed if elapsed > 0 else 0.0
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IngestionJob":
+        fields = set(cls.__dataclass_fields__)
+        job = cls(**{key: value for key, value in data.items() if key in fields})
+        job.status = IngestionJobStatus(job.status)
+        return job
+
+
+class IngestionJobService:
+    """Lance, suit, annule et reprend les jobs d'ingestion."""
+
+    def __init__(
+        self,
+        loader: "RAGDocumentLoaderAgent",
+        storage_dir: Optional[str] = None,
+        max_concurrent_jobs: int = 1,
+    ):
+        """
+        Args:
+            loader: RAGDocumentLoaderAgent utilisé par les jobs
+            storage_dir: Répertoire de persistance (None = mémoire seule)
+            max_concurrent_jobs: Jobs exécutés en parallèle, les autres attendent
+        """
+        self.loader = loader
+        self.storage_dir = Path(storage_dir) if storage_dir else None
+        self._slots = asyncio.Semaphore(max(1, max_concurrent_jobs))
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._completed: Dict[str, Set[str]] = {}
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._last_save = 0.0
+        self._shutting_down = False
+        self._load()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def start(
+        self,
+        directory_path: str,
+        collection_name: str = "documents",
+        recursive: bool = True,
+        metadata: Optional[Dict[str, str]] = None,
+        full_reindex: bool = False,
+        user_id: Optional[str] = None,
+    ) -> IngestionJob:
+        """Crée un job et le planifie; retourne immédiatement."""
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex,
+            directory_path=directory_path,
+            collection_name=collection_name,
+            recursive=recursive,
+            metadata=dict(metadata or {}),
+            full_reindex=full_reindex,
+            user_id=user_id,
+        )
+        self._jobs[job.job_id] = job
+        self._completed[job.job_id] = set()
+        self._prune()
+        self._schedule(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    def list_jobs(self, user_id: Optional[str] = None) -> List[IngestionJob]:
+        """Jobs du plus récent au plus ancien (ceux de ``user_id`` s'il est donné)."""
+        jobs = [
+            job for job in self._jobs.values() if user_id is None or job.user_id == user_id
+        ]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    async def cancel(self, job_id: str) -> Optional[IngestionJob]:
+        """Annule un job en attente ou en cours et attend son arrêt."""
+        job = self._jobs.get(job_id)
+        task = self._tasks.get(job_id)
+        if job is None or task is None or task.done():
+            return job
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return job
+
+    def resume(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        Relance un job annulé, échoué ou interrompu. Les fichiers déjà
+        terminés sont ignorés.
+
+        Raises:
+            ValueError: Si le job n'est pas dans un état reprenable
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job.status not in RESUMABLE_STATUSES:
+            raise ValueError(f"Job {job_id} non reprenable (statut: {job.status.value})")
+        job.status = IngestionJobStatus.PENDING
+        job.error = None
+        # Les fichiers en échec sont retentés: leurs erreurs repartent de zéro
+        job.files_failed = 0
+        job.error_count = 0
+        job.errors = []
+        self._schedule(job)
+        return job
+
+    async def watch(
+        self, job_id: str, min_interval: float = 0.5, heartbeat: float = 15.0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Flux d'états du job: un état à chaque changement (au plus un toutes
+        les ``min_interval`` secondes) et au moins un toutes les
+        ``heartbeat`` secondes, jusqu'à la fin du job.
+        """
+        while True:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            changed = self._changed.setdefault(job_id, asyncio.Event())
+            yield job.to_dict()
+            if job.is_finished:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat)
+            except TimeoutError:
+                pass
+            await asyncio.sleep(min_interval)
+
+    async def shutdown(self) -> None:
+        """Interrompt les jobs en cours (reprenables au redémarrage)."""
+        self._shutting_down = True
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._save()
+
+    # ------------------------------------------------------------------
+    # Exécution
+    # ------------------------------------------------------------------
+
+    def _schedule(self, job: IngestionJob) -> None:
+        self._tasks[job.job_id] = asyncio.create_task(
+            self._run(job), name=f"ingestion-job-{job.job_id}"
+        )
+        self._notify(job, force_save=True)
+
+    async def _run(self, job: IngestionJob) -> None:
+        completed = self._completed.setdefault(job.job_id, set())
+        done_file: Optional[TextIO] = None
+        try:
+            async with self._slots:
+                job.started_at = time.time()
+                job.finished_at = None
+                job.status = IngestionJobStatus.RUNNING
+                job.files_discovered = len(completed)
+                self._notify(job, force_save=True)
+                logger.info(f"[IngestionJobs] Démarrage {job.job_id}: {job.directory_path}")
+
+                done_file = self._open_done_file(job.job_id)
+
+                def on_discovered(file_path: str) -> None:
+                    job.files_discovered += 1
+                    self._notify(job)
+
+                def on_result(file_path: str, result: "AgentExecutionResult") -> None:
+                    self._record_result(job, file_path, result, completed, done_file)
+
+                await self.loader.load_directory(
+                    directory_path=job.directory_path,
+                    collection_name=job.collection_name,
+                    recursive=job.recursive,
+                    metadata=job.metadata,
+                    full_reindex=job.full_reindex,
+                    skip_paths=completed,
+                    on_discovered=on_discovered,
+                    on_result=on_result,
+                )
+                job.status = IngestionJobStatus.COMPLETED
+        except asyncio.CancelledError:
+            job.status = (
+                IngestionJobStatus.INTERRUPTED
+                if self._shutting_down
+                else IngestionJobStatus.CANCELLED
+            )
+            raise
+        except Exception as e:
+            logger.error(f"[IngestionJobs] Job {job.job_id} échoué: {e}", exc_info=True)
+            job.status = IngestionJobStatus.FAILED
+            job.error = str(e)
+        finally:
+            if done_file is not None:
+                done_file.close()
+            if job.started_at is not None and job.finished_at is None:
+                job.finished_at = time.time()
+                job.previous_run_seconds += job.finished_at - job.started_at
+            logger.info(f"[IngestionJobs] Job {job.job_id}: {job.status.value}")
+            self._notify(job, force_save=True)
+
+    def _record_result(
+        self,
+        job: IngestionJob,
+        file_path: str,
+        result: "AgentExecutionResult",
+        completed: Set[str],
+        done_file: Optional[TextIO],
+    ) -> None:
+        output = result.output or {}
+        if output.get("removed"):
+            job.files_removed += 1
+        elif not result.success:
+            job.files_failed += 1
+            job.error_count += 1
+            if len(job.errors) < MAX_JOB_ERRORS:
+                job.errors.append({"file_path": file_path, "error": result.error or ""})
+        else:
+            job.files_done += 1
+            if output.get("unchanged"):
+                job.files_unchanged += 1
+            else:
+                job.chunks_created += output.get("chunks_created", 0)
+                job.chunks_embedded += output.get("chunks_embedded", 0)
+            # Les fichiers en échec ne sont pas marqués: une reprise les retente
+            completed.add(file_path)
+            if done_file is not None:
+                done_file.write(file_path + "\n")
+        self._notify(job)
+
+    def _notify(self, job: IngestionJob, force_save: bool = False) -> None:
+        changed = self._changed.pop(job.job_id, None)
+        if changed is not None:
+            changed.set()
+        now = time.monotonic()
+        if force_save or now - self._last_save >= PROGRESS_SAVE_INTERVAL:
+            self._save()
+            self._last_save = now
+
+    def _prune(self) -> None:
+        finished = [job for job in self.list_jobs() if job.is_finished]
+        for job in finished[MAX_FINISHED_JOBS:]:
+            self._jobs.pop(job.job_id, None)
+            self._tasks.pop(job.job_id, None)
+            self._completed.pop(job.job_id, None)
+            if self.storage_dir:
+                (self.storage_dir / f"{job.job_id}.done").unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def _open_done_file(self, job_id: str) -> Optional[TextIO]:
+        if not self.storage_dir:
+            return None
+        self.storage_dir.mkdir(parents=True, exist_ok=True)
+        # Bufferisé par ligne: une ligne = un fichier terminé
+        return open(self.storage_dir / f"{job_id}.done", "a", encoding="utf-8", buffering=1)
+
+    def _save(self) -> None:
+        if not self.storage_dir:
+            return
+        try:
+            self.storage_dir.mkdir(parents=True, exist_ok=True)
+            path = self.storage_dir / "jobs.json"
+            tmp_path = path.with_suffix(".json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump([job.to_dict() for job in self._jobs.values()], f)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            logger.warning(f"[IngestionJobs] Sauvegarde impossible: {exc}")
+
+    def _load(self) -> None:
+        if not self.storage_dir:
+            return
+        path = self.storage_dir / "jobs.json"
+        if not path.exists():
+            return
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            logger.warning(f"[IngestionJobs] Historique illisible ({path}): {exc}")
+            return
+
+        for item in data:
+            job = IngestionJob.from_dict(item)
+            if not job.is_finished:
+                # Le process s'est arrêté pendant le job
+                job.status = IngestionJobStatus.INTERRUPTED
+            self._jobs[job.job_id] = job
+            done_path = self.storage_dir / f"{job.job_id}.done"
+            if done_path.exists():
+                with open(done_path, encoding="utf-8") as f:
+                    self._completed[job.job_id] = {line.rstrip("\n") for line in f if line.strip()}
+            else:
+                self._completed[job.job_id] = set()
@@ -0,0 +1,263 @@
+"""
+Index plein texte (BM25) des chunks, à côté de l'index vectoriel.
+
+La recherche vectorielle rate les requêtes dominées par des identifiants
+exacts (codes d'erreur, ids de projet, références): l'index SQLite FTS5
+les retrouve par leurs tokens et classe les chunks par BM25.
+
+L'index est maintenu par VectorStoreService à chaque upsert, suppression
+ou mise à jour de payload, pour toutes les collections. Les champs de
+payload scalaires (ou listes de scalaires) sont indexés pour appliquer
+les mêmes filtres que Qdrant (égalité, "any-of", champ liste).
+"""
+
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.embedding_cache import SQLITE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w")
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS points (
+        id INTEGER PRIMARY KEY,
+        collection TEXT NOT NULL,
+        point_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        UNIQUE (collection, point_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS point_fields (
+        point INTEGER NOT NULL,
+        field TEXT NOT NULL,
+        value TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS point_fields_lookup ON point_fields (field, value, point)",
+    "CREATE INDEX IF NOT EXISTS point_fields_point ON point_fields (point)",
+    # Accents ignorés: "resume" trouve "résumé"
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chunks "
+    "USING fts5(content, tokenize='unicode61 remove_diacritics 2')",
+)
+
+
+class KeywordIndexService:
+    """Index BM25 SQLite FTS5, en mémoire ou dans ``path``."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Fichier SQLite de l'index (None = mémoire seule)
+        """
+        self.path = path
+        # Base ouverte au premier usage: pas de fichier créé pour un index inutilisé
+        self._connection: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    async def upsert(self, collection: str, points: List[Dict[str, Any]]) -> int:
+        """Indexe (ou remplace) les points ``{"id", "payload"}`` ayant un ``content``."""
+        rows = [
+            (str(point["id"]), point.get("payload") or {})
+            for point in points
+            if (point.get("payload") or {}).get("content")
+        ]
+        if not rows:
+            return 0
+        await asyncio.to_thread(self._upsert, collection, rows)
+        return len(rows)
+
+    async def delete(self, collection: str, point_ids: Iterable[Any]) -> None:
+        ids = [str(point_id) for point_id in point_ids]
+        if ids:
+            await asyncio.to_thread(self._delete, collection, ids)
+
+    async def set_payload(
+        self, collection: str, point_ids: Iterable[Any], payload: Dict[str, Any]
+    ) -> None:
+        """Fusionne ``payload`` dans le payload des points indexés (filtres compris)."""
+        updates = {str(point_id): payload for point_id in point_ids}
+        if updates:
+            await asyncio.to_thread(self._set_payloads, collection, updates)
+
+    async def set_payloads(self, collection: str, payloads: Dict[Any, Dict[str, Any]]) -> None:
+        """Comme ``set_payload``, avec un payload propre à chaque point (une transaction)."""
+        updates = {str(point_id): payload for point_id, payload in payloads.items()}
+        if updates:
+            await asyncio.to_thread(self._set_payloads, collection, updates)
+
+    async def search(
+        self,
+        collection: str,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Chunks classés par BM25.
+
+        Returns:
+            Résultats ``{"id", "score", "payload"}`` comme VectorStoreService.search
+            (score BM25 positif, plus grand = plus pertinent)
+        """
+        match = self.match_expression(query)
+        if not match:
+            return []
+        return await asyncio.to_thread(self._search, collection, match, top_k, filters or {})
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Toujours appelé sous _db_lock
+        if self._connection is None:
+            if self.path:
+                Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path or ":memory:", check_same_thread=False)
+            if self.path:
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            for statement in _SCHEMA:
+                self._connection.execute(statement)
+            self._connection.commit()
+        return self._connection
+
+    def count(self, collection: Optional[str] = None) -> int:
+        with self._db_lock:
+            if collection is None:
+                return self._db.execute("SELECT COUNT(*) FROM points").fetchone()[0]
+            return self._db.execute(
+                "SELECT COUNT(*) FROM points WHERE collection = ?", (collection,)
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        """
+        Requête FTS5 d'une requête utilisateur: chaque mot devient une phrase
+        entre guillemets (``E-1042`` -> ``"E-1042"``, tokens adjacents), les
+        phrases sont combinées par OR et BM25 favorise les chunks qui en
+        contiennent le plus. La syntaxe FTS5 de l'utilisateur est neutralisée.
+        """
+        words = [word for word in query.split() if _WORD.search(word)]
+        return " OR ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+    # ------------------------------------------------------------------
+    # SQLite (appelé hors de la boucle asyncio)
+    # ------------------------------------------------------------------
+
+    def _upsert(self, collection: str, rows: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._db_lock:
+            self._delete_rows(collection, [point_id for point_id, _ in rows])
+            for point_id, payload in rows:
+                stored = {key: value for key, value in payload.items() if key != "content"}
+                cursor = self._db.execute(
+                    "INSERT INTO points (collection, point_id, payload) VALUES (?, ?, ?)",
+                    (collection, point_id, json.dumps(stored)),
+                )
+                row = cursor.lastrowid
+                self._db.execute(
+                    "INSERT INTO chunks (rowid, content) VALUES (?, ?)", (row, payload["content"])
+                )
+                self._insert_fields(row, stored)
+            self._db.commit()
+
+    def _delete(self, collection: str, point_ids: List[str]) -> None:
+        with self._db_lock:
+            self._delete_rows(collection, point_ids)
+            self._db.commit()
+
+    def _set_payloads(self, collection: str, updates: Dict[str, Dict[str, Any]]) -> None:
+        with self._db_lock:
+            for row, point_id, stored in self._rows(collection, list(updates)):
+                stored.update(updates[point_id])
+                self._db.execute(
+                    "UPDATE points SET payload = ? WHERE id = ?", (json.dumps(stored), row)
+                )
+                self._db.execute("DELETE FROM point_fields WHERE point = ?", (row,))
+                self._insert_fields(row, stored)
+            self._db.commit()
+
+    def _search(
+        self, collection: str, match: str, top_k: int, filters: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        sql = [
+            "SELECT p.point_id, p.payload, chunks.content, bm25(chunks) AS rank",
+            "FROM chunks JOIN points p ON p.id = chunks.rowid",
+            "WHERE chunks MATCH ? AND p.collection = ?",
+        ]
+        params: List[Any] = [match, collection]
+        for field, value in filters.items():
+            if value is None:
+                continue
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            sql.append(
+                "AND p.id IN (SELECT point FROM point_fields WHERE field = ? "
+                f"AND value IN ({','.join('?' * len(values))}))"
+            )
+            params.extend([field, *(_encode(item) for item in values)])
+        sql.append("ORDER BY rank LIMIT ?")
+        params.append(top_k)
+
+        with self._db_lock:
+            try:
+                rows = self._db.execute(" ".join(sql), params).fetchall()
+            except sqlite3.OperationalError as exc:
+                logger.warning(f"Requête plein texte refusée ({match!r}): {exc}")
+                return []
+        return [
+            {"id": point_id, "score": -rank, "payload": {**json.loads(payload), "content": content}}
+            for point_id, payload, content, rank in rows
+        ]
+
+    def _rows(
+        self, collection: str, point_ids: List[str]
+    ) -> List[Tuple[int, str, Dict[str, Any]]]:
+        rows = []
+        for i in range(0, len(point_ids), SQLITE_BATCH_SIZE):
+            batch = point_ids[i:i + SQLITE_BATCH_SIZE]
+            rows.extend(
+                (row, point_id, json.loads(payload))
+                for row, point_id, payload in self._db.execute(
+                    f"SELECT id, point_id, payload FROM points WHERE collection = ? "
+                    f"AND point_id IN ({','.join('?' * len(batch))})",
+                    [collection, *batch],
+                )
+            )
+        return rows
+
+    def _delete_rows(self, collection: str, point_ids: List[str]) -> None:
+        rows = [(row,) for row, _, _ in self._rows(collection, point_ids)]
+        self._db.executemany("DELETE FROM chunks WHERE rowid = ?", rows)
+        self._db.executemany("DELETE FROM point_fields WHERE point = ?", rows)
+        self._db.executemany("DELETE FROM points WHERE id = ?", rows)
+
+    def _insert_fields(self, row: int, payload: Dict[str, Any]) -> None:
+        self._db.executemany(
+            "INSERT INTO point_fields (point, field, value) VALUES (?, ?, ?)",
+            [(row, field, _encode(value)) for field, value in _filterable_values(payload)],
+        )
+
+
+def _filterable_values(payload: Dict[str, Any]) -> Iterable[Tuple[str, Any]]:
+    for field, value in payload.items():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if isinstance(item, (str, int, float, bool)):
+                yield field, item
+
+
+def _encode(value: Any) -> str:
+    # JSON: 1, "1" et true restent distincts, comme dans les filtres Qdrant
+    return json.dumps(value)
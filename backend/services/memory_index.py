@@ -0,0 +1,236 @@
+"""Index vectoriel en mémoire (NumPy) utilisé quand Qdrant est indisponible."""
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+import numpy as np
+
+_MIN_CAPACITY = 1024
+
+
+class InMemoryVectorIndex:
+    """
+    Une collection de vecteurs stockée dans une matrice float32 contiguë.
+
+    Les lignes sont normalisées à l'insertion: la similarité cosinus se
+    réduit à un produit matrice-vecteur, et le top-k est extrait avec
+    ``argpartition`` sans trier toute la collection.
+
+    Les filtres de payload suivent la sémantique Qdrant: une valeur scalaire
+    est une égalité, une liste de valeurs un "any-of", et un champ de payload
+    de type liste matche si l'un de ses éléments matche. Les index inversés
+    par champ sont construits à la première requête filtrant sur ce champ.
+    """
+
+    def __init__(self) -> None:
+        self.dim: Optional[int] = None
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[Any] = []
+        self._payloads: List[Dict[str, Any]] = []
+        self._rows: Dict[Any, int] = {}
+        self._field_index: Dict[str, Dict[Hashable, Set[int]]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, point_id: Any) -> bool:
+        return point_id in self._rows
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    def upsert(self, points: Iterable[Dict[str, Any]]) -> int:
+        """Insère ou remplace des points ``{"id", "vector", "payload"}``."""
+        points = [p for p in points if p.get("vector") is not None and len(p["vector"])]
+        if not points:
+            return 0
+
+        vectors = np.asarray([p["vector"] for p in points], dtype=np.float32)
+        if vectors.ndim != 2:
+            raise ValueError("Vecteurs de dimensions hétérogènes")
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+            self._matrix = np.empty((_MIN_CAPACITY, self.dim), dtype=np.float32)
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Dimension {vectors.shape[1]} incompatible avec la collection ({self.dim})"
+            )
+
+        vectors = _normalize_rows(vectors)
+
+        for point, vector in zip(points, vectors, strict=True):
+            point_id = point.get("id")
+            payload = point.get("payload") or {}
+            row = self._rows.get(point_id)
+            if row is None:
+                row = self._append_row(point_id)
+            else:
+                self._unindex_payload(row)
+            self._matrix[row] = vector
+            self._payloads[row] = payload
+            self._index_payload(row)
+
+        return len(points)
+
+    def delete(self, point_ids: Iterable[Any]) -> int:
+        """Supprime des points (swap avec la dernière ligne, O(1) par point)."""
+        deleted = 0
+        for point_id in point_ids:
+            row = self._rows.pop(point_id, None)
+            if row is None:
+                continue
+            self._unindex_payload(row)
+            last = self._size - 1
+            if row != last:
+                self._unindex_payload(last)
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._payloads[row] = self._payloads[last]
+                self._rows[self._ids[row]] = row
+                self._index_payload(row)
+            self._ids.pop()
+            self._payloads.pop()
+            self._size -= 1
+            deleted += 1
+        return deleted
+
+    def set_payload(self, point_ids: Iterable[Any], payload: Dict[str, Any]) -> int:
+        """Fusionne ``payload`` dans le payload de points existants."""
+        updated = 0
+        for point_id in point_ids:
+            row = self._rows.get(point_id)
+            if row is None:
+                continue
+            self._unindex_payload(row)
+            self._payloads[row] = {**self._payloads[row], **payload}
+            self._index_payload(row)
+            updated += 1
+        return updated
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def retrieve(self, point_ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Points existants parmi ``point_ids`` (vecteur normalisé et payload)."""
+        points = []
+        for point_id in point_ids:
+            row = self._rows.get(point_id)
+            if row is not None:
+                points.append({
+                    "id": point_id,
+                    "vector": self._matrix[row].tolist(),
+                    "payload": dict(self._payloads[row]),
+                })
+        return points
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        score_threshold: Optional[float] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        with_vectors: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Top-k cosinus, au format des résultats Qdrant (id, score, payload)."""
+        if not self._size or top_k <= 0:
+            return []
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(f"Dimension de requête {query.shape} incompatible ({self.dim})")
+        query = _normalize_rows(query[None, :])[0]
+
+        if filters:
+            candidates = self._candidate_rows(filters)
+            if candidates.size == 0:
+                return []
+            scores = self._matrix[candidates] @ query
+        else:
+            candidates = None
+            scores = self._matrix[: self._size] @ query
+
+        k = min(top_k, scores.shape[0])
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        if score_threshold is not None:
+            top = top[scores[top] >= score_threshold]
+
+        rows = candidates[top] if candidates is not None else top
+        results = []
+        for row, score in zip(rows.tolist(), scores[top].tolist(), strict=True):
+            hit = {"id": self._ids[row], "score": score, "payload": dict(self._payloads[row])}
+            if with_vectors:
+                hit["vector"] = self._matrix[row].tolist()
+            results.append(hit)
+        return results
+
+    # ------------------------------------------------------------------
+    # Filtres
+    # ------------------------------------------------------------------
+
+    def _candidate_rows(self, filters: Dict[str, Any]) -> np.ndarray:
+        selected: Optional[Set[int]] = None
+        for field, expected in filters.items():
+            index = self._field_index.get(field)
+            if index is None:
+                index = self._build_field_index(field)
+            values = expected if isinstance(expected, (list, tuple, set)) else [expected]
+            matching: Set[int] = set()
+            for value in values:
+                if isinstance(value, Hashable):
+                    matching |= index.get(value, set())
+            selected = matching if selected is None else selected & matching
+            if not selected:
+                return np.empty(0, dtype=np.int64)
+        return np.fromiter(sorted(selected), dtype=np.int64, count=len(selected))
+
+    def _build_field_index(self, field: str) -> Dict[Hashable, Set[int]]:
+        index: Dict[Hashable, Set[int]] = {}
+        self._field_index[field] = index
+        for row in range(self._size):
+            for value in _payload_values(self._payloads[row], field):
+                index.setdefault(value, set()).add(row)
+        return index
+
+    def _index_payload(self, row: int) -> None:
+        for field, index in self._field_index.items():
+            for value in _payload_values(self._payloads[row], field):
+                index.setdefault(value, set()).add(row)
+
+    def _unindex_payload(self, row: int) -> None:
+        for field, index in self._field_index.items():
+            for value in _payload_values(self._payloads[row], field):
+                rows = index.get(value)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del index[value]
+
+    def _append_row(self, point_id: Any) -> int:
+        if self._size == self._matrix.shape[0]:
+            grown = np.empty((self._matrix.shape[0] * 2, self.dim), dtype=np.float32)
+            grown[: self._size] = self._matrix[: self._size]
+            self._matrix = grown
+        row = self._size
+        self._size += 1
+        self._ids.append(point_id)
+        self._payloads.append({})
+        self._rows[point_id] = row
+        return row
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _payload_values(payload: Dict[str, Any], field: str) -> List[Hashable]:
+    value = payload.get(field)
+    if value is None:
+        return []
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return [v for v in values if isinstance(v, Hashable)]
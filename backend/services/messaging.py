@@ -11,35 +11,59 @@ except ImportError:  # pragma: no cover
     redis_async = None  # type: ignore
 
 from config import get_settings
+from services.circuit_breaker import CircuitBreaker, backend_breaker
 
 logger = logging.getLogger(__name__)
 
 
 class MessagingService:
-    """Bus publication / requête basé sur Redis avec tampon local."""
+    """
+    Bus publication / requête basé sur Redis avec tampon local.
 
-    def __init__(self) -> None:
+    Tant que le disjoncteur ``breaker`` est ouvert, les messages vont
+    directement dans le tampon, sans tentative de connexion.
+    """
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None) -> None:
         self.settings = get_settings()
+        self.breaker = breaker if breaker is not None else backend_breaker("redis")
         self._client: Optional["redis_async.Redis"] = None
         self._buffer: List[Dict[str, Any]] = []
 
     async def _get_client(self) -> Optional["redis_async.Redis"]:
-        if self._client or not redis_async:
+        if not redis_async or not self.breaker.allow_request():
+            return None
+        if self._client:
             return self._client
         try:
-            self._client = redis_async.from_url(self.settings.messaging.url, encoding="utf-8", decode_responses=True)
+            self._client = redis_async.from_url(
+                self.settings.messaging.url,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=self.settings.resilience.connect_timeout_seconds,
+            )
         except Exception as exc:  # pragma: no cover
+            self.breaker.record_failure(exc)
             logger.warning("Connexion Redis indisponible, fallback buffer", exc_info=exc)
             self._client = None
         return self._client
 
+    def _report(self, error: Optional[BaseException] = None) -> None:
+        # Une erreur de commande (ResponseError) prouve que Redis répond
+        if error is None or isinstance(error, redis_async.ResponseError):
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(error)
+
     async def publish(self, subject: str, payload: Dict[str, Any]) -> None:
         client = await self._get_client()
         if client:
             try:
                 await client.publish(subject, json.dumps(payload, default=str))
+                self._report()
                 return
             except Exception as exc:  # pragma: no cover
+                self._report(exc)
                 logger.error("Publication Redis échouée, fallback buffer", exc_info=exc)
         logger.info("[Messaging:fallback] publish", extra={"subject": subject})
         self._buffer.append({"subject": subject, "payload": payload})
@@ -50,8 +74,10 @@ class MessagingService:
             try:
                 stream = f"req:{subject}"
                 entry_id = await client.xadd(stream, {"payload": json.dumps(payload, default=str)})
+                self._report()
                 return {"subject": subject, "status": "accepted", "entry_id": entry_id}
             except Exception as exc:  # pragma: no cover
+                self._report(exc)
                 logger.error("Request Redis échouée, fallback buffer", exc_info=exc)
         logger.info("[Messaging:fallback] request", extra={"subject": subject})
         self._buffer.append({"subject": subject, "payload": payload, "kind": "request"})
@@ -1,33 +1,143 @@
-"""Wrapper around le runtime Ollama local."""
+"""
+Wrapper around le runtime Ollama local.
+
+Toutes les instances d'OllamaService partagent un pool de connexions
+HTTP par boucle asyncio et par URL: connexions keep-alive réutilisées
+entre services, nombre de connexions borné, fermeture unique dans le
+lifespan de l'app (``close_shared_clients``). Le pool est réparti sur
+quelques clients httpx utilisés à tour de rôle: un seul client passe son
+temps à attribuer les requêtes en attente à ses connexions sous forte
+concurrence.
+"""
 from __future__ import annotations
 
+import asyncio
+import itertools
+import json
 import logging
-from typing import Any, Dict, List, Optional
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 
+try:
+    import h2  # noqa: F401
+except ImportError:  # pragma: no cover - dépendance optionnelle (httpx[http2])
+    h2 = None  # type: ignore
+
 from config import get_settings
+from services.circuit_breaker import CircuitBreaker
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_cache import EmbeddingCacheService
+from services.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+CHAT_FALLBACK_MESSAGE = (
+    "Je suis AgenticAI, votre assistant intelligent. (Mode démo - Ollama non disponible)"
+)
+
+# Boucle asyncio -> {base_url: [clients]}: un client httpx est lié à la boucle
+# qui a ouvert ses connexions
+_shared_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+_next_shard = itertools.count()
+
+
+def _build_client(settings) -> httpx.AsyncClient:
+    shards = max(1, settings.ollama_pool_shards)
+    http2 = settings.ollama_http2 and h2 is not None
+    if settings.ollama_http2 and not http2:
+        logger.warning("HTTP/2 demandé pour Ollama mais h2 absent (pip install 'httpx[http2]')")
+    return httpx.AsyncClient(
+        base_url=settings.ollama_base_url,
+        # Timeout par défaut = génération; embed et health check ont le leur
+        timeout=httpx.Timeout(
+            settings.ollama_timeout_seconds, connect=settings.ollama_connect_timeout_seconds
+        ),
+        limits=httpx.Limits(
+            max_connections=max(1, settings.ollama_max_connections // shards),
+            max_keepalive_connections=max(1, settings.ollama_max_keepalive_connections // shards),
+            keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+        ),
+        http2=http2,
+    )
+
+
+async def close_shared_clients() -> None:
+    """Ferme les pools partagés ouverts dans la boucle courante (arrêt de l'app)."""
+    pools = _shared_clients.pop(asyncio.get_running_loop(), {})
+    for clients in pools.values():
+        for client in clients:
+            await client.aclose()
+
 
 class OllamaService:
     """Client asynchrone vers Ollama avec repli local."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        embedding_cache: Optional[EmbeddingCacheService] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
         self.settings = get_settings()
+        # Circuit ouvert (Ollama connu en panne): replis immédiats, sans appel HTTP
+        self.breaker = breaker
+        # Client propre à l'instance (tests); sinon pool partagé
         self._client: Optional[httpx.AsyncClient] = None
+        connect = self.settings.ollama_connect_timeout_seconds
+        self.health_timeout = httpx.Timeout(self.settings.ollama_health_timeout_seconds)
+        self.embed_timeout = httpx.Timeout(
+            self.settings.ollama_embed_timeout_seconds, connect=connect
+        )
+        if embedding_cache is None and self.settings.embedding_cache_size > 0:
+            embedding_cache = EmbeddingCacheService(
+                max_entries=self.settings.embedding_cache_size,
+                disk_path=self.settings.embedding_cache_path,
+            )
+        self.embedding_cache = embedding_cache
+        # Textes en cours de vectorisation, partagés entre appels concurrents
+        self.embed_flights = SingleFlight()
+        # Textes des appels concurrents regroupés en un seul /api/embed
+        self.embed_batcher = EmbeddingBatcher(
+            self._embed_remote,
+            max_batch_size=self.settings.embedding_batch_max_size,
+            max_wait_ms=self.settings.embedding_batch_window_ms,
+        )
 
     async def _get_client(self) -> Optional[httpx.AsyncClient]:
-        if self._client is None:
+        """Client HTTP pour un appel, ou None si le disjoncteur le refuse."""
+        if self.breaker is not None and not self.breaker.allow_request():
+            return None
+        return await self._http_client()
+
+    async def _http_client(self) -> Optional[httpx.AsyncClient]:
+        if self._client is not None:
+            return self._client
+        pools = _shared_clients.setdefault(asyncio.get_running_loop(), {})
+        clients = pools.get(self.settings.ollama_base_url)
+        if not clients or clients[0].is_closed:
             try:
-                self._client = httpx.AsyncClient(
-                    base_url=self.settings.ollama_base_url,
-                    timeout=self.settings.ollama_timeout_seconds,
-                )
+                clients = pools[self.settings.ollama_base_url] = [
+                    _build_client(self.settings)
+                    for _ in range(max(1, self.settings.ollama_pool_shards))
+                ]
             except Exception as exc:  # pragma: no cover
                 logger.warning("Impossible d'initialiser le client Ollama", exc_info=exc)
-        return self._client
+                return None
+        return clients[next(_next_shard) % len(clients)]
+
+    async def aclose(self) -> None:
+        """
+        Ferme le client propre à l'instance et le cache d'embeddings.
+
+        Le pool partagé reste ouvert pour les autres instances: il est fermé
+        par ``close_shared_clients`` à l'arrêt de l'app.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.embedding_cache is not None:
+            self.embedding_cache.close()
 
     async def chat(self, prompt: str, model: str | None = None, **kwargs: Any) -> Dict[str, Any]:
         model_name = model or self.settings.ollama_models[0].name
@@ -36,15 +146,51 @@ class OllamaService:
         if client:
             try:
                 response = await client.post("/api/generate", json=payload)
+                self._report()
                 response.raise_for_status()
                 data = response.json()
                 output = data.get("response") or data.get("output") or ""
                 return {"model": model_name, "output": output, "raw": data}
             except httpx.HTTPError as exc:
+                self._report(exc)
                 logger.warning("Ollama chat HTTPError", exc_info=exc)
         logger.info("[Ollama:fallback] chat", extra={"model": model_name})
         return {"model": model_name, "output": f"Stub response for: {prompt[:64]}"}
 
+    async def generate(
+        self,
+        prompt: str,
+        model: str | None = None,
+        options: Dict[str, Any] | None = None,
+        system_prompt: str | None = None,
+    ) -> str:
+        """
+        Complétion simple (non streamée) via /api/generate.
+
+        Returns:
+            Texte généré, ou chaîne vide si Ollama est indisponible
+        """
+        model_name = model or self.settings.ollama_model
+        payload: Dict[str, Any] = {"model": model_name, "prompt": prompt, "stream": False}
+        if system_prompt:
+            payload["system"] = system_prompt
+        if options:
+            payload["options"] = options
+
+        client = await self._get_client()
+        if client:
+            try:
+                response = await client.post("/api/generate", json=payload)
+                self._report()
+                response.raise_for_status()
+                return response.json().get("response", "")
+            except httpx.HTTPError as exc:
+                self._report(exc)
+                logger.warning("Ollama generate HTTPError", exc_info=exc)
+
+        logger.info("[Ollama:fallback] generate", extra={"model": model_name})
+        return ""
+
     async def chat_completion(
         self,
         user_message: str,
@@ -67,6 +213,96 @@ class OllamaService:
             Generated response text
         """
         model_name = model or self.settings.ollama_model
+        payload = self._build_chat_payload(
+            user_message, system_prompt, model_name, temperature, max_tokens, stream=False
+        )
+
+        client = await self._get_client()
+        if client:
+            try:
+                response = await client.post("/api/chat", json=payload)
+                self._report()
+                response.raise_for_status()
+                data = response.json()
+                return data.get("message", {}).get("content", "")
+            except httpx.HTTPError as exc:
+                self._report(exc)
+                logger.warning("Ollama chat completion HTTPError", exc_info=exc)
+
+        logger.info("[Ollama:fallback] chat_completion", extra={"model": model_name})
+        return CHAT_FALLBACK_MESSAGE
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: str | None = None,
+        model: str | None = None,
+        temperature: float = 0.7,
+        max_tokens: int = 2000,
+    ) -> AsyncIterator[str]:
+        """
+        Génère une réponse token par token via le flux NDJSON de /api/chat.
+
+        Chaque ligne est lue dès qu'Ollama l'émet et le token est rendu
+        immédiatement. Le générateur ne lit la ligne suivante que lorsque le
+        consommateur la demande (backpressure via le contrôle de flux TCP).
+        Si le consommateur s'arrête ou est annulé (client SSE déconnecté), la
+        réponse HTTP est fermée, ce qui interrompt la génération côté Ollama.
+
+        Args:
+            prompt: Message de l'utilisateur
+            system_prompt: Instructions système optionnelles
+            model: Nom du modèle (défaut: settings)
+            temperature: Température de génération (0-1)
+            max_tokens: Nombre maximum de tokens générés
+
+        Yields:
+            Fragments de texte dans l'ordre de génération
+        """
+        model_name = model or self.settings.ollama_model
+        payload = self._build_chat_payload(
+            prompt, system_prompt, model_name, temperature, max_tokens, stream=True
+        )
+
+        client = await self._get_client()
+        if client:
+            produced = False
+            try:
+                async with client.stream("POST", "/api/chat", json=payload) as response:
+                    self._report()
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        data = json.loads(line)
+                        if data.get("error"):
+                            raise httpx.HTTPError(data["error"])
+                        token = data.get("message", {}).get("content", "")
+                        if token:
+                            produced = True
+                            yield token
+                        if data.get("done"):
+                            return
+                return
+            except (httpx.HTTPError, json.JSONDecodeError) as exc:
+                self._report(exc)
+                logger.warning("Ollama stream HTTPError", exc_info=exc)
+                if produced:
+                    # Réponse partielle déjà envoyée: on s'arrête proprement
+                    return
+
+        logger.info("[Ollama:fallback] generate_stream", extra={"model": model_name})
+        yield CHAT_FALLBACK_MESSAGE
+
+    @staticmethod
+    def _build_chat_payload(
+        user_message: str,
+        system_prompt: str | None,
+        model_name: str,
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+    ) -> Dict[str, Any]:
         messages = []
 
         if system_prompt:
@@ -74,57 +310,134 @@ class OllamaService:
 
         messages.append({"role": "user", "content": user_message})
 
-        payload = {
+        return {
             "model": model_name,
             "messages": messages,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": temperature,
                 "num_predict": max_tokens,
             }
         }
 
-        client = await self._get_client()
-        if client:
-            try:
-                response = await client.post("/api/chat", json=payload)
-                response.raise_for_status()
-                data = response.json()
-                return data.get("message", {}).get("content", "")
-            except httpx.HTTPError as exc:
-                logger.warning("Ollama chat completion HTTPError", exc_info=exc)
-
-        logger.info("[Ollama:fallback] chat_completion", extra={"model": model_name})
-        return f"Je suis AgenticAI, votre assistant intelligent. (Mode démo - Ollama non disponible)"
-
     async def is_available(self) -> bool:
-        """Check if Ollama is available"""
-        client = await self._get_client()
+        """
+        Sonde /api/tags. Ignore le disjoncteur (c'est la sonde du moniteur de
+        santé): les routes lisent l'état en cache du moniteur.
+
+        Même règle que ``_report``: toute réponse HTTP, même une erreur 5xx,
+        prouve qu'Ollama répond; seules les erreurs de transport comptent.
+        """
+        client = await self._http_client()
         if client:
             try:
-                response = await client.get("/api/tags")
-                return response.status_code == 200
-            except:
+                await client.get("/api/tags", timeout=self.health_timeout)
+                return True
+            except httpx.TransportError:
                 return False
         return False
 
-    async def embed(self, texts: List[str]) -> List[List[float]]:
+    def _report(self, error: Optional[BaseException] = None) -> None:
+        """
+        Rapporte l'issue d'un appel au disjoncteur. Seules les erreurs de
+        transport (connexion, timeout) comptent comme échecs: une réponse
+        d'erreur HTTP prouve qu'Ollama répond.
+        """
+        if self.breaker is None:
+            return
+        if error is None:
+            self.breaker.record_success()
+        elif isinstance(error, httpx.TransportError):
+            self.breaker.record_failure(error)
+
+    async def embed(self, texts: List[str], allow_fallback: bool = True) -> List[List[float]]:
+        """
+        Embeddings d'une liste de textes, via le cache puis /api/embed.
+
+        Seuls les textes absents du cache (dédoublonnés) sont envoyés à
+        Ollama. Un texte déjà en cours de calcul pour un autre appel
+        concurrent n'est pas renvoyé: l'appel attend ce calcul
+        (single-flight). Les textes restants passent par ``embed_batcher``,
+        qui les regroupe avec ceux des autres appels concurrents. Les
+        vecteurs de repli ne sont jamais mis en cache.
+
+        Avec ``allow_fallback=False`` (indexation), un texte qu'Ollama n'a
+        pas vectorisé lève une RuntimeError au lieu de recevoir le vecteur
+        de repli.
+        """
         embedding_model = next((m for m in self.settings.ollama_models if m.role == "embedding"), None)
         if not embedding_model:
             return []
+        if not texts:
+            return []
+
+        cache = self.embedding_cache
+        keys = [EmbeddingCacheService.make_key(embedding_model.name, text) for text in texts]
+        found = await cache.get_many(keys) if cache is not None else {}
+        misses = {key: text for key, text in zip(keys, texts, strict=True) if key not in found}
+
+        if misses:
+            found.update(
+                await self.embed_flights.do_many(
+                    misses, lambda own: self._embed_misses(embedding_model.name, own)
+                )
+            )
+
+        vectors = [found[key] for key in keys]
+        if any(vector is None for vector in vectors):
+            if not allow_fallback:
+                raise RuntimeError("Embeddings indisponibles: Ollama injoignable")
+            fallback = self._fallback_embeddings(1)[0]
+            vectors = [fallback if vector is None else vector for vector in vectors]
+        return vectors
+
+    async def _embed_misses(
+        self, model_name: str, misses: Dict[str, str]
+    ) -> Dict[str, Optional[List[float]]]:
+        """
+        Clé -> vecteur des textes absents du cache, mis en cache s'ils viennent
+        d'Ollama. None si Ollama est indisponible: le repli dépend de chaque
+        appelant coalescé (cf. ``embed``).
+        """
+        vectors = await self.embed_batcher.embed(model_name, list(misses.values()))
+        if vectors is None:
+            return dict.fromkeys(misses)
+        fetched = dict(zip(misses, vectors, strict=True))
+        if self.embedding_cache is not None:
+            await self.embedding_cache.put_many(fetched)
+        return fetched
+
+    async def _embed_remote(self, model_name: str, texts: List[str]) -> Optional[List[List[float]]]:
+        """Appel /api/embed; None si Ollama est indisponible ou répond mal."""
         client = await self._get_client()
-        payload = {"model": embedding_model.name, "input": texts}
+        payload = {"model": model_name, "input": texts}
         if client:
             try:
-                response = await client.post("/api/embeddings", json=payload)
+                # /api/embed accepte une liste de textes en un seul appel
+                response = await client.post(
+                    "/api/embed", json=payload, timeout=self.embed_timeout
+                )
+                self._report()
                 response.raise_for_status()
                 data = response.json()
                 vectors = data.get("embeddings") or data.get("data") or []
-                return [vec.get("embedding", []) if isinstance(vec, dict) else vec for vec in vectors]
+                vectors = [
+                    vec.get("embedding", []) if isinstance(vec, dict) else vec for vec in vectors
+                ]
+                if len(vectors) == len(texts):
+                    return vectors
+                logger.warning(
+                    "Ollama embeddings: %s vecteurs reçus pour %s textes", len(vectors), len(texts)
+                )
             except httpx.HTTPError as exc:
+                self._report(exc)
                 logger.warning("Ollama embeddings HTTPError", exc_info=exc)
         logger.info("[Ollama:fallback] embeddings", extra={"count": len(texts)})
-        return [[0.0 for _ in range(8)] for _ in texts]
+        return None
+
+    @staticmethod
+    def _fallback_embeddings(count: int) -> List[List[float]]:
+        return [[0.0 for _ in range(8)] for _ in range(count)]
 
     async def generate_embedding(self, text: str, model: str | None = None) -> List[float]:
         """Generate embedding for a single text. Helper method for RAG agents."""
@@ -143,6 +456,7 @@ class OllamaService:
                 data["language"] = language
             try:
                 response = await client.post("/api/audio/transcriptions", files=files, data=data)
+                self._report()
                 response.raise_for_status()
                 payload = response.json()
                 return {
@@ -151,6 +465,7 @@ class OllamaService:
                     "model": asr_model.name,
                 }
             except httpx.HTTPError as exc:
+                self._report(exc)
                 logger.warning("Ollama transcription HTTPError", exc_info=exc)
         logger.info("[Ollama:fallback] transcribe", extra={"language": language or "auto"})
         return {"text": "", "language": language or "auto", "model": asr_model.name}
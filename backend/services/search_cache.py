@@ -10,6 +10,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 from collections import OrderedDict
 
+from services.memory_index import InMemoryVectorIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,30 +35,52 @@ class SearchCacheService:
     - TTL (Time To Live) configurable par entrée
     - Statistiques d'utilisation
     - Nettoyage automatique des entrées expirées
+    - Tier sémantique optionnel: une requête dont l'embedding est proche
+      (distance cosinus) d'une requête déjà cachée, avec les mêmes
+      paramètres, réutilise son résultat
     """
 
     def __init__(
         self,
         max_size: int = 1000,
         default_ttl: Optional[float] = 3600.0,  # 1 heure par défaut
+        semantic_max_distance: Optional[float] = None,
     ):
         """
         Args:
             max_size: Nombre maximum d'entrées dans le cache
             default_ttl: Durée de vie par défaut en secondes (None = infini)
+            semantic_max_distance: Distance cosinus max (1 - similarité) pour un
+                hit sémantique (None = tier sémantique désactivé)
         """
         self.max_size = max_size
         self.default_ttl = default_ttl
+        self.semantic_max_distance = semantic_max_distance
         self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
 
+        # Tier sémantique: un seul index d'embeddings de requêtes, chaque ligne
+        # étiquetée par son jeu de paramètres (partition). Sa taille suit celle
+        # du cache exact: une entrée évincée ou expirée quitte l'index.
+        self._semantic_index = InMemoryVectorIndex()
+
         # Statistiques
         self.stats = {
             "hits": 0,
             "misses": 0,
             "evictions": 0,
             "expirations": 0,
+            "semantic_hits": 0,
+            "semantic_misses": 0,
         }
 
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.semantic_max_distance is not None
+
+    def make_key(self, query: str, **kwargs) -> str:
+        """Clé de cache d'une requête (partagée avec la coalescence des recherches)."""
+        return self._generate_key(query, **kwargs)
+
     def _generate_key(self, query: str, **kwargs) -> str:
         """
         Génère une clé de cache unique basée sur la requête et les paramètres.
@@ -122,11 +146,59 @@ class SearchCacheService:
 
         return entry.value
 
+    def get_semantic(self, embedding: List[float], **kwargs) -> Optional[Any]:
+        """
+        Cherche une entrée dont l'embedding de requête est proche de ``embedding``.
+
+        Seules les entrées cachées avec les mêmes paramètres (filtres, top_k,
+        collection...) sont candidates. La recherche est un produit
+        matrice-vecteur sur les lignes de cette partition.
+
+        Args:
+            embedding: Embedding de la nouvelle requête
+            **kwargs: Paramètres de recherche
+
+        Returns:
+            Valeur mise en cache ou None si aucune requête assez proche
+        """
+        if not self.semantic_enabled or not embedding:
+            return None
+
+        hits = []
+        if len(self._semantic_index):
+            try:
+                hits = self._semantic_index.search(
+                    embedding,
+                    top_k=1,
+                    score_threshold=1.0 - self.semantic_max_distance,
+                    filters={"partition": self._generate_key("", **kwargs)},
+                )
+            except ValueError:
+                hits = []  # Dimension différente (changement de modèle d'embedding)
+
+        entry = self._cache.get(hits[0]["id"]) if hits else None
+        if entry is None or self._is_expired(entry):
+            if entry is not None:
+                self._remove(entry.key)
+                self.stats["expirations"] += 1
+            self.stats["semantic_misses"] += 1
+            return None
+
+        entry.accessed_at = time.time()
+        entry.access_count += 1
+        self._cache.move_to_end(entry.key)
+
+        self.stats["semantic_hits"] += 1
+        logger.debug(f"[SearchCache] SEMANTIC HIT (similarité={hits[0]['score']:.3f})")
+
+        return entry.value
+
     def set(
         self,
         query: str,
         value: Any,
         ttl: Optional[float] = None,
+        embedding: Optional[List[float]] = None,
         **kwargs
     ) -> str:
         """
@@ -136,6 +208,7 @@ class SearchCacheService:
             query: Requête de recherche
             value: Valeur à cacher
             ttl: Durée de vie custom (secondes), sinon utilise default_ttl
+            embedding: Embedding de la requête, indexé pour le tier sémantique
             **kwargs: Paramètres de recherche
 
         Returns:
@@ -161,6 +234,16 @@ class SearchCacheService:
         self._cache[key] = entry
         self._cache.move_to_end(key)
 
+        if self.semantic_enabled and embedding:
+            partition = self._generate_key("", **kwargs)
+            try:
+                self._semantic_index.upsert(
+                    [{"id": key, "vector": embedding, "payload": {"partition": partition}}]
+                )
+            except ValueError as exc:
+                self._forget_embedding(key)
+                logger.warning(f"[SearchCache] Embedding non indexé: {exc}")
+
         logger.debug(f"[SearchCache] SET: {query[:50]}... (ttl={entry.ttl}s)")
 
         return key
@@ -188,6 +271,7 @@ class SearchCacheService:
         """
         count = len(self._cache)
         self._cache.clear()
+        self._semantic_index = InMemoryVectorIndex()
         logger.info(f"[SearchCache] Cache vidé: {count} entrées supprimées")
         return count
 
@@ -222,6 +306,12 @@ class SearchCacheService:
         total_requests = self.stats["hits"] + self.stats["misses"]
         hit_rate = self.stats["hits"] / total_requests if total_requests > 0 else 0.0
 
+        # Le tier sémantique n'est consulté qu'après un miss exact
+        semantic_lookups = self.stats["semantic_hits"] + self.stats["semantic_misses"]
+        semantic_hit_rate = (
+            self.stats["semantic_hits"] / semantic_lookups if semantic_lookups > 0 else 0.0
+        )
+
         return {
             "size": len(self._cache),
             "max_size": self.max_size,
@@ -231,6 +321,10 @@ class SearchCacheService:
             "evictions": self.stats["evictions"],
             "expirations": self.stats["expirations"],
             "total_requests": total_requests,
+            "semantic_size": len(self._semantic_index),
+            "semantic_hits": self.stats["semantic_hits"],
+            "semantic_misses": self.stats["semantic_misses"],
+            "semantic_hit_rate": semantic_hit_rate,
         }
 
     def _is_expired(self, entry: CacheEntry) -> bool:
@@ -245,9 +339,17 @@ class SearchCacheService:
         """Supprime une entrée du cache"""
         if key in self._cache:
             del self._cache[key]
+            self._forget_embedding(key)
             return True
         return False
 
+    def _forget_embedding(self, key: str) -> None:
+        """Retire l'embedding d'une entrée du tier sémantique"""
+        self._semantic_index.delete([key])
+        if not len(self._semantic_index):
+            # Index vide: la dimension sera fixée par le prochain embedding
+            self._semantic_index = InMemoryVectorIndex()
+
     def _evict_lru(self):
         """Éviction LRU: supprime l'entrée la moins récemment utilisée"""
         if not self._cache:
@@ -255,6 +357,7 @@ class SearchCacheService:
 
         # OrderedDict: first item = least recently used
         key, entry = self._cache.popitem(last=False)
+        self._forget_embedding(key)
         self.stats["evictions"] += 1
 
         logger.debug(f"[SearchCache] LRU éviction: {key} (age={time.time() - entry.created_at:.1f}s)")
@@ -0,0 +1,89 @@
+"""
+Coalescence des appels identiques concurrents (single-flight).
+
+Quand N appelants demandent la même clé pendant qu'un calcul est en cours
+(requête populaire juste après une expiration ou un vidage de cache), un
+seul calcul est lancé et tous en partagent le résultat ou l'exception.
+
+Le calcul tourne dans sa propre tâche: l'annulation d'un appelant (client
+HTTP déconnecté) ne l'interrompt pas pour les autres.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, TypeVar
+
+logger = logging.getLogger(__name__)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+R = TypeVar("R")
+
+
+class SingleFlight:
+    """Appels en cours par clé, partagés entre appelants concurrents."""
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._calls = 0
+        self._shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[R]]) -> R:
+        """Résultat de ``fn()``, calculé une seule fois pour les appels concurrents de ``key``."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._launch([key], fn())
+        else:
+            self._shared += 1
+        return await asyncio.shield(task)
+
+    async def do_many(
+        self,
+        items: Mapping[K, V],
+        fn: Callable[[Dict[K, V]], Awaitable[Mapping[K, R]]],
+    ) -> Dict[K, R]:
+        """
+        Variante groupée: les clés déjà en cours rejoignent le calcul qui les
+        produit, les autres sont calculées par un seul appel ``fn(items)``.
+
+        Args:
+            items: Clé -> entrée du calcul (ex: hash -> texte à vectoriser)
+            fn: Calcul groupé, renvoie clé -> résultat pour toutes ses clés
+
+        Returns:
+            Clé -> résultat pour toutes les clés de ``items``
+        """
+        own = {key: value for key, value in items.items() if key not in self._inflight}
+        waits = {self._inflight[key] for key in items if key not in own}
+        self._shared += len(items) - len(own)
+        if own:
+            waits.add(self._launch(list(own), fn(own)))
+
+        results: Dict[K, R] = {}
+        for task in waits:
+            results.update(await asyncio.shield(task))
+        return {key: results[key] for key in items}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": len(self._inflight),
+            "calls": self._calls,
+            "shared": self._shared,
+        }
+
+    def _launch(self, keys: list, coro: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._calls += 1
+        for key in keys:
+            self._inflight[key] = task
+
+        def done(finished: asyncio.Task) -> None:
+            for key in keys:
+                if self._inflight.get(key) is finished:
+                    del self._inflight[key]
+            # Tous les appelants annulés: l'exception n'est lue par personne
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.debug("[SingleFlight] calcul en échec", exc_info=finished.exception())
+
+        task.add_done_callback(done)
+        return task
@@ -2,27 +2,58 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, List, Optional
+import uuid
+from typing import Any, Dict, List, Optional, Set
 
 try:
     from qdrant_client import AsyncQdrantClient
     from qdrant_client.http import models as qmodels
+    from qdrant_client.http.exceptions import UnexpectedResponse
 except ImportError:  # pragma: no cover - dépendance optionnelle
     AsyncQdrantClient = None  # type: ignore
     qmodels = None  # type: ignore
+    UnexpectedResponse = None  # type: ignore
 
 from config import get_settings
+from services.circuit_breaker import CircuitBreaker, backend_breaker
+from services.keyword_index import KeywordIndexService
+from services.memory_index import InMemoryVectorIndex
 
 logger = logging.getLogger(__name__)
 
+# Champs de payload filtrés par les routes (cf. api/routes/documents.py)
+INDEXED_PAYLOAD_FIELDS = ("user_id", "doc_id", "format")
+
+# Qdrant n'accepte que des entiers ou des UUID comme identifiants de point:
+# les ids applicatifs (hash de chunk) sont convertis en UUID5 et conservés
+# dans le payload sous cette clé.
+POINT_ID_PAYLOAD_KEY = "point_id"
+_POINT_ID_NAMESPACE = uuid.UUID("6f1c6a58-8d3e-4f0e-9d55-2f6b1d3c7a10")
+
 
 class VectorStoreService:
-    """Client vectoriel : tente Qdrant, sinon conserve les embeddings en mémoire."""
+    """
+    Client vectoriel : tente Qdrant, sinon conserve les embeddings en mémoire.
+
+    Les chunks (points dont le payload a un ``content``) sont aussi indexés
+    en plein texte dans ``keyword_index`` pour la recherche hybride.
 
-    def __init__(self) -> None:
+    Tant que le disjoncteur ``breaker`` est ouvert (Qdrant injoignable),
+    les appels vont directement au fallback mémoire.
+    """
+
+    def __init__(
+        self,
+        keyword_index: Optional[KeywordIndexService] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
         self.settings = get_settings()
+        self.breaker = breaker if breaker is not None else backend_breaker("qdrant")
+        # Index BM25 en mémoire par défaut; persistant via get_vector_store()
+        self.keyword_index = keyword_index if keyword_index is not None else KeywordIndexService()
         self._client: Optional[AsyncQdrantClient] = None
-        self._collections: Dict[str, List[Dict[str, object]]] = {}
+        self._collections: Dict[str, InMemoryVectorIndex] = {}
+        self._ready_collections: Set[str] = set()
         if AsyncQdrantClient:
             try:
                 self._client = AsyncQdrantClient(url=self.settings.database.vector_url)
@@ -30,40 +61,294 @@ class VectorStoreService:
                 logger.warning("Connexion Qdrant indisponible, fallback mémoire", exc_info=exc)
                 self._client = None
 
+    async def aclose(self) -> None:
+        """Ferme le client Qdrant."""
+        if self._client is not None:
+            try:
+                await self._client.close()
+            except Exception as exc:  # pragma: no cover
+                logger.warning("Fermeture client Qdrant échouée", exc_info=exc)
+            self._client = None
+
+    def _use_qdrant(self) -> bool:
+        """Qdrant configuré et disjoncteur fermé (ou appel d'essai autorisé)."""
+        return self._client is not None and qmodels is not None and self.breaker.allow_request()
+
+    def _memory_only(self) -> bool:
+        """Aucun Qdrant configuré: la mémoire est le stockage de référence."""
+        return self._client is None or qmodels is None
+
+    def _report(self, error: Optional[BaseException] = None) -> None:
+        # Une réponse d'erreur HTTP (collection absente...) prouve que Qdrant répond
+        answered = UnexpectedResponse is not None and isinstance(error, UnexpectedResponse)
+        if error is None or answered:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(error)
+
     async def _ensure_collection(self, name: str, vector_size: int) -> None:
-        if not self._client or not qmodels:
+        if (
+            not self._client
+            or not qmodels
+            or name in self._ready_collections
+            or not self.breaker.available
+        ):
             return
         try:
             exists = await self._client.collection_exists(name)
             if not exists:
                 await self._client.create_collection(
-                    name=name,
+                    collection_name=name,
                     vectors_config=qmodels.VectorParams(size=vector_size, distance=qmodels.Distance.COSINE),
                 )
+            # Index de payload pour que les recherches filtrées restent rapides
+            # (création idempotente côté Qdrant)
+            for field_name in INDEXED_PAYLOAD_FIELDS:
+                await self._client.create_payload_index(
+                    collection_name=name,
+                    field_name=field_name,
+                    field_schema=qmodels.PayloadSchemaType.KEYWORD,
+                )
+            self._ready_collections.add(name)
         except Exception as exc:  # pragma: no cover
+            self._report(exc)
             logger.error("Création collection Qdrant échouée", exc_info=exc)
 
-    async def upsert_documents(self, collection: str, vectors: List[Dict[str, object]]) -> None:
+    @staticmethod
+    def _to_qdrant_id(point_id: Any) -> Any:
+        """Convertit un id applicatif en id accepté par Qdrant (entier ou UUID)."""
+        if isinstance(point_id, int):
+            return point_id
+        try:
+            return str(uuid.UUID(str(point_id)))
+        except ValueError:
+            return str(uuid.uuid5(_POINT_ID_NAMESPACE, str(point_id)))
+
+    @staticmethod
+    def _build_filter(filters: Dict | None) -> Optional[qmodels.Filter]:
+        """
+        Traduit un dict de filtres en Filter Qdrant.
+
+        Chaque clé devient une condition ``must``: valeur scalaire -> MatchValue,
+        liste -> MatchAny.
+        """
+        if not filters or not qmodels:
+            return None
+        conditions = []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                match = qmodels.MatchAny(any=list(value))
+            else:
+                match = qmodels.MatchValue(value=value)
+            conditions.append(qmodels.FieldCondition(key=key, match=match))
+        return qmodels.Filter(must=conditions) if conditions else None
+
+    @staticmethod
+    def _format_hit(hit: Any) -> Dict[str, object]:
+        """Point Qdrant -> dict de résultat, avec l'id applicatif d'origine."""
+        payload = dict(hit.payload or {})
+        point_id = payload.pop(POINT_ID_PAYLOAD_KEY, hit.id)
+        result = {"id": point_id, "score": hit.score, "payload": payload}
+        if hit.vector is not None:
+            result["vector"] = hit.vector
+        return result
+
+    async def upsert_documents(self, collection: str, vectors: List[Dict[str, object]]) -> bool:
+        """
+        Upsert des points, puis de leurs chunks dans l'index plein texte.
+
+        Returns:
+            True si les vecteurs sont écrits dans Qdrant (ou en mémoire quand
+            Qdrant n'est pas configuré), False s'ils ne sont conservés que
+            dans le fallback mémoire
+
+        Raises:
+            ValueError: Points refusés par l'index mémoire (dimension
+                incompatible); l'index plein texte n'est alors pas modifié
+        """
         if not vectors:
-            return
-        if self._client and qmodels:
+            return True
+        # Lève si aucun index vectoriel n'a accepté les points: le plein
+        # texte ne doit pas retrouver des chunks absents de la recherche
+        stored = await self._upsert_vectors(collection, vectors)
+        try:
+            await self.keyword_index.upsert(collection, vectors)
+        except Exception as exc:  # pragma: no cover
+            logger.error("Indexation plein texte échouée", exc_info=exc)
+        return stored
+
+    async def _upsert_vectors(self, collection: str, vectors: List[Dict[str, object]]) -> bool:
+        if self._use_qdrant():
             vector_size = len(vectors[0].get("vector", [])) if vectors[0].get("vector") else 0
             await self._ensure_collection(collection, vector_size)
             try:
                 points = [
                     qmodels.PointStruct(
-                        id=point.get("id"),
+                        id=self._to_qdrant_id(point.get("id")),
                         vector=point.get("vector"),
-                        payload=point.get("payload", {}),
+                        payload={**point.get("payload", {}), POINT_ID_PAYLOAD_KEY: point.get("id")},
                     )
                     for point in vectors
                 ]
                 await self._client.upsert(collection_name=collection, points=points)
-                return
+                self._report()
+                return True
             except Exception as exc:  # pragma: no cover
+                self._report(exc)
                 logger.error("Upsert Qdrant échoué, fallback mémoire", exc_info=exc)
         logger.info("[VectorStore:fallback] upsert", extra={"collection": collection, "count": len(vectors)})
-        self._collections.setdefault(collection, []).extend(vectors)
+        try:
+            self._collections.setdefault(collection, InMemoryVectorIndex()).upsert(vectors)
+        except ValueError as exc:
+            logger.error("Upsert mémoire refusé", exc_info=exc)
+            raise
+        return self._memory_only()
+
+    async def delete_points(self, collection: str, point_ids: List[Any]) -> bool:
+        """
+        Supprime des points par id applicatif.
+
+        Returns:
+            True si la suppression a atteint Qdrant (ou la mémoire quand Qdrant
+            n'est pas configuré), False si seul le fallback mémoire est touché
+        """
+        if not point_ids:
+            return True
+        try:
+            await self.keyword_index.delete(collection, point_ids)
+        except Exception as exc:  # pragma: no cover
+            logger.error("Suppression plein texte échouée", exc_info=exc)
+        if self._use_qdrant():
+            try:
+                await self._client.delete(
+                    collection_name=collection,
+                    points_selector=qmodels.PointIdsList(
+                        points=[self._to_qdrant_id(point_id) for point_id in point_ids]
+                    ),
+                )
+                self._report()
+                return True
+            except Exception as exc:  # pragma: no cover
+                self._report(exc)
+                logger.error("Suppression Qdrant échouée, fallback mémoire", exc_info=exc)
+        logger.info(
+            "[VectorStore:fallback] delete",
+            extra={"collection": collection, "count": len(point_ids)},
+        )
+        index = self._collections.get(collection)
+        if index is not None:
+            index.delete(point_ids)
+        return self._memory_only()
+
+    async def set_payload(
+        self, collection: str, point_ids: List[Any], payload: Dict[str, Any]
+    ) -> None:
+        """Fusionne ``payload`` dans le payload de points existants (sans toucher aux vecteurs)."""
+        if not point_ids:
+            return
+        try:
+            await self.keyword_index.set_payload(collection, point_ids, payload)
+        except Exception as exc:  # pragma: no cover
+            logger.error("Mise à jour de payload plein texte échouée", exc_info=exc)
+        if self._use_qdrant():
+            try:
+                await self._client.set_payload(
+                    collection_name=collection,
+                    payload=payload,
+                    points=[self._to_qdrant_id(point_id) for point_id in point_ids],
+                )
+                self._report()
+                return
+            except Exception as exc:  # pragma: no cover
+                self._report(exc)
+                logger.error(
+                    "Mise à jour de payload Qdrant échouée, fallback mémoire", exc_info=exc
+                )
+        logger.info(
+            "[VectorStore:fallback] set_payload",
+            extra={"collection": collection, "count": len(point_ids)},
+        )
+        index = self._collections.get(collection)
+        if index is not None:
+            index.set_payload(point_ids, payload)
+
+    async def set_payloads(self, collection: str, payloads: Dict[Any, Dict[str, Any]]) -> bool:
+        """
+        Fusionne un payload propre à chaque point (id applicatif -> payload),
+        en un seul appel Qdrant ``batch_update_points``.
+
+        Returns:
+            True si la mise à jour a atteint Qdrant (ou la mémoire quand Qdrant
+            n'est pas configuré), False si seul le fallback mémoire est touché
+        """
+        if not payloads:
+            return True
+        try:
+            await self.keyword_index.set_payloads(collection, payloads)
+        except Exception as exc:  # pragma: no cover
+            logger.error("Mise à jour de payloads plein texte échouée", exc_info=exc)
+        if self._use_qdrant():
+            try:
+                await self._client.batch_update_points(
+                    collection_name=collection,
+                    update_operations=[
+                        qmodels.SetPayloadOperation(
+                            set_payload=qmodels.SetPayload(
+                                payload=payload, points=[self._to_qdrant_id(point_id)]
+                            )
+                        )
+                        for point_id, payload in payloads.items()
+                    ],
+                )
+                self._report()
+                return True
+            except Exception as exc:  # pragma: no cover
+                self._report(exc)
+                logger.error(
+                    "Mise à jour de payloads Qdrant échouée, fallback mémoire", exc_info=exc
+                )
+        logger.info(
+            "[VectorStore:fallback] set_payloads",
+            extra={"collection": collection, "count": len(payloads)},
+        )
+        index = self._collections.get(collection)
+        if index is not None:
+            for point_id, payload in payloads.items():
+                index.set_payload([point_id], payload)
+        return self._memory_only()
+
+    async def retrieve_points(
+        self, collection: str, point_ids: List[Any]
+    ) -> List[Dict[str, Any]]:
+        """Points ``{"id", "vector", "payload"}`` existants parmi ``point_ids``."""
+        if not point_ids:
+            return []
+        if self._use_qdrant():
+            try:
+                records = await self._client.retrieve(
+                    collection_name=collection,
+                    ids=[self._to_qdrant_id(point_id) for point_id in point_ids],
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                self._report()
+                points = []
+                for record in records:
+                    payload = dict(record.payload or {})
+                    point_id = payload.pop(POINT_ID_PAYLOAD_KEY, record.id)
+                    points.append({"id": point_id, "vector": record.vector, "payload": payload})
+                return points
+            except Exception as exc:  # pragma: no cover
+                self._report(exc)
+                logger.error("Lecture de points Qdrant échouée, fallback mémoire", exc_info=exc)
+        logger.info(
+            "[VectorStore:fallback] retrieve",
+            extra={"collection": collection, "count": len(point_ids)},
+        )
+        index = self._collections.get(collection)
+        return index.retrieve(point_ids) if index is not None else []
 
     async def search(
         self,
@@ -72,29 +357,55 @@ class VectorStoreService:
         top_k: int = 5,
         score_threshold: float = 0.0,
         filters: Dict | None = None,
+        with_vectors: bool = False,
     ) -> List[Dict[str, object]]:
-        """Search vector store with optional filters and score threshold."""
-        if self._client:
+        """
+        Search vector store with optional filters and score threshold.
+
+        ``with_vectors`` adds each hit's ``vector`` in the same query (used
+        for diversity re-ranking without a second round-trip).
+        """
+        if self._use_qdrant():
             try:
-                hits = await self._client.search(
+                response = await self._client.query_points(
                     collection_name=collection_name,
-                    query_vector=query_vector,
+                    query=query_vector,
+                    query_filter=self._build_filter(filters),
                     limit=top_k,
                     score_threshold=score_threshold,
+                    with_payload=True,
+                    with_vectors=with_vectors,
                 )
-                return [
-                    {"id": hit.id, "score": hit.score, "payload": hit.payload}
-                    for hit in hits
-                ]
+                self._report()
+                return [self._format_hit(hit) for hit in response.points]
             except Exception as exc:  # pragma: no cover
+                self._report(exc)
                 logger.error("Search Qdrant échoué, fallback mémoire", exc_info=exc)
         logger.info("[VectorStore:fallback] search", extra={"collection": collection_name, "top_k": top_k})
-        memory_points = self._collections.get(collection_name, [])
-        # Format results to match Qdrant structure with score field
-        return [
-            {"id": p.get("id"), "score": 0.5, "payload": p.get("payload", {})}
-            for p in memory_points[:top_k]
-        ]
+        index = self._collections.get(collection_name)
+        if index is None:
+            return []
+        try:
+            return index.search(
+                query_vector,
+                top_k=top_k,
+                score_threshold=score_threshold,
+                filters=filters,
+                with_vectors=with_vectors,
+            )
+        except ValueError as exc:
+            logger.error("Recherche mémoire impossible", exc_info=exc)
+            return []
+
+    async def keyword_search(
+        self,
+        collection_name: str,
+        query: str,
+        top_k: int = 5,
+        filters: Dict | None = None,
+    ) -> List[Dict[str, object]]:
+        """Recherche BM25 dans l'index plein texte, mêmes filtres que ``search``."""
+        return await self.keyword_index.search(collection_name, query, top_k=top_k, filters=filters)
 
     async def ensure_collection(self, collection_name: str, vector_size: int) -> None:
         """Ensure collection exists, create if not. Public wrapper for _ensure_collection."""
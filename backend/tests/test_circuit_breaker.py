@@ -0,0 +1,70 @@
+"""Tests for circuit breakers on the Qdrant, Redis and Postgres fallbacks."""
+import pytest
+
+import services.database as database_module
+from services.circuit_breaker import CircuitBreaker, CircuitState
+from services.database import DatabaseService
+from services.vector_store import VectorStoreService
+
+
+def test_reconnect_delay_grows_exponentially_until_success():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        "postgres",
+        failure_threshold=1,
+        recovery_timeout=5.0,
+        backoff_factor=2.0,
+        max_recovery_timeout=12.0,
+        clock=lambda: now[0],
+    )
+
+    delays = []
+    for _ in range(4):
+        breaker.record_failure()
+        delays.append(breaker.retry_delay)
+        now[0] += breaker.retry_delay
+        assert breaker.allow_request() is True
+
+    assert delays == [5.0, 10.0, 12.0, 12.0]
+    breaker.record_success()
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.retry_delay == 5.0
+
+
+@pytest.mark.asyncio
+async def test_database_stops_reconnecting_while_circuit_is_open(monkeypatch):
+    attempts = []
+
+    async def create_pool(*args, **kwargs):
+        attempts.append(kwargs["timeout"])
+        raise OSError("connection refused")
+
+    monkeypatch.setattr(database_module.asyncpg, "create_pool", create_pool)
+    service = DatabaseService(breaker=CircuitBreaker("postgres", failure_threshold=2))
+
+    for _ in range(5):
+        await service.save_agent_execution({"agent_id": "chat.responder"})
+
+    assert len(attempts) == 2
+    assert service.breaker.state == CircuitState.OPEN
+    assert len(service._executions) == 5
+
+
+@pytest.mark.asyncio
+async def test_vector_store_goes_straight_to_memory_while_circuit_is_open():
+    calls = []
+
+    class DownQdrant:
+        async def query_points(self, **kwargs):
+            calls.append(kwargs["collection_name"])
+            raise ConnectionError("qdrant down")
+
+    store = VectorStoreService(breaker=CircuitBreaker("qdrant", failure_threshold=1))
+    store._client = DownQdrant()
+    store._collections.clear()
+
+    assert await store.search("documents", [1.0, 0.0]) == []
+    assert await store.search("documents", [1.0, 0.0]) == []
+
+    assert calls == ["documents"]
+    assert store.breaker.state == CircuitState.OPEN
@@ -0,0 +1,56 @@
+"""Tests for the process-wide services shared by the documents routes."""
+from datetime import datetime
+
+import httpx
+import pytest
+
+from api import dependencies
+from api.main import app
+from models.user import User
+from services.ollama import OllamaService
+from services.vector_store import VectorStoreService
+
+
+def test_providers_return_one_instance_per_process():
+    assert dependencies.get_search_cache() is dependencies.get_search_cache()
+    assert dependencies.get_search_flights() is dependencies.get_search_flights()
+    assert dependencies.get_reranker().score_cache is dependencies.get_rerank_cache()
+
+
+@pytest.mark.asyncio
+async def test_search_cache_persists_across_requests():
+    now = datetime.utcnow()
+    user = User(
+        id="u1", email="u1@example.com", username="u1", created_at=now, updated_at=now
+    )
+    ollama = OllamaService(embedding_cache=None)
+    ollama._client = httpx.AsyncClient(
+        base_url="http://ollama.test",
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"embeddings": [[1.0, 0.0]]})
+        ),
+    )
+    vector_store = VectorStoreService()
+    vector_store._client = None  # mode mémoire
+    dependencies.get_search_cache.cache_clear()
+    dependencies.get_search_flights.cache_clear()
+    app.dependency_overrides[dependencies.get_current_active_user] = lambda: user
+    app.dependency_overrides[dependencies.get_ollama_service] = lambda: ollama
+    app.dependency_overrides[dependencies.get_vector_store] = lambda: vector_store
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = await client.post("/api/documents/search", json={"query": "congés payés"})
+            second = await client.post("/api/documents/search", json={"query": "congés payés"})
+            stats = await client.get("/api/documents/cache/stats")
+    finally:
+        app.dependency_overrides.clear()
+        await ollama._client.aclose()
+        dependencies.get_search_cache.cache_clear()
+        dependencies.get_search_flights.cache_clear()
+
+    assert first.json()["from_cache"] is False
+    assert second.json()["from_cache"] is True
+    assert stats.json()["hits"] == 1
+    assert stats.json()["hit_rate"] > 0
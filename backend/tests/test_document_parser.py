@@ -0,0 +1,87 @@
+"""Tests for DocumentParserService executor policy."""
+import threading
+
+import pytest
+
+from services.document_parser import DocumentParserService
+
+
+@pytest.fixture
+def files(tmp_path):
+    small = tmp_path / "small.txt"
+    small.write_text("court", encoding="utf-8")
+    large = tmp_path / "large.txt"
+    large.write_text("long " * 1000, encoding="utf-8")
+    return small, large
+
+
+class TestExecutorPolicy:
+    """Small files are parsed inline, large ones in the pool."""
+
+    def test_size_threshold(self, files):
+        small, large = files
+        parser = DocumentParserService(executor="thread", inline_max_bytes=1024)
+        try:
+            assert parser._executor_for(str(small)) is None
+            assert parser._executor_for(str(large)) is not None
+            assert parser._executor_for(str(small.with_name("missing.txt"))) is None
+        finally:
+            parser.close()
+
+    def test_inline_mode_never_uses_a_pool(self, files):
+        _, large = files
+        parser = DocumentParserService(executor="inline", inline_max_bytes=0)
+
+        assert parser._executor_for(str(large)) is None
+
+    @pytest.mark.asyncio
+    async def test_large_file_parsed_off_the_event_loop(self, files, monkeypatch):
+        small, large = files
+        parser = DocumentParserService(executor="thread", inline_max_bytes=1024)
+        threads = []
+        parse_text = parser._parse_text
+
+        def recording_parse(file_path, metadata):
+            threads.append(threading.current_thread())
+            return parse_text(file_path, metadata)
+
+        monkeypatch.setattr(parser, "_parse_text", recording_parse)
+        try:
+            await parser.parse_file(str(small))
+            parsed = await parser.parse_file(str(large))
+        finally:
+            parser.close()
+
+        assert threads[0] is threading.main_thread()
+        assert threads[1] is not threading.main_thread()
+        assert parsed.word_count == 1000
+
+
+class TestStreaming:
+    """PDFs are parsed page by page by iter_sections."""
+
+    @pytest.mark.asyncio
+    async def test_pdf_sections_match_full_parse(self, make_pdf, monkeypatch):
+        monkeypatch.setattr("services.document_parser.PDF_PAGES_PER_BATCH", 2)
+        path = str(make_pdf(["page un", "", "page trois", "page quatre", "page cinq"]))
+        parser = DocumentParserService()
+        metadata = {}
+
+        sections = [section async for section in parser.iter_sections(path, metadata)]
+        parsed = await parser.parse_file(path)
+
+        assert [section.page_number for section in sections] == [1, 3, 4, 5]
+        assert all(section.page_count == 5 for section in sections)
+        assert "\n\n".join(section.content for section in sections) == parsed.content
+        assert "title" in metadata
+
+    @pytest.mark.asyncio
+    async def test_other_formats_give_one_section(self, files):
+        _, large = files
+        parser = DocumentParserService()
+
+        sections = [section async for section in parser.iter_sections(str(large))]
+
+        assert not parser.supports_streaming(str(large))
+        assert len(sections) == 1
+        assert sections[0].page_number is None
@@ -0,0 +1,217 @@
+"""Tests for the upload registry and the streamed upload route."""
+import json
+from datetime import datetime
+
+import httpx
+import pytest
+
+from api import dependencies
+from api.main import app
+from config import get_settings
+from models import AgentExecutionResult
+from models.user import User
+from services.document_registry import DocumentRegistryService, RegisteredDocument
+from services.ollama import OllamaService
+from services.search_cache import SearchCacheService
+from services.vector_store import VectorStoreService
+
+
+def _document(content_hash, doc_id="rapport"):
+    return RegisteredDocument(
+        content_hash=content_hash, doc_id=doc_id, filename=f"{doc_id}.txt", size=10, user_id="u1"
+    )
+
+
+class TestDocumentRegistry:
+    """Reservation and persistence of content hashes."""
+
+    def test_reserve_blocks_duplicates_until_released(self):
+        registry = DocumentRegistryService()
+
+        assert registry.reserve("documents", "abc") is True
+        assert registry.reserve("documents", "abc") is False
+        assert registry.reserve("autre", "abc") is True
+
+        registry.release("documents", "abc")
+        assert registry.reserve("documents", "abc") is True
+
+        registry.register("documents", _document("abc"))
+        assert registry.reserve("documents", "abc") is False
+        assert registry.get("documents", "abc").doc_id == "rapport"
+
+    def test_persists_owners_across_collections(self, tmp_path):
+        registry = DocumentRegistryService(str(tmp_path))
+        registry.register("documents", _document("abc"))
+        assert registry.add_owner("documents", "abc", "u2") is True
+        assert registry.add_owner("documents", "abc", "u2") is False
+
+        reloaded = DocumentRegistryService(str(tmp_path))
+
+        assert reloaded.get("documents", "abc").owners == ["u1", "u2"]
+        assert reloaded.get("autre", "abc") is None
+        assert reloaded.find("abc")[0] == "documents"
+        assert reloaded.remove("documents", "abc") is not None
+        assert DocumentRegistryService(str(tmp_path)).find("abc") is None
+
+
+class FakeLoader:
+    def __init__(self, vector_store):
+        self.vector_store = vector_store
+        self.loaded = []
+
+    async def execute(self, request):
+        with open(request.input["file_path"], "rb") as f:
+            self.loaded.append(f.read())
+        payload = {
+            "content": "rapport commun",
+            "doc_id": request.input["doc_id"],
+            "chunk_index": 0,
+            **request.input["metadata"],
+        }
+        await self.vector_store.upsert_documents(
+            request.input["collection_name"],
+            [{"id": "c1", "vector": [1.0, 0.0], "payload": payload}],
+        )
+        return AgentExecutionResult(
+            success=True,
+            output={
+                "doc_id": request.input["doc_id"],
+                "chunk_ids": ["c1"],
+                "chunks_created": 1,
+                "format": "txt",
+                "metadata": {key: str(value) for key, value in payload.items()},
+            },
+        )
+
+
+class TestUploadRoute:
+    """Uploads are copied in blocks, size-capped and deduplicated by hash."""
+
+    @pytest.fixture
+    async def client(self, monkeypatch):
+        now = datetime.utcnow()
+        users = {
+            name: User(
+                id=name,
+                email=f"{name}@example.com",
+                username=name,
+                created_at=now,
+                updated_at=now,
+            )
+            for name in ("u1", "u2")
+        }
+        vector_store = VectorStoreService()
+        vector_store._client = None  # mode mémoire
+        loader = FakeLoader(vector_store)
+        registry = DocumentRegistryService()
+        ollama = OllamaService(embedding_cache=None)
+        ollama._client = httpx.AsyncClient(
+            base_url="http://ollama.test",
+            transport=httpx.MockTransport(
+                lambda request: httpx.Response(200, json={"embeddings": [[1.0, 0.0]]})
+            ),
+        )
+        current = {"user": users["u1"]}
+        app.dependency_overrides[dependencies.get_current_active_user] = lambda: current["user"]
+        app.dependency_overrides[dependencies.get_document_loader] = lambda: loader
+        app.dependency_overrides[dependencies.get_document_registry] = lambda: registry
+        app.dependency_overrides[dependencies.get_vector_store] = lambda: vector_store
+        app.dependency_overrides[dependencies.get_ollama_service] = lambda: ollama
+        app.dependency_overrides[dependencies.get_search_cache] = SearchCacheService
+        monkeypatch.setattr(get_settings(), "upload_max_bytes", 1000)
+        monkeypatch.setattr(get_settings(), "upload_chunk_bytes", 64)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            client.loader = loader
+            client.vector_store = vector_store
+            client.login = lambda name: current.update(user=users[name])
+            yield client
+        app.dependency_overrides.clear()
+        await ollama._client.aclose()
+
+    @staticmethod
+    async def _upload(client, content, name="rapport.txt", collection="documents", metadata=None):
+        params = {"collection_name": collection}
+        if metadata is not None:
+            params["metadata"] = json.dumps(metadata)
+        return await client.post(
+            "/api/documents/upload",
+            params=params,
+            files={"file": (name, content, "text/plain")},
+        )
+
+    @pytest.mark.asyncio
+    async def test_duplicate_content_rejected_before_loading(self, client):
+        content = b"contenu du rapport " * 20
+
+        first = await self._upload(client, content)
+        second = await self._upload(client, content, name="copie.txt")
+
+        assert first.status_code == 200
+        assert first.json()["content_hash"]
+        assert client.loader.loaded == [content]
+        assert second.status_code == 409
+        assert "rapport" in second.json()["detail"]
+        assert len(client.loader.loaded) == 1
+
+    @pytest.mark.asyncio
+    async def test_oversized_upload_rejected(self, client):
+        response = await self._upload(client, b"x" * 1001)
+
+        assert response.status_code == 413
+        assert client.loader.loaded == []
+
+    @pytest.mark.asyncio
+    async def test_same_content_from_another_user_is_shared(self, client):
+        content = b"rapport commun " * 20
+        await self._upload(client, content, metadata={"service": "rh"})
+
+        client.login("u2")
+        response = await self._upload(client, content, name="copie.txt")
+
+        assert response.status_code == 200
+        assert response.json()["reused"] is True
+        assert response.json()["doc_id"] == response.json()["content_hash"]
+        assert response.json()["filename"] == "copie.txt"
+        assert response.json()["metadata"]["filename"] == "copie.txt"
+        assert "service" not in response.json()["metadata"]
+        assert len(client.loader.loaded) == 1
+        (point,) = client.vector_store._collections["documents"].retrieve(["c1"])
+        assert point["payload"]["user_id"] == ["u1", "u2"]
+        assert set(point["payload"]) == {"content", "doc_id", "chunk_index", "user_id"}
+        index = client.vector_store._collections["documents"]
+        hits = index.search([1.0, 0.0], filters={"user_id": "u2"})
+        assert [hit["id"] for hit in hits] == ["c1"]
+
+    @pytest.mark.asyncio
+    async def test_search_shows_only_the_callers_upload_details(self, client):
+        content = b"rapport commun " * 20
+        await self._upload(client, content, metadata={"service": "rh"})
+        client.login("u2")
+        await self._upload(client, content, name="copie.txt", metadata={"projet": "x"})
+
+        response = await client.post("/api/documents/search", json={"query": "rapport"})
+
+        (result,) = response.json()["results"]
+        assert result["metadata"]["filename"] == "copie.txt"
+        assert result["metadata"]["projet"] == "x"
+        assert not set(result["metadata"]) & {"user_id", "service"}
+        assert "rapport" not in result["doc_id"]
+
+    @pytest.mark.asyncio
+    async def test_other_collection_copies_points_with_vectors(self, client):
+        content = b"rapport commun " * 20
+        await self._upload(client, content)
+
+        client.login("u2")
+        response = await self._upload(client, content, name="copie.txt", collection="archives")
+
+        assert response.status_code == 200
+        assert response.json()["reused"] is True
+        assert len(client.loader.loaded) == 1
+        (point,) = client.vector_store._collections["archives"].retrieve(["c1"])
+        assert point["vector"] == [1.0, 0.0]
+        assert point["payload"]["user_id"] == "u2"
+        assert "username" not in point["payload"]
+        assert response.json()["filename"] == "copie.txt"
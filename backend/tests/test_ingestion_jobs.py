@@ -0,0 +1,178 @@
+"""Tests for background directory ingestion jobs."""
+import asyncio
+from datetime import datetime
+
+import httpx
+import pytest
+
+from api import dependencies
+from api.main import app
+from models import AgentExecutionResult
+from models.user import User, UserRole
+from services.ingestion_jobs import IngestionJobService, IngestionJobStatus
+
+
+class FakeLoader:
+    """load_directory stand-in that reports one file per step."""
+
+    def __init__(self, files, gate=None):
+        self.files = files
+        self.gate = gate
+        self.calls = []
+
+    async def load_directory(self, skip_paths=None, on_discovered=None, on_result=None, **kwargs):
+        self.calls.append(set(skip_paths or ()))
+        pending = [path for path in self.files if path not in (skip_paths or ())]
+        for path in pending:
+            on_discovered(path)
+        for path in pending:
+            if self.gate is not None:
+                await self.gate.get()
+            if path.endswith("bad.txt"):
+                result = AgentExecutionResult(success=False, output={}, error="illisible")
+            else:
+                result = AgentExecutionResult(
+                    success=True, output={"chunks_created": 2, "chunks_embedded": 2}
+                )
+            on_result(path, result)
+        return {}
+
+
+async def _wait_for(job, *statuses):
+    for _ in range(200):
+        if job.status in statuses:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job resté {job.status}")
+
+
+class TestIngestionJobService:
+    """Tests for IngestionJobService."""
+
+    @pytest.mark.asyncio
+    async def test_job_runs_in_background_and_reports_progress(self):
+        service = IngestionJobService(FakeLoader(["/d/a.txt", "/d/b.txt", "/d/bad.txt"]))
+
+        job = service.start("/d")
+        assert job.status == IngestionJobStatus.PENDING
+        await _wait_for(job, IngestionJobStatus.COMPLETED)
+
+        state = job.to_dict()
+        assert state["files_discovered"] == 3
+        assert state["files_done"] == 2
+        assert state["files_failed"] == 1
+        assert state["chunks_embedded"] == 4
+        assert state["errors"] == [{"file_path": "/d/bad.txt", "error": "illisible"}]
+        assert state["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_cancel_then_resume_skips_completed_files(self):
+        gate = asyncio.Queue()
+        loader = FakeLoader(["/d/a.txt", "/d/b.txt", "/d/c.txt"], gate=gate)
+        service = IngestionJobService(loader)
+        job = service.start("/d")
+
+        gate.put_nowait(None)
+        for _ in range(100):
+            if job.files_done == 1:
+                break
+            await asyncio.sleep(0.01)
+        await service.cancel(job.job_id)
+
+        assert job.status == IngestionJobStatus.CANCELLED
+        assert job.files_done == 1
+
+        for _ in range(2):
+            gate.put_nowait(None)
+        service.resume(job.job_id)
+        await _wait_for(job, IngestionJobStatus.COMPLETED)
+
+        assert loader.calls[1] == {"/d/a.txt"}
+        assert job.files_done == 3
+
+    @pytest.mark.asyncio
+    async def test_watch_streams_until_finished(self):
+        service = IngestionJobService(FakeLoader(["/d/a.txt"]))
+        job = service.start("/d")
+
+        states = [state async for state in service.watch(job.job_id, min_interval=0)]
+
+        assert states[-1]["status"] == "completed"
+
+    @pytest.mark.asyncio
+    async def test_interrupted_jobs_are_resumable_after_restart(self, tmp_path):
+        gate = asyncio.Queue()
+        service = IngestionJobService(
+            FakeLoader(["/d/a.txt", "/d/b.txt"], gate=gate), storage_dir=str(tmp_path)
+        )
+        job = service.start("/d")
+        gate.put_nowait(None)
+        for _ in range(100):
+            if job.files_done == 1:
+                break
+            await asyncio.sleep(0.01)
+        await service.shutdown()
+        assert job.status == IngestionJobStatus.INTERRUPTED
+
+        loader = FakeLoader(["/d/a.txt", "/d/b.txt"])
+        restarted = IngestionJobService(loader, storage_dir=str(tmp_path))
+        reloaded = restarted.get(job.job_id)
+        assert reloaded.status == IngestionJobStatus.INTERRUPTED
+
+        restarted.resume(job.job_id)
+        await _wait_for(reloaded, IngestionJobStatus.COMPLETED)
+
+        assert loader.calls == [{"/d/a.txt"}]
+        assert reloaded.files_done == 2
+
+
+class TestIngestionJobRoutes:
+    """Jobs are only visible to the user who started them, and to admins."""
+
+    @pytest.fixture
+    async def client(self):
+        now = datetime.utcnow()
+        users = {
+            name: User(
+                id=name,
+                email=f"{name}@example.com",
+                username=name,
+                role=UserRole.ADMIN if name == "admin" else UserRole.USER,
+                created_at=now,
+                updated_at=now,
+            )
+            for name in ("u1", "u2", "admin")
+        }
+        service = IngestionJobService(FakeLoader(["/d/a.txt"], gate=asyncio.Queue()))
+        current = {"user": users["u1"]}
+        app.dependency_overrides[dependencies.get_current_active_user] = lambda: current["user"]
+        app.dependency_overrides[dependencies.get_ingestion_jobs] = lambda: service
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            client.login = lambda name: current.update(user=users[name])
+            yield client
+        app.dependency_overrides.clear()
+        await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_other_users_get_404(self, client, tmp_path):
+        started = await client.post(
+            "/api/documents/load-directory", json={"directory_path": str(tmp_path)}
+        )
+        job_id = started.json()["job_id"]
+        assert started.json()["user_id"] == "u1"
+
+        client.login("u2")
+        assert (await client.get("/api/documents/jobs")).json() == []
+        assert (await client.get(f"/api/documents/jobs/{job_id}")).status_code == 404
+        assert (await client.get(f"/api/documents/jobs/{job_id}/events")).status_code == 404
+        assert (await client.post(f"/api/documents/jobs/{job_id}/cancel")).status_code == 404
+        assert (await client.post(f"/api/documents/jobs/{job_id}/resume")).status_code == 404
+
+        client.login("admin")
+        assert [job["job_id"] for job in (await client.get("/api/documents/jobs")).json()] == [
+            job_id
+        ]
+        cancelled = await client.post(f"/api/documents/jobs/{job_id}/cancel")
+        assert cancelled.json()["status"] == "cancelled"
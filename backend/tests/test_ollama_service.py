@@ -0,0 +1,359 @@
+"""Tests for OllamaService against a mocked HTTP transport."""
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from api import dependencies
+from api.main import health_check
+from services.circuit_breaker import CircuitBreaker, CircuitState
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_cache import EmbeddingCacheService
+from services.health_monitor import HealthMonitor
+from services.ollama import CHAT_FALLBACK_MESSAGE, OllamaService, close_shared_clients
+
+
+def _service_with_handler(handler, embedding_cache=None, breaker=None) -> OllamaService:
+    service = OllamaService(embedding_cache=embedding_cache, breaker=breaker)
+    service._client = httpx.AsyncClient(
+        base_url="http://ollama.test", transport=httpx.MockTransport(handler)
+    )
+    return service
+
+
+def _ndjson(*tokens: str) -> bytes:
+    lines = [json.dumps({"message": {"content": t}, "done": False}) for t in tokens]
+    lines.append(json.dumps({"message": {"content": ""}, "done": True}))
+    return ("\n".join(lines) + "\n").encode()
+
+
+class TestGenerateStream:
+    """Tests for OllamaService.generate_stream."""
+
+    @pytest.mark.asyncio
+    async def test_yields_tokens_in_order(self):
+        requests = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(json.loads(request.content))
+            return httpx.Response(200, content=_ndjson("Bon", "jour", " !"))
+
+        service = _service_with_handler(handler)
+
+        tokens = [token async for token in service.generate_stream("Salut", system_prompt="sys")]
+
+        assert tokens == ["Bon", "jour", " !"]
+        assert requests[0]["stream"] is True
+        assert requests[0]["messages"][0] == {"role": "system", "content": "sys"}
+
+    @pytest.mark.asyncio
+    async def test_first_token_before_generation_ends(self):
+        release = asyncio.Event()
+
+        async def body():
+            yield _ndjson("premier").split(b"\n")[0] + b"\n"
+            await release.wait()  # Ollama "still generating"
+            yield _ndjson("second")
+
+        service = _service_with_handler(lambda request: httpx.Response(200, content=body()))
+        stream = service.generate_stream("Salut")
+
+        first = await asyncio.wait_for(stream.__anext__(), timeout=1)
+        await stream.aclose()
+
+        assert first == "premier"
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+
+    @pytest.mark.asyncio
+    async def test_fallback_when_unreachable(self):
+        def handler(request: httpx.Request) -> httpx.Response:
+            raise httpx.ConnectError("refused", request=request)
+
+        service = _service_with_handler(handler)
+
+        tokens = [token async for token in service.generate_stream("Salut")]
+
+        assert tokens == [CHAT_FALLBACK_MESSAGE]
+
+
+def _embed_handler(calls):
+    def handler(request: httpx.Request) -> httpx.Response:
+        texts = json.loads(request.content)["input"]
+        calls.append(texts)
+        return httpx.Response(200, json={"embeddings": [[float(len(t)), 1.0] for t in texts]})
+
+    return handler
+
+
+class TestEmbeddingCache:
+    """Tests for the content-addressed cache in front of OllamaService.embed."""
+
+    @pytest.mark.asyncio
+    async def test_only_misses_are_sent_to_ollama(self):
+        calls = []
+        service = _service_with_handler(_embed_handler(calls), EmbeddingCacheService())
+
+        first = await service.embed(["alpha", "beta", "alpha"])
+        second = await service.embed(["beta", "  alpha ", "gamma"])
+
+        assert calls == [["alpha", "beta"], ["gamma"]]
+        assert first == [[5.0, 1.0], [4.0, 1.0], [5.0, 1.0]]
+        assert second == [[4.0, 1.0], [5.0, 1.0], [5.0, 1.0]]
+        stats = service.embedding_cache.get_stats()
+        assert stats["memory_entries"] == 3
+        assert stats["memory_bytes"] == 3 * 2 * 4
+        assert stats["memory_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_fallback_vectors_are_not_cached(self):
+        service = _service_with_handler(
+            lambda request: httpx.Response(503), EmbeddingCacheService()
+        )
+
+        vectors = await service.embed(["alpha"])
+
+        assert vectors == [[0.0] * 8]
+        assert service.embedding_cache.get_stats()["memory_entries"] == 0
+
+    @pytest.mark.asyncio
+    async def test_fallback_can_be_refused(self):
+        service = _service_with_handler(lambda request: httpx.Response(503))
+
+        with pytest.raises(RuntimeError):
+            await service.embed(["alpha"], allow_fallback=False)
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        path = str(tmp_path / "embeddings.sqlite")
+        calls = []
+        service = _service_with_handler(
+            _embed_handler(calls), EmbeddingCacheService(disk_path=path)
+        )
+        await service.embed(["alpha"])
+        await service.aclose()
+
+        restarted = _service_with_handler(
+            _embed_handler(calls), EmbeddingCacheService(disk_path=path)
+        )
+        vectors = await restarted.embed(["alpha"])
+
+        assert vectors == [[5.0, 1.0]]
+        assert calls == [["alpha"]]
+        stats = restarted.embedding_cache.get_stats()
+        assert stats["disk_hits"] == 1
+        assert stats["disk_entries"] == 1
+        assert stats["disk_bytes"] > 0
+
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_embed_each_text_once(self):
+        sent = []
+        release = asyncio.Event()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            texts = json.loads(request.content)["input"]
+            sent.append(texts)
+            await release.wait()
+            return httpx.Response(200, json={"embeddings": [[float(len(t))] for t in texts]})
+
+        cache = EmbeddingCacheService(max_entries=10)
+        service = _service_with_handler(handler, embedding_cache=cache)
+
+        first = asyncio.create_task(service.embed(["alpha", "beta"]))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(service.embed(["beta", "gamma"]))
+        await asyncio.sleep(0.01)
+        release.set()
+
+        assert await first == [[5.0], [4.0]]
+        assert await second == [[4.0], [5.0]]
+        assert sent == [["alpha", "beta"], ["gamma"]]
+        assert service.embed_flights.stats()["shared"] == 1
+
+
+class TestEmbeddingBatcher:
+    """Tests for micro-batching of concurrent embedding requests."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_texts_share_one_call(self):
+        sent = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            texts = json.loads(request.content)["input"]
+            sent.append(texts)
+            return httpx.Response(200, json={"embeddings": [[float(len(t))] for t in texts]})
+
+        service = _service_with_handler(handler)
+
+        vectors = await asyncio.gather(*(service.embed(["x" * n]) for n in range(1, 6)))
+
+        assert vectors == [[[1.0]], [[2.0]], [[3.0]], [[4.0]], [[5.0]]]
+        assert sent == [["x", "xx", "xxx", "xxxx", "xxxxx"]]
+        stats = service.embed_batcher.get_stats()
+        assert stats["calls"] == 1
+        assert stats["batch_size"]["buckets"]["8"] == 1
+        assert stats["queue_depth"]["count"] == 5
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_sent_without_waiting(self):
+        sent = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            texts = json.loads(request.content)["input"]
+            sent.append(texts)
+            return httpx.Response(200, json={"embeddings": [[0.0] for _ in texts]})
+
+        service = _service_with_handler(handler)
+        service.embed_batcher = EmbeddingBatcher(
+            service._embed_remote, max_batch_size=2, max_wait_ms=60_000
+        )
+
+        await asyncio.wait_for(
+            asyncio.gather(*(service.embed([text]) for text in "abcd")), timeout=1
+        )
+        await service.embed(["e", "f", "g"])
+
+        assert sent == [["a", "b"], ["c", "d"], ["e", "f", "g"]]
+
+
+class TestConnectionPool:
+    """Tests for the shared HTTP pool and per-operation timeouts."""
+
+    @pytest.mark.asyncio
+    async def test_instances_share_one_pool_until_closed(self):
+        first, second = OllamaService(), OllamaService()
+        shards = first.settings.ollama_pool_shards
+
+        clients = {await first._get_client() for _ in range(shards)}
+        clients |= {await second._get_client() for _ in range(shards)}
+
+        assert len(clients) == shards
+        await first.aclose()
+        assert not any(client.is_closed for client in clients)
+        await close_shared_clients()
+        assert all(client.is_closed for client in clients)
+        assert await second._get_client() not in clients
+        await close_shared_clients()
+
+    @pytest.mark.asyncio
+    async def test_timeouts_depend_on_operation(self):
+        timeouts = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            timeouts[request.url.path] = request.extensions["timeout"]
+            if request.url.path == "/api/embed":
+                return httpx.Response(200, json={"embeddings": [[1.0]]})
+            return httpx.Response(200, json={"models": [], "response": "ok"})
+
+        service = _service_with_handler(handler)
+        service._client.timeout = httpx.Timeout(60.0, connect=5.0)
+
+        assert await service.is_available() is True
+        await service.embed(["alpha"])
+        await service.generate("Bonjour")
+
+        assert timeouts["/api/tags"]["read"] == service.settings.ollama_health_timeout_seconds
+        assert timeouts["/api/embed"]["read"] == service.settings.ollama_embed_timeout_seconds
+        assert timeouts["/api/generate"] == {
+            "connect": 5.0, "read": 60.0, "write": 60.0, "pool": 60.0
+        }
+
+
+class TestCircuitBreaker:
+    """Tests for the circuit breaker and the background health monitor."""
+
+    def test_opens_after_threshold_then_allows_one_trial(self):
+        now = [0.0]
+        breaker = CircuitBreaker(
+            "ollama", failure_threshold=2, recovery_timeout=10.0, clock=lambda: now[0]
+        )
+
+        breaker.record_failure()
+        assert breaker.state == CircuitState.CLOSED
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+        assert breaker.allow_request() is False
+
+        now[0] = 10.0
+        assert breaker.state == CircuitState.HALF_OPEN
+        assert breaker.allow_request() is True
+        assert breaker.allow_request() is False
+        breaker.record_failure()
+        assert breaker.state == CircuitState.OPEN
+
+        now[0] = 20.0
+        assert breaker.allow_request() is True
+        breaker.record_success()
+        assert breaker.state == CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_health_needs_an_outcome_per_dependency(self, monkeypatch):
+        names = ("ollama", "postgres", "qdrant", "redis")
+        breakers = {name: CircuitBreaker(name) for name in names}
+        for name, provider in (
+            ("ollama", "get_ollama_service"),
+            ("postgres", "get_database_service"),
+            ("qdrant", "get_vector_store"),
+            ("redis", "get_messaging_service"),
+        ):
+            monkeypatch.setattr(
+                dependencies, provider, lambda name=name: SimpleNamespace(breaker=breakers[name])
+            )
+
+        fresh = await health_check()
+        assert fresh["status"] == "unknown"
+        assert set(fresh["services"].values()) == {"up", "unknown"}
+        assert fresh["circuits"]["redis"]["checked"] is False
+
+        for breaker in breakers.values():
+            breaker.record_success()
+        assert (await health_check())["status"] == "ok"
+
+        for _ in range(breakers["qdrant"].failure_threshold):
+            breakers["qdrant"].record_failure()
+        assert (await health_check())["status"] == "degraded"
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_falls_back_without_calling_ollama(self):
+        up = [False]
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request.url.path)
+            if not up[0]:
+                raise httpx.ConnectError("refused", request=request)
+            if request.url.path == "/api/chat":
+                return httpx.Response(200, json={"message": {"content": "Bonjour"}})
+            return httpx.Response(200, json={"models": []})
+
+        breaker = CircuitBreaker("ollama", failure_threshold=2)
+        service = _service_with_handler(handler, breaker=breaker)
+        monitor = HealthMonitor(service.is_available, breaker)
+
+        assert await monitor.check() is False
+        assert await service.chat_completion("Salut") == CHAT_FALLBACK_MESSAGE
+        assert monitor.available is False
+        calls.clear()
+
+        assert await service.chat_completion("Salut") == CHAT_FALLBACK_MESSAGE
+        assert calls == []
+
+        up[0] = True
+        assert await monitor.check() is True
+        assert monitor.available is True
+        assert await service.chat_completion("Salut") == "Bonjour"
+        assert monitor.snapshot()["state"] == "closed"
+
+    @pytest.mark.asyncio
+    async def test_http_errors_do_not_open_the_circuit(self):
+        breaker = CircuitBreaker("ollama", failure_threshold=1)
+        service = _service_with_handler(lambda request: httpx.Response(500), breaker=breaker)
+        monitor = HealthMonitor(service.is_available, breaker)
+
+        assert await monitor.check() is True
+        assert await service.chat_completion("Salut") == CHAT_FALLBACK_MESSAGE
+        assert monitor.available is True
+        assert breaker.state == CircuitState.CLOSED
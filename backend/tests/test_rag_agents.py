@@ -1,9 +1,20 @@
-"""Tests for RAG agents (Indexer, Searcher, Citation)."""
+"""Tests for RAG agents (Indexer, Searcher, Reranker, Citation)."""
+import asyncio
+import json
+import time
+
 import pytest
 
-from agents.rag import RAGCitationAgent, RAGIndexerAgent, RAGSearcherAgent
+import agents.rag.document_loader as document_loader_module
+from agents.rag import RAGCitationAgent, RAGIndexerAgent, RAGRerankerAgent, RAGSearcherAgent
+from agents.rag.chunking import IncrementalChunker, count_tokens, create_chunker
+from agents.rag.document_loader import RAGDocumentLoaderAgent
+from agents.rag.indexer import DocumentChunk
 from models import AgentExecutionRequest
+from services.document_parser import DocumentParserService
+from services.index_manifest import IndexManifestService
 from services.ollama import OllamaService
+from services.search_cache import SearchCacheService
 from services.vector_store import VectorStoreService
 
 
@@ -82,6 +93,35 @@ class TestRAGIndexer:
         assert result.success is False
         assert "No content provided" in result.error
 
+    @pytest.mark.asyncio
+    async def test_indexer_batches_embeddings(self, ollama_service, vector_store):
+        """Chunks are embedded and upserted in bounded batches."""
+        batch_sizes = []
+
+        async def fake_embed(texts, allow_fallback=True):
+            batch_sizes.append(len(texts))
+            return [[1.0, 0.0] for _ in texts]
+
+        ollama_service.embed = fake_embed
+        indexer = RAGIndexerAgent(
+            ollama_service=ollama_service,
+            vector_store=vector_store,
+            chunk_size=64,
+            chunk_overlap=16,
+            embed_batch_size=4,
+        )
+        request = AgentExecutionRequest(
+            agent_id="rag.indexer",
+            payload={"content": "word " * 200, "doc_id": "batched_doc"},
+        )
+
+        result = await indexer.execute(request)
+
+        assert result.success is True
+        assert sum(batch_sizes) == result.output["chunks_created"]
+        assert max(batch_sizes) <= 4
+        assert len(result.output["chunk_ids"]) == result.output["chunks_created"]
+
     @pytest.mark.asyncio
     async def test_chunking(self, rag_indexer):
         """Test document chunking logic."""
@@ -97,6 +137,396 @@ class TestRAGIndexer:
         assert all(chunk.chunk_id for chunk in chunks)  # All have IDs
 
 
+class TestIncrementalLoading:
+    """Tests for manifest-based incremental directory loading."""
+
+    @pytest.fixture
+    def loader(self, tmp_path, ollama_service, vector_store):
+        embedded = []
+
+        async def fake_embed(texts, allow_fallback=True):
+            embedded.extend(texts)
+            return [[float(len(text)), 1.0] for text in texts]
+
+        ollama_service.embed = fake_embed
+        vector_store._client = None  # mode mémoire
+        indexer = RAGIndexerAgent(ollama_service, vector_store, chunk_size=64, chunk_overlap=0)
+        loader = RAGDocumentLoaderAgent(
+            DocumentParserService(),
+            indexer,
+            IndexManifestService(str(tmp_path / "manifests")),
+        )
+        loader.embedded = embedded
+        return loader
+
+    @staticmethod
+    def _write(path, paragraphs):
+        path.write_text(" ".join(paragraphs), encoding="utf-8")
+
+    def test_chunk_ids_do_not_depend_on_position(self, rag_indexer):
+        chunks = rag_indexer._chunk_document("alpha beta " * 40, "doc", {})
+
+        assert len({chunk.chunk_id for chunk in chunks}) == len(chunks)
+        chunk_id = DocumentChunk("texte", "doc", 0).chunk_id
+        assert chunk_id == DocumentChunk("texte", "doc", 7).chunk_id
+        assert chunk_id != DocumentChunk("texte", "autre", 0).chunk_id
+
+    @pytest.mark.asyncio
+    async def test_unchanged_files_are_skipped(self, tmp_path, loader):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        self._write(docs / "a.txt", ["alpha " * 30])
+        self._write(docs / "b.txt", ["beta " * 30])
+
+        first = await loader.load_directory(str(docs))
+        embedded_first = len(loader.embedded)
+        second = await loader.load_directory(str(docs))
+
+        assert all(r.success for r in first.values())
+        assert embedded_first > 0
+        assert len(loader.embedded) == embedded_first
+        assert all(r.output.get("unchanged") for r in second.values())
+
+    @pytest.mark.asyncio
+    async def test_only_changed_chunks_are_reembedded(self, tmp_path, loader):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        keep = "gardé " * 12
+        self._write(docs / "a.txt", [keep, "ancien " * 9])
+        await loader.load_directory(str(docs))
+        store = loader.indexer.vector_store._collections["documents"]
+        before = len(store)
+
+        loader.embedded.clear()
+        self._write(docs / "a.txt", [keep, "nouveau " * 8])
+        result = (await loader.load_directory(str(docs)))[str((docs / "a.txt").resolve())]
+
+        assert result.output["chunks_embedded"] < result.output["chunks_created"]
+        first_chunk = loader.indexer._chunk_document(keep + " nouveau", "a.txt", {})[0].content
+        assert first_chunk not in loader.embedded
+        assert result.output["chunks_deleted"] > 0
+        assert len(store) == (
+            before - result.output["chunks_deleted"] + result.output["chunks_embedded"]
+        )
+
+    @pytest.mark.asyncio
+    async def test_kept_chunks_get_their_new_position(self, tmp_path, loader):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        self._write(docs / "a.txt", ["alpha " * 10, "beta " * 12])
+        await loader.load_directory(str(docs))
+
+        loader.embedded.clear()
+        self._write(docs / "a.txt", ["gamma " * 10, "alpha " * 10, "beta " * 12])
+        await loader.load_directory(str(docs))
+
+        assert loader.embedded == ["gamma " * 9 + "gamma"]
+        chunks = loader.indexer._chunk_document(
+            "gamma " * 10 + "alpha " * 10 + "beta " * 12, "a.txt", {}
+        )
+        vector_store = loader.indexer.vector_store
+        points = vector_store._collections["documents"].retrieve([c.chunk_id for c in chunks])
+        assert [point["payload"]["chunk_index"] for point in points] == [0, 1, 2]
+        (hit,) = await vector_store.keyword_index.search("documents", "beta")
+        assert hit["payload"]["chunk_index"] == 2
+
+    @pytest.mark.asyncio
+    async def test_removed_files_are_deleted(self, tmp_path, loader):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        self._write(docs / "a.txt", ["alpha " * 30])
+        self._write(docs / "b.txt", ["beta " * 30])
+        await loader.load_directory(str(docs))
+        store = loader.indexer.vector_store._collections["documents"]
+        (docs / "b.txt").unlink()
+
+        results = await loader.load_directory(str(docs))
+
+        removed = results[str((docs / "b.txt").resolve())]
+        assert removed.output["removed"] is True
+        assert store.search([1.0, 1.0], top_k=100, filters={"doc_id": "b.txt"}) == []
+        assert loader.manifest.get("documents", str((docs / "b.txt").resolve())) is None
+
+    @pytest.mark.asyncio
+    async def test_manifest_checkpoints_count_indexed_files(self, tmp_path, loader, monkeypatch):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        self._write(docs / "a.txt", ["alpha " * 30])
+        await loader.load_directory(str(docs))
+        for name in "bcde":
+            self._write(docs / f"{name}.txt", [f"{name}{name} " * 30])
+        save_async = loader.manifest.save_async
+        saved = []
+
+        async def spy(collection):
+            await save_async(collection)
+            saved.append(len(json.loads(loader.manifest._path(collection).read_text())))
+
+        monkeypatch.setattr(document_loader_module, "MANIFEST_SAVE_INTERVAL", 4)
+        monkeypatch.setattr(loader.manifest, "save_async", spy)
+
+        await loader.load_directory(str(docs))
+
+        # Checkpoint after the 4th indexed file (the unchanged a.txt does not count)
+        assert saved == [5, 5]
+
+    @pytest.mark.asyncio
+    async def test_same_file_name_in_subdirectories(self, tmp_path, loader):
+        docs = tmp_path / "docs"
+        for sub in ("x", "y"):
+            (docs / sub).mkdir(parents=True)
+            self._write(docs / sub / "a.txt", ["commun " * 30])
+        await loader.load_directory(str(docs))
+        self._write(docs / "x" / "a.txt", ["modifié " * 30])
+
+        await loader.load_directory(str(docs))
+
+        store = loader.indexer.vector_store._collections["documents"]
+        for doc_id in ("x/a.txt", "y/a.txt"):
+            assert store.search([1.0, 1.0], top_k=100, filters={"doc_id": doc_id})
+
+    @pytest.mark.asyncio
+    async def test_memory_fallback_is_not_recorded(self, tmp_path, loader):
+        """Points kept only in the memory fallback leave the file out of the manifest."""
+
+        class DownQdrant:
+            def __getattr__(self, name):
+                async def call(*args, **kwargs):
+                    raise ConnectionError("qdrant down")
+
+                return call
+
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        self._write(docs / "a.txt", ["alpha " * 30])
+        await loader.load_directory(str(docs))
+        path = str((docs / "a.txt").resolve())
+        recorded = loader.manifest.get("documents", path)
+        loader.indexer.vector_store._client = DownQdrant()
+        self._write(docs / "b.txt", ["beta " * 30])
+        (docs / "a.txt").unlink()
+
+        results = await loader.load_directory(str(docs))
+
+        assert not any(result.success for result in results.values())
+        assert loader.manifest.get("documents", str((docs / "b.txt").resolve())) is None
+        assert loader.manifest.get("documents", path) == recorded
+
+    @pytest.mark.asyncio
+    async def test_skip_paths_and_progress_callbacks(self, tmp_path, loader):
+        docs = tmp_path / "docs"
+        docs.mkdir()
+        self._write(docs / "a.txt", ["alpha " * 30])
+        self._write(docs / "b.txt", ["beta " * 30])
+        discovered, reported = [], []
+
+        results = await loader.load_directory(
+            str(docs),
+            skip_paths={str((docs / "a.txt").resolve())},
+            on_discovered=discovered.append,
+            on_result=lambda path, result: reported.append(path),
+        )
+
+        expected = [str((docs / "b.txt").resolve())]
+        assert list(results) == discovered == reported == expected
+
+
+class TestIngestionPipeline:
+    """Tests for the discovery -> parse -> index pipeline of load_directory."""
+
+    @staticmethod
+    def _loader(ollama_service, vector_store, parser, **options):
+        async def fake_embed(texts, allow_fallback=True):
+            return [[1.0, float(len(text))] for text in texts]
+
+        ollama_service.embed = fake_embed
+        vector_store._client = None  # mode mémoire
+        indexer = RAGIndexerAgent(ollama_service, vector_store, chunk_size=64, chunk_overlap=0)
+        return RAGDocumentLoaderAgent(parser, indexer, **options)
+
+    @pytest.mark.asyncio
+    async def test_bounded_queues_process_every_file(self, tmp_path, ollama_service, vector_store):
+        for i in range(25):
+            (tmp_path / f"doc{i}.txt").write_text(f"document {i} " * 20, encoding="utf-8")
+        (tmp_path / "broken.txt").write_bytes(b"\xff\xfe\xfa invalide")
+        (tmp_path / "ignored.bin").write_bytes(b"binaire")
+        parser = DocumentParserService(executor="thread", max_workers=3, inline_max_bytes=0)
+        loader = self._loader(
+            ollama_service, vector_store, parser, parse_workers=3, index_workers=2, queue_size=2
+        )
+
+        try:
+            results = await loader.load_directory(str(tmp_path))
+        finally:
+            parser.close()
+
+        assert len(results) == 26
+        failed = [path for path, r in results.items() if not r.success]
+        assert failed == [str((tmp_path / "broken.txt").resolve())]
+        assert len(vector_store._collections["documents"]) == sum(
+            r.output["chunks_created"] for r in results.values() if r.success
+        )
+
+    @pytest.mark.asyncio
+    async def test_parses_in_process_pool(self, tmp_path, ollama_service, vector_store):
+        (tmp_path / "page.html").write_text(
+            "<html><head><title>Titre</title></head><body><p>Bonjour</p></body></html>",
+            encoding="utf-8",
+        )
+        parser = DocumentParserService(executor="process", max_workers=1, inline_max_bytes=0)
+        loader = self._loader(ollama_service, vector_store, parser)
+
+        try:
+            results = await loader.load_directory(str(tmp_path))
+        finally:
+            parser.close()
+
+        (result,) = results.values()
+        assert result.success is True
+        assert result.output["metadata"]["title"] == "Titre"
+
+
+class TestStreamingIndexing:
+    """Tests for page-at-a-time parsing, chunking and indexing."""
+
+    def test_chunker_matches_full_text_chunking(self, rag_indexer):
+        pages = [f"page {n} " + " ".join(f"mot{n}_{i}" for i in range(n * 7)) for n in range(1, 9)]
+        chunker = IncrementalChunker(rag_indexer.chunk_size, rag_indexer.chunk_overlap)
+        pieces = []
+        for number, text in enumerate(pages, start=1):
+            pieces.extend(chunker.feed(text, number))
+        pieces.extend(chunker.flush())
+
+        full = rag_indexer._chunk_document("\n\n".join(pages), "doc", {})
+
+        assert [piece.content for piece in pieces] == [chunk.content for chunk in full]
+        assert pieces[0].page_start == 1 and pieces[-1].page_end == len(pages)
+        for piece in pieces:
+            segments = piece.content.split("\n\n")
+            assert segments[0] in pages[piece.page_start - 1]
+            assert segments[-1] in pages[piece.page_end - 1]
+
+    @pytest.mark.asyncio
+    async def test_pdf_is_embedded_while_pages_are_extracted(
+        self, make_pdf, ollama_service, vector_store, monkeypatch
+    ):
+        monkeypatch.setattr("services.document_parser.PDF_PAGES_PER_BATCH", 1)
+        path = make_pdf([f"page {n} " + "contenu " * 12 for n in range(1, 7)])
+        events = []
+
+        async def fake_embed(texts, allow_fallback=True):
+            events.append("embed")
+            return [[1.0, float(len(text))] for text in texts]
+
+        parser = DocumentParserService()
+        read_pdf_pages = parser.read_pdf_pages
+
+        def recording_read(file_path, first_page, max_pages=None):
+            events.append("read")
+            return read_pdf_pages(file_path, first_page, max_pages)
+
+        monkeypatch.setattr(parser, "read_pdf_pages", recording_read)
+        ollama_service.embed = fake_embed
+        vector_store._client = None  # mode mémoire
+        indexer = RAGIndexerAgent(
+            ollama_service, vector_store, chunk_size=64, chunk_overlap=16, embed_batch_size=2
+        )
+        loader = RAGDocumentLoaderAgent(parser, indexer)
+
+        result = await loader.execute(
+            AgentExecutionRequest(agent_id="document_loader", input={"file_path": str(path)})
+        )
+
+        assert result.success is True
+        assert result.output["page_count"] == 6
+        assert events.index("embed") < len(events) - 1 - events[::-1].index("read")
+        payloads = vector_store._collections["documents"]._payloads
+        assert len(payloads) == result.output["chunks_created"]
+        assert {payload["page_start"] for payload in payloads} == set(range(1, 7))
+        assert all(payload["page_count"] == "6" for payload in payloads)
+
+
+class TestChunkingStrategies:
+    """Tests for the sentence-, structure- and token-aware chunkers."""
+
+    SENTENCES = [f"La phrase numéro {n} décrit le pipeline RAG en détail." for n in range(1, 25)]
+
+    @staticmethod
+    def _chunk(chunker, *pages):
+        pieces = []
+        for number, text in enumerate(pages, start=1):
+            pieces.extend(chunker.feed(text, number))
+        return pieces + chunker.flush()
+
+    def test_sentences_are_never_cut(self):
+        pieces = self._chunk(create_chunker("sentence", 160, 60), " ".join(self.SENTENCES))
+
+        assert len(pieces) > 3
+        for piece in pieces:
+            assert len(piece.content) <= 160
+            assert piece.content.startswith("La phrase") and piece.content.endswith(".")
+        # Overlap repeats whole sentences and every sentence is kept
+        assert pieces[1].content.startswith(pieces[0].content.rsplit(". ", 1)[-1])
+        for sentence in self.SENTENCES:
+            assert any(sentence in piece.content for piece in pieces)
+
+    def test_headings_start_new_chunks(self):
+        text = "\n\n".join(
+            [
+                "# Introduction",
+                "Le contexte du projet est présenté ici.",
+                "Méthodes",
+                "Le découpage suit les titres du document.",
+                "Résultats",
+                "Les chunks ne mélangent pas deux sections.",
+            ]
+        )
+
+        pieces = self._chunk(create_chunker("structure", 500, 100), text)
+
+        assert [piece.content.split("\n\n")[0] for piece in pieces] == [
+            "# Introduction",
+            "Méthodes",
+            "Résultats",
+        ]
+
+    def test_token_budget_is_respected(self):
+        pieces = self._chunk(create_chunker("sentence", 40, 10, "tokens"), " ".join(self.SENTENCES))
+
+        assert all(count_tokens(piece.content) <= 40 for piece in pieces)
+        assert max(count_tokens(piece.content) for piece in pieces) > 30
+
+    def test_oversized_sentence_is_split_on_words(self):
+        sentence = " ".join(f"mot{i}" for i in range(100))
+
+        pieces = self._chunk(create_chunker("sentence", 50, 0), sentence)
+
+        assert all(len(piece.content) <= 50 for piece in pieces)
+        assert " ".join(piece.content for piece in pieces) == sentence
+
+    def test_pages_are_tracked(self):
+        pages = [" ".join(self.SENTENCES[i : i + 6]) for i in range(0, 24, 6)]
+
+        pieces = self._chunk(create_chunker("sentence", 200, 50), *pages)
+
+        assert pieces[0].page_start == 1 and pieces[-1].page_end == 4
+        for piece in pieces:
+            first_sentence = int(piece.content.split(" ")[3])
+            assert piece.page_start == (first_sentence - 1) // 6 + 1
+
+    def test_window_strategy_only_counts_characters(self, ollama_service, vector_store):
+        with pytest.raises(ValueError):
+            create_chunker("window", 512, 128, "tokens")
+        with pytest.raises(ValueError):
+            RAGIndexerAgent(ollama_service, vector_store, length_unit="tokens")
+
+        indexer = RAGIndexerAgent(
+            ollama_service, vector_store, chunk_size=120, chunking_strategy="sentence"
+        )
+        chunks = indexer._chunk_document(" ".join(self.SENTENCES), "doc", {})
+        assert all(chunk.content.endswith(".") for chunk in chunks)
+
+
 class TestRAGSearcher:
     """Tests for RAG.Searcher agent."""
 
@@ -126,6 +556,122 @@ class TestRAGSearcher:
         assert "results" in result.output
         assert result.output["total_matches"] >= 0
 
+    @pytest.mark.asyncio
+    async def test_hybrid_search_finds_exact_identifiers(self, ollama_service, vector_store):
+        vector_store._client = None  # mode mémoire
+
+        async def fake_embedding(text, model=None):
+            return [1.0, 0.0]
+
+        ollama_service.generate_embedding = fake_embedding
+        def point(point_id, vector, content, doc_id):
+            payload = {"content": content, "doc_id": doc_id, "chunk_index": 0}
+            return {"id": point_id, "vector": vector, "payload": payload}
+
+        points = [point(f"c{n}", [1.0, 0.01 * n], f"Note generale {n}", f"d{n}") for n in range(5)]
+        points.append(point("code", [0.0, 1.0], "Code erreur ERR-4711 du module", "codes"))
+        await vector_store.upsert_documents("documents", points)
+        searcher = RAGSearcherAgent(ollama_service, vector_store, top_k=3, score_threshold=0.0)
+
+        hybrid = await searcher.execute(
+            AgentExecutionRequest(agent_id="rag.searcher", payload={"query": "ERR-4711"})
+        )
+        vector_only = await searcher.execute(
+            AgentExecutionRequest(
+                agent_id="rag.searcher", payload={"query": "ERR-4711", "hybrid": False}
+            )
+        )
+
+        assert hybrid.success is True
+        top = hybrid.output["results"][0]
+        assert top["doc_id"] == "codes"
+        assert top["keyword_score"] > 0 and top["vector_score"] == pytest.approx(0.0)
+        assert all(0 < result["score"] <= 1 for result in hybrid.output["results"])
+        assert "codes" not in [result["doc_id"] for result in vector_only.output["results"]]
+
+    @pytest.mark.asyncio
+    async def test_fan_out_embeds_once_and_normalizes_per_collection(
+        self, ollama_service, vector_store
+    ):
+        vector_store._client = None  # mode mémoire
+        embed_calls = []
+
+        async def fake_embedding(text, model=None):
+            embed_calls.append(text)
+            return [1.0, 0.0]
+
+        def point(point_id, vector, doc_id):
+            payload = {
+                "content": f"Rapport {doc_id} ({point_id})",
+                "doc_id": doc_id,
+                "chunk_index": 0,
+            }
+            return {"id": point_id, "vector": vector, "payload": payload}
+
+        ollama_service.generate_embedding = fake_embedding
+        # Scores bruts plus faibles dans "rh": la normalisation remet les deux au même niveau
+        await vector_store.upsert_documents("finance", [point("f1", [1.0, 0.1], "budget")])
+        await vector_store.upsert_documents(
+            "rh", [point("r1", [0.6, 0.8], "recrutement"), point("r2", [0.5, 0.9], "budget")]
+        )
+        searcher = RAGSearcherAgent(
+            ollama_service, vector_store, top_k=5, score_threshold=0.0, hybrid=False
+        )
+
+        result = await searcher.execute(
+            AgentExecutionRequest(
+                agent_id="rag.searcher",
+                payload={"query": "rapport", "collections": ["finance", "rh", "finance"]},
+            )
+        )
+
+        assert result.success is True
+        assert len(embed_calls) == 1
+        results = result.output["results"]
+        assert {(r["collection"], r["doc_id"]) for r in results} == {
+            ("finance", "budget"),
+            ("rh", "recrutement"),
+            ("rh", "budget"),
+        }
+        best = {r["collection"]: r["score"] for r in results if r["score"] == pytest.approx(1.0)}
+        assert set(best) == {"finance", "rh"}
+
+    @pytest.mark.asyncio
+    async def test_mmr_returns_full_and_diverse_results(self, ollama_service, vector_store):
+        vector_store._client = None  # mode mémoire
+
+        async def fake_embedding(text, model=None):
+            return [1.0, 0.0, 0.0]
+
+        def point(point_id, vector, doc_id):
+            payload = {"content": f"Passage {point_id}", "doc_id": doc_id, "chunk_index": 0}
+            return {"id": point_id, "vector": vector, "payload": payload}
+
+        ollama_service.generate_embedding = fake_embedding
+        # Quatre passages quasi identiques du même document, deux passages distincts
+        points = [point(f"dup{n}", [0.8, 0.6 + 0.01 * n, 0.0], "manuel") for n in range(4)]
+        points += [
+            point("other1", [0.7, -0.4, 0.59], "faq"),
+            point("other2", [0.7, 0.0, -0.71], "guide"),
+        ]
+        await vector_store.upsert_documents("documents", points)
+        searcher = RAGSearcherAgent(
+            ollama_service, vector_store, top_k=3, score_threshold=0.0, hybrid=False
+        )
+
+        def run(**payload):
+            return searcher.execute(
+                AgentExecutionRequest(agent_id="rag.searcher", payload={"query": "q", **payload})
+            )
+
+        diverse = await run()
+        by_score = await run(diversify=False)
+
+        assert [r["chunk_id"] for r in by_score.output["results"]] == ["dup0", "dup1", "dup2"]
+        ids = [r["chunk_id"] for r in diverse.output["results"]]
+        assert ids[0] == "dup0" and set(ids[1:]) == {"other1", "other2"}
+        assert "vector" not in diverse.output["results"][0]
+
     @pytest.mark.asyncio
     async def test_searcher_empty_query(self, rag_searcher):
         """Test search with empty query."""
@@ -140,6 +686,129 @@ class TestRAGSearcher:
         assert "No query provided" in result.error
 
 
+class FakeLLM:
+    """Minimal stand-in for OllamaService.generate with call accounting."""
+
+    def __init__(self, response="0.8", delay=0.05):
+        self.response = response
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def generate(self, prompt, model=None, options=None, system_prompt=None):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.response(prompt) if callable(self.response) else self.response
+        finally:
+            self.in_flight -= 1
+
+
+def _results(count):
+    return [
+        {
+            "doc_id": f"doc{i}",
+            "chunk_id": f"c{i}",
+            "content": f"passage {i}",
+            "score": 0.9 - i * 0.01,
+        }
+        for i in range(count)
+    ]
+
+
+class TestRAGReranker:
+    """Tests for RAG.Reranker agent."""
+
+    @pytest.mark.asyncio
+    async def test_scores_concurrently_with_bound(self):
+        """Candidates are scored in parallel, never above max_concurrency."""
+        llm = FakeLLM(delay=0.05)
+        reranker = RAGRerankerAgent(llm, max_concurrency=4)
+        request = AgentExecutionRequest(
+            agent_id="rag.reranker", payload={"query": "q", "results": _results(8)}
+        )
+
+        start = time.perf_counter()
+        result = await reranker.execute(request)
+        elapsed = time.perf_counter() - start
+
+        assert result.success is True
+        assert result.output["returned_count"] == 8
+        assert llm.max_in_flight == 4
+        assert elapsed < 8 * 0.05
+
+    @pytest.mark.asyncio
+    async def test_timeout_gives_neutral_score_and_cutoff(self):
+        """Slow calls fall back to 0.5; results past max_candidates are not scored."""
+        llm = FakeLLM(delay=0.5)
+        reranker = RAGRerankerAgent(llm, score_timeout=0.05, max_candidates=2)
+        request = AgentExecutionRequest(
+            agent_id="rag.reranker", payload={"query": "q", "results": _results(3)}
+        )
+
+        result = await reranker.execute(request)
+
+        reranked = result.output["reranked_results"]
+        assert llm.calls == 2
+        assert [r["rerank_score"] for r in reranked[:2]] == [0.5, 0.5]
+        assert reranked[2]["chunk_id"] == "c2"
+
+    @pytest.mark.asyncio
+    async def test_listwise_scoring(self):
+        """One prompt scores a whole group of passages."""
+        llm = FakeLLM(response="Scores: [0.1, 0.9, 0.4]", delay=0)
+        reranker = RAGRerankerAgent(llm, listwise_batch_size=3)
+        request = AgentExecutionRequest(
+            agent_id="rag.reranker", payload={"query": "q", "results": _results(3)}
+        )
+
+        result = await reranker.execute(request)
+
+        reranked = result.output["reranked_results"]
+        assert llm.calls == 1
+        assert reranked[0]["chunk_id"] == "c1"
+        assert reranked[0]["rerank_score"] == pytest.approx(0.9)
+
+
+    @pytest.mark.asyncio
+    async def test_score_cache_skips_llm_on_repeat(self):
+        """A repeated (query, chunk) pair is served from the score cache."""
+        cache = SearchCacheService(max_size=100)
+        llm = FakeLLM(delay=0)
+        reranker = RAGRerankerAgent(llm, score_cache=cache)
+        request = AgentExecutionRequest(
+            agent_id="rag.reranker", payload={"query": "q", "results": _results(3)}
+        )
+
+        first = await reranker.execute(request)
+        second = await reranker.execute(request)
+
+        assert llm.calls == 3
+        assert cache.get_stats()["hits"] == 3
+        assert first.output["reranked_results"] == second.output["reranked_results"]
+
+    @pytest.mark.asyncio
+    async def test_score_cache_skips_unparseable_responses(self):
+        """The neutral fallback for an unparseable response is not cached."""
+        cache = SearchCacheService(max_size=100)
+        llm = FakeLLM(response="je ne sais pas", delay=0)
+        reranker = RAGRerankerAgent(llm, score_cache=cache)
+        request = AgentExecutionRequest(
+            agent_id="rag.reranker", payload={"query": "q", "results": _results(2)}
+        )
+
+        first = await reranker.execute(request)
+        llm.response = "0.9"
+        second = await reranker.execute(request)
+
+        assert [r["rerank_score"] for r in first.output["reranked_results"]] == [0.5, 0.5]
+        assert [r["rerank_score"] for r in second.output["reranked_results"]] == [0.9, 0.9]
+        assert llm.calls == 4
+
+
 class TestRAGCitation:
     """Tests for RAG.Citation agent."""
 
@@ -191,6 +860,34 @@ class TestRAGCitation:
         assert result.success is True
         assert "Johnson (2024)" in result.output["formatted_citations"][0]
 
+    @pytest.mark.asyncio
+    async def test_citation_points_to_pages(self, rag_citation):
+        request = AgentExecutionRequest(
+            agent_id="rag.citation",
+            payload={
+                "results": [
+                    {
+                        "doc_id": "rapport",
+                        "content": "Le chiffre d'affaires a progressé.",
+                        "score": 0.9,
+                        "metadata": {"title": "Rapport annuel", "page_start": 12, "page_end": 12},
+                    },
+                    {
+                        "doc_id": "rapport",
+                        "content": "Les perspectives restent stables.",
+                        "score": 0.8,
+                        "metadata": {"title": "Rapport annuel", "page_start": 12, "page_end": 13},
+                    },
+                ],
+                "format": "markdown",
+            },
+        )
+
+        result = await rag_citation.execute(request)
+
+        assert "*Rapport annuel*, p. 12 " in result.output["formatted_citations"][0]
+        assert "*Rapport annuel*, pp. 12-13 " in result.output["formatted_citations"][1]
+
     @pytest.mark.asyncio
     async def test_citation_empty_results(self, rag_citation):
         """Test citation with no results."""
@@ -0,0 +1,119 @@
+"""Tests for SearchCacheService (exact and semantic tiers)."""
+import asyncio
+
+import pytest
+
+from agents.rag.cached_searcher import RAGCachedSearcherAgent
+from models import AgentExecutionRequest
+from services.search_cache import SearchCacheService
+from services.singleflight import SingleFlight
+from services.vector_store import VectorStoreService
+
+
+class TestSemanticTier:
+    """Tests for embedding-similarity lookups."""
+
+    def test_close_embedding_hits_same_params_only(self):
+        cache = SearchCacheService(semantic_max_distance=0.05)
+        cache.set("what is python", {"v": 1}, embedding=[1.0, 0.0, 0.0], top_k=5)
+
+        assert cache.get_semantic([0.99, 0.05, 0.0], top_k=5) == {"v": 1}
+        assert cache.get_semantic([0.99, 0.05, 0.0], top_k=10) is None
+        assert cache.get_semantic([0.0, 1.0, 0.0], top_k=5) is None
+
+        stats = cache.get_stats()
+        assert stats["semantic_hits"] == 1
+        assert stats["semantic_misses"] == 2
+        assert stats["semantic_size"] == 1
+
+    def test_eviction_and_clear_drop_embeddings(self):
+        cache = SearchCacheService(max_size=1, semantic_max_distance=0.05)
+        cache.set("a", "A", embedding=[1.0, 0.0])
+        cache.set("b", "B", embedding=[0.0, 1.0])
+
+        assert cache.get_semantic([1.0, 0.0]) is None
+        assert cache.get_semantic([0.0, 1.0]) == "B"
+
+        cache.clear()
+        assert cache.get_stats()["semantic_size"] == 0
+
+    def test_partitions_share_one_bounded_index(self):
+        cache = SearchCacheService(max_size=3, semantic_max_distance=0.05)
+        for user in range(10):
+            cache.set("congés", user, embedding=[1.0, 0.0], filters={"user_id": f"u{user}"})
+
+        assert cache.get_stats()["semantic_size"] == 3
+        assert cache.get_semantic([1.0, 0.0], filters={"user_id": "u9"}) == 9
+        assert cache.get_semantic([1.0, 0.0], filters={"user_id": "u0"}) is None
+
+    def test_disabled_by_default(self):
+        cache = SearchCacheService()
+        cache.set("a", "A", embedding=[1.0, 0.0])
+
+        assert cache.get_semantic([1.0, 0.0]) is None
+        assert cache.get_stats()["semantic_size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_searcher_serves_semantic_hit():
+    """A paraphrased query with a near-identical embedding skips the search."""
+    embeddings = {"what is python": [1.0, 0.0], "What is Python?": [0.999, 0.01]}
+
+    class FakeOllama:
+        async def generate_embedding(self, text, model=None):
+            return embeddings[text]
+
+    vector_store = VectorStoreService()
+    vector_store._client = None
+    searcher = RAGCachedSearcherAgent(
+        ollama_service=FakeOllama(),
+        vector_store=vector_store,
+        cache=SearchCacheService(semantic_max_distance=0.01),
+    )
+
+    first = await searcher.execute(
+        AgentExecutionRequest(agent_id="cached_searcher", input={"query": "what is python"})
+    )
+    second = await searcher.execute(
+        AgentExecutionRequest(agent_id="cached_searcher", input={"query": "What is Python?"})
+    )
+
+    assert first.output["from_cache"] is False
+    assert second.output["from_cache"] is True
+    assert second.output["cache_tier"] == "semantic"
+
+
+@pytest.mark.asyncio
+async def test_cached_searcher_coalesces_concurrent_misses():
+    """Identical searches arriving together share one embed+search pipeline."""
+    release = asyncio.Event()
+    embedded = []
+
+    class SlowOllama:
+        async def generate_embedding(self, text, model=None):
+            embedded.append(text)
+            await release.wait()
+            return [1.0, 0.0]
+
+    vector_store = VectorStoreService()
+    vector_store._client = None
+    cache = SearchCacheService()
+    flights = SingleFlight()
+    searchers = [
+        RAGCachedSearcherAgent(
+            ollama_service=SlowOllama(), vector_store=vector_store, cache=cache, flights=flights
+        )
+        for _ in range(2)
+    ]
+    request = AgentExecutionRequest(agent_id="cached_searcher", input={"query": "what is python"})
+
+    pending = [asyncio.create_task(searcher.execute(request)) for searcher in searchers * 4]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*pending)
+
+    assert embedded == ["what is python"]
+    assert flights.stats() == {"inflight": 0, "calls": 1, "shared": 7}
+    assert all(result.success for result in results)
+    results[0].output["from_cache"] = "mutated"
+    assert results[1].output["from_cache"] is False
@@ -0,0 +1,178 @@
+"""Tests for the vector store in-memory fallback."""
+import asyncio
+
+import numpy as np
+import pytest
+
+from services.keyword_index import KeywordIndexService
+from services.memory_index import InMemoryVectorIndex
+from services.vector_store import VectorStoreService
+
+
+def _point(point_id, vector, **payload):
+    return {"id": point_id, "vector": vector, "payload": payload}
+
+
+@pytest.fixture
+def index():
+    """Small index with two users and three documents."""
+    index = InMemoryVectorIndex()
+    index.upsert(
+        [
+            _point("a", [1.0, 0.0, 0.0], user_id="u1", doc_id="d1"),
+            _point("b", [0.8, 0.6, 0.0], user_id="u1", doc_id="d2"),
+            _point("c", [0.0, 1.0, 0.0], user_id="u2", doc_id="d3"),
+            _point("d", [0.0, 0.0, 2.0], user_id=["u1", "u2"], doc_id="d4"),
+        ]
+    )
+    return index
+
+
+class TestInMemoryVectorIndex:
+    """Tests for the NumPy cosine index."""
+
+    def test_cosine_ranking(self, index):
+        hits = index.search([1.0, 0.0, 0.0], top_k=2)
+
+        assert [hit["id"] for hit in hits] == ["a", "b"]
+        assert hits[0]["score"] == pytest.approx(1.0)
+        assert hits[1]["score"] == pytest.approx(0.8)
+
+    def test_score_threshold(self, index):
+        hits = index.search([1.0, 0.0, 0.0], top_k=4, score_threshold=0.5)
+
+        assert {hit["id"] for hit in hits} == {"a", "b"}
+
+    def test_filters(self, index):
+        hits = index.search([1.0, 0.0, 0.0], top_k=4, filters={"user_id": "u2"})
+        assert {hit["id"] for hit in hits} == {"c", "d"}
+
+        hits = index.search([1.0, 0.0, 0.0], top_k=4, filters={"doc_id": ["d1", "d3"]})
+        assert {hit["id"] for hit in hits} == {"a", "c"}
+
+        assert index.search([1.0, 0.0, 0.0], filters={"user_id": "nobody"}) == []
+
+    def test_upsert_replaces_and_delete(self, index):
+        index.upsert([_point("a", [0.0, 1.0, 0.0], user_id="u2", doc_id="d1")])
+        assert len(index) == 4
+        hits = index.search([0.0, 1.0, 0.0], top_k=1, filters={"user_id": "u2"})
+        assert hits[0]["id"] in {"a", "c"}
+
+        assert index.delete(["a", "missing"]) == 1
+        assert "a" not in index
+        hits = index.search([0.0, 1.0, 0.0], top_k=4, filters={"user_id": "u2"})
+        assert {hit["id"] for hit in hits} == {"c", "d"}
+
+    def test_growth_keeps_rows(self):
+        index = InMemoryVectorIndex()
+        vectors = np.random.default_rng(0).normal(size=(3000, 16))
+        index.upsert([_point(i, v.tolist()) for i, v in enumerate(vectors)])
+
+        hits = index.search(vectors[1234].tolist(), top_k=1)
+
+        assert len(index) == 3000
+        assert hits[0]["id"] == 1234
+
+
+@pytest.mark.asyncio
+async def test_vector_store_memory_fallback_search():
+    """VectorStoreService ranks fallback results by cosine similarity."""
+    store = VectorStoreService()
+    store._client = None
+    await store.upsert_documents(
+        "docs",
+        [_point("x", [0.0, 1.0], user_id="u1"), _point("y", [1.0, 0.0], user_id="u1")],
+    )
+
+    hits = await store.search("docs", [1.0, 0.1], top_k=1, filters={"user_id": "u1"})
+
+    assert hits[0]["id"] == "y"
+    assert await store.search("unknown", [1.0, 0.0]) == []
+
+
+class TestKeywordIndex:
+    """Tests for the BM25 full-text index kept next to the vectors."""
+
+    @pytest.fixture
+    async def store(self):
+        store = VectorStoreService()
+        store._client = None  # mode mémoire
+        await store.upsert_documents(
+            "documents",
+            [
+                _point(
+                    "a", [1.0, 0.0], content="Erreur E-1042 au démarrage du service", user_id="u1"
+                ),
+                _point(
+                    "b", [0.0, 1.0], content="Le service démarre sans erreur", user_id=["u1", "u2"]
+                ),
+                _point("c", [1.0, 1.0], content="Projet PRJ-7 livré en avance", user_id="u2"),
+            ],
+        )
+        return store
+
+    @pytest.mark.asyncio
+    async def test_bm25_ranking_and_filters(self, store):
+        hits = await store.keyword_search("documents", "E-1042 demarrage", top_k=3)
+
+        assert hits[0]["id"] == "a"
+        assert hits[0]["payload"]["content"].startswith("Erreur E-1042")
+        assert hits[0]["score"] > 0
+        hits = await store.keyword_search("documents", "service", filters={"user_id": "u2"})
+        assert [hit["id"] for hit in hits] == ["b"]
+        assert await store.keyword_search("documents", "PRJ-7", filters={"user_id": ["u1"]}) == []
+        assert await store.keyword_search("documents", 'AND "(* NEAR') == []
+
+    @pytest.mark.asyncio
+    async def test_follows_vector_store_updates(self, store):
+        await store.set_payload("documents", ["a"], {"user_id": ["u1", "u3"]})
+        await store.delete_points("documents", ["b"])
+        await store.upsert_documents(
+            "documents", [_point("c", [1.0, 1.0], content="Projet annulé", user_id="u2")]
+        )
+
+        hits = await store.keyword_search("documents", "service", filters={"user_id": "u3"})
+        assert [hit["id"] for hit in hits] == ["a"]
+        assert await store.keyword_search("documents", "PRJ-7") == []
+        assert store.keyword_index.count("documents") == 2
+
+    @pytest.mark.asyncio
+    async def test_skipped_when_vectors_are_refused(self, store):
+        with pytest.raises(ValueError):
+            await store.upsert_documents(
+                "documents", [_point("d", [1.0, 0.0, 0.0], content="Ticket T-99 refusé")]
+            )
+
+        assert await store.keyword_search("documents", "T-99") == []
+        assert store.keyword_index.count("documents") == 3
+
+    def test_persists_on_disk(self, tmp_path):
+        path = str(tmp_path / "keywords.sqlite3")
+        index = KeywordIndexService(path)
+        asyncio.run(index.upsert("documents", [_point("a", [1.0], content="Facture F-2024-001")]))
+        index.close()
+
+        hits = asyncio.run(KeywordIndexService(path).search("documents", "F-2024-001"))
+        assert [hit["id"] for hit in hits] == ["a"]
+
+
+class TestQdrantTranslation:
+    """Tests for the dict -> Qdrant model translation."""
+
+    def test_build_filter(self):
+        query_filter = VectorStoreService._build_filter(
+            {"user_id": "u1", "doc_id": ["d1", "d2"], "format": None}
+        )
+
+        conditions = {c.key: c.match for c in query_filter.must}
+        assert set(conditions) == {"user_id", "doc_id"}
+        assert conditions["user_id"].value == "u1"
+        assert conditions["doc_id"].any == ["d1", "d2"]
+        assert VectorStoreService._build_filter({}) is None
+
+    def test_point_ids_are_valid_for_qdrant(self):
+        converted = VectorStoreService._to_qdrant_id("3f2a9c1b7e4d5a60")
+
+        assert converted == VectorStoreService._to_qdrant_id("3f2a9c1b7e4d5a60")
+        assert len(converted) == 36
+        assert VectorStoreService._to_qdrant_id(42) == 42
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark des stratégies de chunking: fenêtre glissante, phrases, structure.
+
+Un corpus synthétique (titres, paragraphes de phrases de longueur variable)
+est découpé par chaque stratégie, puis indexé par RAGIndexerAgent contre un
+Ollama factice local (voir stub_ollama.py), vector store en mode mémoire.
+Pour chaque stratégie: nombre de chunks, taille moyenne et écart-type en
+tokens, part de chunks coupés au milieu d'une phrase, débit du découpage
+seul et débit d'indexation.
+
+Usage:
+    python scripts/bench_chunking.py [--sections 200] [--chunk-size 512]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+WORDS = (
+    "le pipeline découpe chaque document en chunks puis calcule leurs embeddings "
+    "avant de les stocker dans qdrant pour la recherche sémantique des agents "
+    "qui répondent aux questions des utilisateurs avec des citations précises"
+).split()
+
+
+def build_corpus(sections: int, seed: int = 0) -> str:
+    """Texte façon Markdown parsé: titres suivis de 2 à 6 paragraphes."""
+    rng = random.Random(seed)
+    blocks = []
+    for number in range(1, sections + 1):
+        blocks.append(f"# Section {number}")
+        for _ in range(rng.randint(2, 6)):
+            sentences = []
+            for _ in range(rng.randint(1, 8)):
+                words = rng.choices(WORDS, k=rng.randint(6, 30))
+                sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+            blocks.append(" ".join(sentences))
+    return "\n\n".join(blocks)
+
+
+def cut_sentences(contents) -> float:
+    """Part des chunks qui ne se terminent pas sur une fin de phrase ou de titre."""
+    cut = sum(
+        1
+        for content in contents
+        if content[-1] not in ".!?" and "\n\n# " not in "\n\n" + content[-40:]
+    )
+    return cut / len(contents)
+
+
+async def run(args) -> None:
+    from agents.rag.chunking import count_tokens, create_chunker, tiktoken
+    from agents.rag.indexer import RAGIndexerAgent
+    from models import AgentExecutionRequest
+    from services.ollama import OllamaService
+    from services.vector_store import VectorStoreService
+
+    content = build_corpus(args.sections)
+    size_mb = len(content.encode()) / 1e6
+    counter = "tiktoken cl100k_base" if tiktoken is not None else "estimation regex"
+    print(f"Corpus: {args.sections} sections, {size_mb:.2f} Mo, tokens comptés par {counter}\n")
+
+    # Budget en tokens choisi pour des chunks de taille comparable aux caractères
+    token_size = args.chunk_size // 4
+    token_overlap = args.chunk_overlap // 4
+    scenarios = [
+        ("window (caractères)", "window", "chars", args.chunk_size, args.chunk_overlap),
+        ("sentence (caractères)", "sentence", "chars", args.chunk_size, args.chunk_overlap),
+        ("structure (caractères)", "structure", "chars", args.chunk_size, args.chunk_overlap),
+        ("sentence (tokens)", "sentence", "tokens", token_size, token_overlap),
+        ("structure (tokens)", "structure", "tokens", token_size, token_overlap),
+    ]
+
+    print(
+        f"{'Stratégie':<24} {'chunks':>7} {'tokens moy.':>12} {'écart-type':>11} {'coupés':>7} "
+        f"{'découpage (Mo/s)':>17} {'indexation (s)':>15} {'chunks/s':>9}"
+    )
+    for label, strategy, unit, chunk_size, chunk_overlap in scenarios:
+        chunker = create_chunker(strategy, chunk_size, chunk_overlap, unit)
+        start = time.perf_counter()
+        pieces = chunker.feed(content) + chunker.flush()
+        chunk_seconds = time.perf_counter() - start
+        tokens = [count_tokens(piece.content) for piece in pieces]
+
+        vector_store = VectorStoreService()
+        vector_store._client = None  # mode mémoire: on ne mesure que le découpage et Ollama
+        indexer = RAGIndexerAgent(
+            OllamaService(),
+            vector_store,
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            chunking_strategy=strategy,
+            length_unit=unit,
+        )
+        start = time.perf_counter()
+        result = await indexer.execute(
+            AgentExecutionRequest(
+                agent_id="rag.indexer",
+                payload={"content": content, "doc_id": "bench_doc", "metadata": {}},
+            )
+        )
+        index_seconds = time.perf_counter() - start
+        await indexer.ollama.aclose()
+        if not result.success:
+            raise RuntimeError(result.error)
+
+        print(
+            f"{label:<24} {len(pieces):>7} {statistics.mean(tokens):>12.1f} "
+            f"{statistics.pstdev(tokens):>11.1f} "
+            f"{cut_sentences([piece.content for piece in pieces]):>7.0%} "
+            f"{size_mb / chunk_seconds:>17.1f} "
+            f"{index_seconds:>15.2f} {result.output['chunks_created'] / index_seconds:>9.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    parser.add_argument("--chunk-overlap", type=int, default=128)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with StubOllamaServer(latency_ms=args.latency_ms) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test de charge des routes /api/documents: services par requête vs partagés.
+
+Envoie des recherches concurrentes (requêtes populaires répétées) à l'app
+FastAPI via un transport ASGI, contre un Ollama factice local. Le scénario
+"par requête" reproduit l'ancien comportement en surchargeant les providers
+pour construire OllamaService / VectorStoreService / SearchCacheService à
+chaque appel.
+
+Usage:
+    python scripts/bench_documents_routes.py [--requests 400] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+QUERIES = [
+    "qu'est-ce que le RAG ?",
+    "configuration de Qdrant",
+    "modèles Ollama disponibles",
+    "procédure de déploiement",
+]
+
+
+async def run_scenario(app, total: int, concurrency: int) -> dict:
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def one(i: int) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/api/documents/search",
+                    json={"query": QUERIES[i % len(QUERIES)], "top_k": 5},
+                )
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        await asyncio.gather(*(one(i) for i in range(total)))
+        stats = (await client.get("/api/documents/cache/stats")).json()
+
+    latencies.sort()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "hit_rate": stats["hit_rate"],
+    }
+
+
+async def run(args) -> None:
+    from api import dependencies
+    from api.main import app
+    from models.user import User
+    from services import OllamaService, SearchCacheService, VectorStoreService
+
+    # Sans Qdrant local, chaque requête logue le passage en fallback mémoire
+    logging.disable(logging.CRITICAL)
+
+    now = datetime.utcnow()
+    bench_user = User(
+        id="bench-user", email="bench@example.com", username="bench", created_at=now, updated_at=now
+    )
+    app.dependency_overrides[dependencies.get_current_active_user] = lambda: bench_user
+
+    scenarios = {
+        "services par requête": {
+            dependencies.get_ollama_service: OllamaService,
+            dependencies.get_vector_store: VectorStoreService,
+            dependencies.get_search_cache: SearchCacheService,
+        },
+        "services partagés": {},
+    }
+
+    print(f"{'Scénario':<24} {'p50 (ms)':>10} {'p95 (ms)':>10} {'hit rate':>10}")
+    for label, overrides in scenarios.items():
+        app.dependency_overrides.update(overrides)
+        result = await run_scenario(app, args.requests, args.concurrency)
+        for dependency in overrides:
+            app.dependency_overrides.pop(dependency)
+        print(
+            f"{label:<24} {result['p50']:>10.1f} {result['p95']:>10.1f} {result['hit_rate']:>10.1%}"
+        )
+
+    await dependencies.get_ollama_service().aclose()
+    await dependencies.get_vector_store().aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with StubOllamaServer(latency_ms=args.latency_ms) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark du micro-batching des embeddings de requête.
+
+De nombreuses recherches concurrentes demandent chacune l'embedding d'un
+seul texte (distinct, donc sans coalescence ni cache) à un Ollama factice
+local (voir stub_ollama.py) qui traite OLLAMA_NUM_PARALLEL requêtes à la
+fois, avec un coût fixe par requête et un coût par texte.
+
+Scénarios: sans batching (fenêtre 0), puis fenêtres de quelques ms.
+Pour chacun: débit, latence p50/p99, appels /api/embed, taille moyenne
+des lots et profondeur moyenne de file.
+
+Usage:
+    python scripts/bench_embedding_batcher.py [--requests 1000] [--concurrency 200]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+
+async def run_scenario(args, server, window_ms: float) -> dict:
+    from services.embedding_batcher import EmbeddingBatcher
+    from services.ollama import OllamaService, close_shared_clients
+
+    ollama = OllamaService(embedding_cache=None)
+    ollama.embed_batcher = EmbeddingBatcher(
+        ollama._embed_remote, max_batch_size=args.batch_size, max_wait_ms=window_ms
+    )
+    slots = asyncio.Semaphore(args.concurrency)
+    latencies = []
+
+    async def query(index: int) -> None:
+        async with slots:
+            start = time.perf_counter()
+            await ollama.embed([f"requête utilisateur {window_ms} {index}"])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    before = server.stats["embed_calls"]
+    start = time.perf_counter()
+    await asyncio.gather(*(query(index) for index in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stats = ollama.embed_batcher.get_stats()
+    await close_shared_clients()
+
+    latencies.sort()
+    return {
+        "throughput": args.requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "calls": server.stats["embed_calls"] - before,
+        "batch": stats["batch_size"]["mean"],
+        "depth": stats["queue_depth"]["mean"],
+    }
+
+
+async def run(args, server) -> None:
+    logging.disable(logging.WARNING)
+
+    print(
+        f"{args.requests} embeddings d'un texte, concurrence {args.concurrency}, "
+        f"lots de {args.batch_size} textes max\n"
+    )
+    print(
+        f"{'Fenêtre':<12} {'req/s':>8} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+        f"{'/api/embed':>11} {'lot moyen':>10} {'file moy.':>10}"
+    )
+    for window_ms in (0.0, 2.0, 5.0):
+        result = await run_scenario(args, server, window_ms)
+        label = "sans" if window_ms == 0 else f"{window_ms:.0f} ms"
+        print(
+            f"{label:<12} {result['throughput']:>8.1f} {result['p50']:>9.1f} {result['p99']:>9.1f} "
+            f"{result['calls']:>11} {result['batch']:>10.1f} {result['depth']:>10.1f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with StubOllamaServer(latency_ms=args.latency_ms, num_parallel=4, dim=768) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la recherche hybride (BM25 + vecteurs, fusion RRF).
+
+Une collection de chunks synthétiques, dont certains contiennent un
+identifiant exact (code d'erreur), est indexée en mode mémoire. Les
+requêtes portent sur ces identifiants avec un embedding sans rapport (ce
+que produit un modèle d'embedding pour un code qu'il ne connaît pas).
+L'embedding de requête est fourni pour ne mesurer que la recherche.
+
+Mesure, vecteurs seuls puis hybride: latence p50/p99 et rappel@5 du
+chunk contenant l'identifiant.
+
+Usage:
+    python scripts/bench_hybrid_search.py [--chunks 20000] [--queries 200]
+"""
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+WORDS = (
+    "le pipeline découpe chaque document en chunks puis calcule leurs embeddings "
+    "avant de les stocker pour la recherche sémantique des agents du projet"
+).split()
+
+
+async def run(args) -> None:
+    from agents.rag.searcher import RAGSearcherAgent
+    from models import AgentExecutionRequest
+    from services.ollama import OllamaService
+    from services.vector_store import VectorStoreService
+
+    # Sans Qdrant local, chaque requête logue le passage en fallback mémoire
+    logging.disable(logging.CRITICAL)
+
+    rng = np.random.default_rng(0)
+    vector_store = VectorStoreService()
+    vector_store._client = None  # mode mémoire
+    coded = {}
+    points = []
+    for n in range(args.chunks):
+        words = list(rng.choice(WORDS, size=40))
+        if n % 10 == 0:
+            code = f"ERR-{n:06d}"
+            words.insert(int(rng.integers(len(words))), code)
+            coded[code] = f"chunk{n}"
+        points.append(
+            {
+                "id": f"chunk{n}",
+                "vector": rng.standard_normal(args.dim).tolist(),
+                "payload": {
+                    "content": " ".join(words),
+                    "doc_id": f"doc{n}",
+                    "chunk_index": 0,
+                    "user_id": "bench",
+                },
+            }
+        )
+    start = time.perf_counter()
+    for i in range(0, len(points), 1000):
+        await vector_store.upsert_documents("documents", points[i:i + 1000])
+    elapsed = time.perf_counter() - start
+    print(f"{args.chunks} chunks indexés en {elapsed:.1f} s (vecteurs + BM25)\n")
+
+    searcher = RAGSearcherAgent(OllamaService(), vector_store, top_k=5, score_threshold=0.0)
+    codes = list(coded)[: args.queries]
+    queries = [(code, rng.standard_normal(args.dim).tolist()) for code in codes]
+
+    print(f"{'Mode':<16} {'p50 (ms)':>9} {'p99 (ms)':>9} {'rappel@5':>9}")
+    for label, hybrid in (("vecteurs seuls", False), ("hybride (RRF)", True)):
+        latencies = []
+        found = 0
+        for code, embedding in queries:
+            request = AgentExecutionRequest(
+                agent_id="rag.searcher",
+                payload={
+                    "query": f"que signifie {code}",
+                    "query_embedding": embedding,
+                    "filters": {"user_id": "bench"},
+                    "hybrid": hybrid,
+                },
+            )
+            start = time.perf_counter()
+            result = await searcher.execute(request)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if not result.success:
+                raise RuntimeError(result.error)
+            found += any(r["chunk_id"] == coded[code] for r in result.output["results"])
+        latencies.sort()
+        print(
+            f"{label:<16} {statistics.median(latencies):>9.2f} "
+            f"{latencies[max(0, int(len(latencies) * 0.99) - 1)]:>9.2f} "
+            f"{found / len(queries):>9.0%}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark d'indexation RAG: pipeline chunk par chunk vs pipeline batché.
+
+Mesure le débit (chunks/s) de RAGIndexerAgent contre un Ollama factice local
+(voir stub_ollama.py). Le vector store tourne en mode mémoire pour isoler le
+coût des allers-retours Ollama.
+
+Usage:
+    python scripts/bench_indexer.py [--chunks 2000] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+
+async def index_one_by_one(indexer, content: str) -> int:
+    """Reproduit l'ancien pipeline: un embed + un upsert par chunk."""
+    chunks = indexer._chunk_document(content, "bench_doc", {})
+    for chunk in chunks:
+        embedding = await indexer.ollama.generate_embedding(text=chunk.content)
+        await indexer.vector_store.upsert_point(
+            collection_name=indexer.collection_name,
+            point_id=chunk.chunk_id,
+            vector=embedding,
+            payload={"content": chunk.content, "doc_id": chunk.doc_id},
+        )
+    return len(chunks)
+
+
+async def index_batched(indexer, content: str) -> int:
+    from models import AgentExecutionRequest
+
+    result = await indexer.execute(
+        AgentExecutionRequest(
+            agent_id="rag.indexer",
+            payload={"content": content, "doc_id": "bench_doc", "metadata": {}},
+        )
+    )
+    if not result.success:
+        raise RuntimeError(result.error)
+    return result.output["chunks_created"]
+
+
+async def run(args) -> None:
+    from agents.rag.indexer import RAGIndexerAgent
+    from services.ollama import OllamaService
+    from services.vector_store import VectorStoreService
+
+    # Mots de 9 caractères: ~(chunk_size - chunk_overlap) / 9 mots par chunk
+    content = " ".join(f"mot{i:05d}" for i in range(args.chunks * 42))
+
+    def make_indexer(**options) -> RAGIndexerAgent:
+        vector_store = VectorStoreService()
+        vector_store._client = None  # mode mémoire: on ne mesure que Ollama
+        return RAGIndexerAgent(OllamaService(), vector_store, **options)
+
+    scenarios = [
+        ("chunk par chunk", index_one_by_one, {}),
+        (
+            f"batché (batch={args.batch_size}, concurrence={args.concurrency})",
+            index_batched,
+            {"embed_batch_size": args.batch_size, "max_concurrent_batches": args.concurrency},
+        ),
+    ]
+
+    print(f"{'Scénario':<45} {'chunks':>8} {'durée (s)':>10} {'chunks/s':>10}")
+    for label, pipeline, options in scenarios:
+        indexer = make_indexer(**options)
+        start = time.perf_counter()
+        count = await pipeline(indexer, content)
+        elapsed = time.perf_counter() - start
+        print(f"{label:<45} {count:>8} {elapsed:>10.2f} {count / elapsed:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with StubOllamaServer(latency_ms=args.latency_ms) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args))
+        print(f"\nAppels /api/embed reçus par le stub: {server.stats['embed_calls']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark du pool HTTP d'OllamaService: embeddings et chats concurrents.
+
+Plusieurs instances d'OllamaService (comme les agents et scripts qui en
+créent chacun une) envoient des embeddings et des chats en parallèle à un
+Ollama factice local (voir stub_ollama.py), par vagues séparées d'une
+pause plus longue que le keep-alive par défaut de httpx (5 s).
+
+Scénarios:
+- avant: un client httpx par instance, réglages par défaut (timeout seul)
+- après: pool partagé par toutes les instances, limites et keep-alive réglés
+
+Pour chacun: débit, latences p50/p99 par opération et connexions TCP
+ouvertes côté serveur.
+
+Usage:
+    python scripts/bench_ollama_pool.py [--services 16] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+
+def percentile(values, ratio: float) -> float:
+    values = sorted(values)
+    return values[max(0, int(len(values) * ratio) - 1)]
+
+
+async def run_scenario(args, shared: bool) -> dict:
+    import httpx
+    from services.ollama import OllamaService, close_shared_clients
+
+    services = [OllamaService(embedding_cache=None) for _ in range(args.services)]
+    if not shared:
+        # Comportement d'avant: chaque instance ouvre son propre client par défaut
+        for service in services:
+            service._client = httpx.AsyncClient(
+                base_url=service.settings.ollama_base_url,
+                timeout=service.settings.ollama_timeout_seconds,
+            )
+
+    latencies = {"embed": [], "chat": []}
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def call(index: int, wave: int) -> None:
+        service = services[index % len(services)]
+        async with slots:
+            start = time.perf_counter()
+            if index % 2:
+                await service.chat_completion(f"Question {wave}-{index}")
+                kind = "chat"
+            else:
+                await service.embed([f"texte {wave}-{index}-{n}" for n in range(8)])
+                kind = "embed"
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    busy = 0.0
+    for wave in range(args.waves):
+        if wave:
+            await asyncio.sleep(args.idle_s)
+        wave_start = time.perf_counter()
+        await asyncio.gather(*(call(index, wave) for index in range(args.requests)))
+        busy += time.perf_counter() - wave_start
+    elapsed = time.perf_counter() - start
+
+    for service in services:
+        await service.aclose()
+    await close_shared_clients()
+    calls = sum(len(values) for values in latencies.values())
+    return {
+        "throughput": calls / busy,
+        "elapsed": elapsed,
+        **{f"{kind}_p50": statistics.median(values) for kind, values in latencies.items()},
+        **{f"{kind}_p99": percentile(values, 0.99) for kind, values in latencies.items()},
+    }
+
+
+async def run(args, server) -> None:
+    # Les replis (Ollama injoignable) seraient logués à chaque appel
+    logging.disable(logging.WARNING)
+
+    print(
+        f"{args.services} instances, {args.requests} appels par vague ({args.waves} vagues, "
+        f"pause {args.idle_s:.0f} s), concurrence {args.concurrency}\n"
+    )
+    print(
+        f"{'Scénario':<34} {'appels/s':>9} {'embed p50':>10} {'embed p99':>10} "
+        f"{'chat p50':>9} {'chat p99':>9} {'connexions':>11}"
+    )
+    scenarios = (("avant: un client par instance", False), ("après: pool partagé réglé", True))
+    for label, shared in scenarios:
+        before = len(server.stats["connections"])
+        result = await run_scenario(args, shared)
+        opened = len(server.stats["connections"]) - before
+        print(
+            f"{label:<34} {result['throughput']:>9.1f} {result['embed_p50']:>10.1f} "
+            f"{result['embed_p99']:>10.1f} {result['chat_p50']:>9.1f} {result['chat_p99']:>9.1f} "
+            f"{opened:>11}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--services", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--waves", type=int, default=3)
+    parser.add_argument("--idle-s", type=float, default=6.0)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with StubOllamaServer(
+        latency_ms=args.latency_ms, token_ms=1.0, num_parallel=16, dim=64
+    ) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main()
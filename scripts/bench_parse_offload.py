@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Latence de /api/chat/send pendant l'upload d'un gros PDF.
+
+Des clients de chat envoient des messages en boucle pendant qu'un PDF de
+plusieurs centaines de pages est uploadé puis indexé. Le scénario est joué
+avec le parsing inline (dans la boucle asyncio), dans un pool de threads et
+dans un pool de processus. L'app tourne dans la même boucle que les clients
+(transport ASGI): un parsing bloquant retarde directement les réponses.
+
+Usage:
+    python scripts/bench_parse_offload.py [--pages 200] [--chat-clients 8]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+LOREM = (
+    "Le pipeline RAG decoupe les documents en chunks, calcule leurs embeddings "
+    "et les stocke dans Qdrant pour la recherche semantique."
+)
+
+
+def provide(value):
+    """Override de dépendance FastAPI renvoyant ``value``."""
+    def dependency():
+        return value
+    return dependency
+
+
+def build_pdf(pages: int, lines_per_page: int = 40) -> bytes:
+    """PDF texte minimal (Helvetica, une police partagée) de ``pages`` pages."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # /Pages, rempli une fois les pages connues
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        text = "".join(
+            f"BT /F1 10 Tf 40 {800 - 18 * line} Td (p{page} l{line} {LOREM}) Tj ET\n"
+            for line in range(lines_per_page)
+        ).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(text) + text + b"endstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+async def run_scenario(app, pdf: bytes, chat_clients: int, with_upload: bool) -> dict:
+    import httpx
+
+    latencies = []
+    upload_done = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=300
+    ) as client:
+
+        async def chat_loop() -> None:
+            while not upload_done.is_set():
+                start = time.perf_counter()
+                response = await client.post("/api/chat/send", json={"content": "Bonjour"})
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        async def upload() -> float:
+            await asyncio.sleep(0.2)  # laisser le chat atteindre son régime
+            start = time.perf_counter()
+            try:
+                if with_upload:
+                    response = await client.post(
+                        "/api/documents/upload",
+                        files={"file": ("rapport.pdf", pdf, "application/pdf")},
+                    )
+                    response.raise_for_status()
+                else:
+                    await asyncio.sleep(2.0)
+            finally:
+                upload_done.set()
+            return time.perf_counter() - start
+
+        upload_task = asyncio.create_task(upload())
+        await asyncio.gather(*(chat_loop() for _ in range(chat_clients)))
+        upload_seconds = await upload_task
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "max": latencies[-1],
+        "upload_s": upload_seconds,
+    }
+
+
+async def run(args) -> None:
+    from agents.rag.document_loader import RAGDocumentLoaderAgent
+    from agents.rag.indexer import RAGIndexerAgent
+    from api import dependencies
+    from api.main import app
+    from models.user import User
+    from services import DocumentParserService, OllamaService, VectorStoreService
+
+    # Sans Qdrant local, chaque requête logue le passage en fallback mémoire
+    logging.disable(logging.CRITICAL)
+
+    now = datetime.utcnow()
+    bench_user = User(
+        id="bench-user", email="bench@example.com", username="bench", created_at=now, updated_at=now
+    )
+    app.dependency_overrides[dependencies.get_current_active_user] = lambda: bench_user
+
+    pdf = build_pdf(args.pages)
+    print(f"PDF généré: {args.pages} pages, {len(pdf) / 1024:.0f} Ko\n")
+
+    scenarios = [
+        ("sans upload", "inline", False),
+        ("upload, parsing inline", "inline", True),
+        ("upload, pool de threads", "thread", True),
+        ("upload, pool de processus", "process", True),
+    ]
+
+    print(
+        f"{'Scénario':<28} {'requêtes':>9} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+        f"{'max (ms)':>9} {'upload (s)':>11}"
+    )
+    for label, executor, with_upload in scenarios:
+        parser = DocumentParserService(executor=executor, max_workers=2)
+        if executor == "process":
+            # Démarrage des workers hors mesure
+            await asyncio.wrap_future(parser._get_executor().submit(int))
+        vector_store = VectorStoreService()
+        vector_store._client = None  # mode mémoire
+        # Cache d'embeddings neuf à chaque scénario: même coût d'indexation pour tous
+        indexer = RAGIndexerAgent(OllamaService(), vector_store)
+        loader = RAGDocumentLoaderAgent(parser, indexer)
+        # Pas de lambda à argument par défaut: FastAPI le prendrait pour un paramètre de requête
+        app.dependency_overrides[dependencies.get_document_loader] = provide(loader)
+
+        result = await run_scenario(app, pdf, args.chat_clients, with_upload)
+        parser.close()
+        await indexer.ollama.aclose()
+        print(
+            f"{label:<28} {result['requests']:>9} {result['p50']:>9.1f} {result['p99']:>9.1f} "
+            f"{result['max']:>9.1f} {result['upload_s']:>11.2f}"
+        )
+
+    await dependencies.get_ollama_service().aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--chat-clients", type=int, default=8)
+    parser.add_argument("--latency-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    # Petits embeddings: on mesure le parsing, pas la sérialisation JSON des vecteurs
+    with StubOllamaServer(
+        latency_ms=args.latency_ms, token_ms=1.0, num_parallel=16, dim=64
+    ) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
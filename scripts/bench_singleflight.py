@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la coalescence (single-flight) des recherches identiques.
+
+Après un vidage du cache de recherche, N utilisateurs envoient en même
+temps la même requête populaire, comme la route /api/documents/search qui
+crée un RAGCachedSearcherAgent par requête. Ollama factice local (voir
+stub_ollama.py), vector store en mode mémoire.
+
+Scénarios:
+- avant: aucune coalescence (un OllamaService par recherche)
+- embeddings: textes en cours de vectorisation partagés (OllamaService)
+- recherches + embeddings: recherches en cours partagées (get_search_flights)
+
+Pour chacun: latence p50/p99, requêtes /api/embed reçues par Ollama et
+recherches vectorielles exécutées.
+
+Usage:
+    python scripts/bench_singleflight.py [--users 200] [--queries 5]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from stub_ollama import StubOllamaServer  # noqa: E402
+
+
+async def run_scenario(args, server, share_embeds: bool, share_searches: bool) -> dict:
+    from agents.rag.cached_searcher import RAGCachedSearcherAgent
+    from models import AgentExecutionRequest
+    from services.ollama import OllamaService, close_shared_clients
+    from services.search_cache import SearchCacheService
+    from services.singleflight import SingleFlight
+    from services.vector_store import VectorStoreService
+
+    ollama = OllamaService(embedding_cache=None)
+    vector_store = VectorStoreService()
+    vector_store._client = None  # mode mémoire
+    cache = SearchCacheService()
+    flights = SingleFlight()
+    searches = 0
+    vector_search = vector_store.search
+
+    async def counted_search(*args, **kwargs):
+        nonlocal searches
+        searches += 1
+        return await vector_search(*args, **kwargs)
+
+    vector_store.search = counted_search
+
+    async def search(user: int) -> float:
+        searcher = RAGCachedSearcherAgent(
+            ollama if share_embeds else OllamaService(embedding_cache=None),
+            vector_store,
+            cache=cache,
+            flights=flights if share_searches else None,
+        )
+        query = f"requête populaire {user % args.queries}"
+        start = time.perf_counter()
+        result = await searcher.execute(
+            AgentExecutionRequest(agent_id="cached_searcher", input={"query": query})
+        )
+        if not result.success:
+            raise RuntimeError(result.error)
+        return (time.perf_counter() - start) * 1000
+
+    before = server.stats["embed_calls"]
+    latencies = sorted(await asyncio.gather(*(search(user) for user in range(args.users))))
+    embeds = server.stats["embed_calls"] - before
+    await close_shared_clients()
+    return {
+        "p50": statistics.median(latencies),
+        "p99": latencies[max(0, int(len(latencies) * 0.99) - 1)],
+        "embeds": embeds,
+        "searches": searches,
+    }
+
+
+async def run(args, server) -> None:
+    # Sans Qdrant local, chaque recherche logue le passage en fallback mémoire
+    logging.disable(logging.CRITICAL)
+    warnings.simplefilter("ignore")
+
+    print(
+        f"{args.users} recherches simultanées, {args.queries} requêtes distinctes, "
+        f"cache vide\n"
+    )
+    print(
+        f"{'Scénario':<26} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+        f"{'/api/embed':>11} {'recherches':>11}"
+    )
+    scenarios = (
+        ("avant", False, False),
+        ("embeddings", True, False),
+        ("recherches + embeddings", True, True),
+    )
+    for label, share_embeds, share_searches in scenarios:
+        result = await run_scenario(args, server, share_embeds, share_searches)
+        print(
+            f"{label:<26} {result['p50']:>9.1f} {result['p99']:>9.1f} "
+            f"{result['embeds']:>11} {result['searches']:>11}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    with StubOllamaServer(latency_ms=args.latency_ms, num_parallel=4) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+        asyncio.run(run(args, server))
+
+
+if __name__ == "__main__":
+    main()
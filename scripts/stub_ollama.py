@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Serveur Ollama factice pour les benchmarks locaux.
+
+Expose les endpoints utilisés par OllamaService avec une latence simulée:
+- GET  /api/tags     -> liste de modèles
+- POST /api/embed    -> embeddings déterministes (hash du texte)
+- POST /api/chat     -> réponse fixe, streamée en NDJSON si "stream" est vrai
+- POST /api/generate -> réponse fixe (non streamée)
+
+Le serveur tourne dans un thread dédié (uvicorn) pour ne pas partager
+la boucle asyncio du client mesuré. ``stats["connections"]`` compte les
+connexions TCP distinctes ouvertes par les clients.
+
+Usage:
+    with StubOllamaServer(latency_ms=20) as server:
+        os.environ["OLLAMA_BASE_URL"] = server.url
+"""
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    """Vecteur pseudo-aléatoire stable pour un texte donné."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(dim)]
+
+
+class ConnectionCounter:
+    """Middleware ASGI: note l'adresse (hôte, port) client de chaque requête."""
+
+    def __init__(self, app, connections: set):
+        self.app = app
+        self.connections = connections
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope.get("client"):
+            self.connections.add(tuple(scope["client"]))
+        await self.app(scope, receive, send)
+
+
+CHAT_TOKENS = ["Bonjour", ", ", "je ", "suis ", "un ", "Ollama ", "factice", "."]
+
+
+def create_app(
+    latency_ms: float = 20.0,
+    per_item_ms: float = 0.5,
+    dim: int = 768,
+    num_parallel: int = 4,
+    token_ms: float = 5.0,
+) -> Starlette:
+    """
+    Args:
+        latency_ms: Latence fixe par requête
+        per_item_ms: Latence supplémentaire par texte embeddé
+        dim: Dimension des embeddings
+        num_parallel: Requêtes traitées en parallèle (OLLAMA_NUM_PARALLEL)
+        token_ms: Délai entre deux tokens générés (chat/generate)
+    """
+    slots = asyncio.Semaphore(num_parallel)
+    stats = {
+        "requests": 0,
+        "embed_calls": 0,
+        "embedded_texts": 0,
+        "chat_calls": 0,
+        "connections": set(),
+    }
+
+    async def tags(request: Request) -> JSONResponse:
+        stats["requests"] += 1
+        return JSONResponse({"models": [{"name": "nomic-embed-text"}, {"name": "qwen2.5:14b"}]})
+
+    async def embed(request: Request) -> JSONResponse:
+        body = await request.json()
+        texts = body.get("input") or []
+        if isinstance(texts, str):
+            texts = [texts]
+        async with slots:
+            await asyncio.sleep((latency_ms + per_item_ms * len(texts)) / 1000)
+        stats["requests"] += 1
+        stats["embed_calls"] += 1
+        stats["embedded_texts"] += len(texts)
+        return JSONResponse(
+            {"model": body.get("model"), "embeddings": [fake_embedding(t, dim) for t in texts]}
+        )
+
+    async def chat(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        stats["chat_calls"] += 1
+        model = body.get("model")
+
+        if body.get("stream", True):
+            async def lines():
+                async with slots:
+                    await asyncio.sleep(latency_ms / 1000)
+                    for token in CHAT_TOKENS:
+                        await asyncio.sleep(token_ms / 1000)
+                        message = {"role": "assistant", "content": token}
+                        yield json.dumps({"model": model, "message": message, "done": False}) + "\n"
+                message = {"role": "assistant", "content": ""}
+                yield json.dumps({"model": model, "message": message, "done": True}) + "\n"
+
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        async with slots:
+            await asyncio.sleep((latency_ms + token_ms * len(CHAT_TOKENS)) / 1000)
+        content = "".join(CHAT_TOKENS)
+        return JSONResponse(
+            {"model": model, "message": {"role": "assistant", "content": content}, "done": True}
+        )
+
+    async def generate(request: Request) -> JSONResponse:
+        body = await request.json()
+        stats["requests"] += 1
+        stats["chat_calls"] += 1
+        async with slots:
+            await asyncio.sleep((latency_ms + token_ms * len(CHAT_TOKENS)) / 1000)
+        return JSONResponse(
+            {"model": body.get("model"), "response": "".join(CHAT_TOKENS), "done": True}
+        )
+
+    app = Starlette(
+        routes=[
+            Route("/api/tags", tags, methods=["GET"]),
+            Route("/api/embed", embed, methods=["POST"]),
+            Route("/api/chat", chat, methods=["POST"]),
+            Route("/api/generate", generate, methods=["POST"]),
+        ],
+        middleware=[Middleware(ConnectionCounter, connections=stats["connections"])],
+    )
+    app.state.stats = stats
+    return app
+
+
+class StubOllamaServer:
+    """Lance le serveur factice dans un thread le temps d'un bloc ``with``."""
+
+    def __init__(self, **app_options):
+        self.app = create_app(**app_options)
+        self.port = self._free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(
+            # Ollama (net/http de Go) ne ferme pas les connexions keep-alive inactives
+            uvicorn.Config(
+                self.app,
+                host="127.0.0.1",
+                port=self.port,
+                log_level="warning",
+                timeout_keep_alive=300,
+            )
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def stats(self) -> dict:
+        return self.app.state.stats
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            return sock.getsockname()[1]
+
+    def __enter__(self) -> "StubOllamaServer":
+        self._thread.start()
+        deadline = time.time() + 10
+        while not self._server.started:
+            if time.time() > deadline:
+                raise RuntimeError("Le serveur Ollama factice n'a pas démarré")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)